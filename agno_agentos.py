@@ -43,6 +43,16 @@ charts_dir.mkdir(parents=True, exist_ok=True)
 
 app.mount("/charts", StaticFiles(directory=str(charts_dir)), name="charts")
 
+# Prometheus scrape endpoint: latency histograms (spans, tools, model, SQL), token counts,
+# cache hit ratios and pool stats. GET /metrics itself is AgentOS's usage metrics API.
+from fastapi.responses import PlainTextResponse
+import metrics
+
+
+@app.get("/metrics/prometheus", include_in_schema=False)
+def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,520 @@
+"""Precomputed agent scope: which policies and customers each login can see.
+
+Every agent-scoped question joins ``agent_logins → provider_policy_access``
+before it reaches policies, customers or claims. `AgentScopeIndex` keeps that
+join's result in memory: login_id → provider_ref, and per provider the sorted,
+de-duplicated policy and customer ids (int64 arrays when the ids are integers).
+
+A daemon thread keeps it current. On MySQL it reads a per-provider checksum of
+the junction table and reloads only the providers whose rows changed; other
+databases reload the table. Writes to either table through the agent's engines
+mark the index stale at once and wake the refresher.
+
+`AgentScopeIndex.rewrite` drops the two junction tables from a scoped query:
+
+    ... FROM agent_logins al JOIN provider_policy_access ppa ON al.provider_ref = ppa.provider_ref
+        JOIN policies p ON ppa.policy_system_id = p.system_id WHERE al.login_id = 'acmegroup' ...
+    ... FROM policies p WHERE p.system_id IN ('17', '42', ...) ...
+
+and answers bare scope counts (``COUNT(*)``, ``COUNT(DISTINCT ppa.policy_system_id)``
+over the two tables alone) with a constant. A query is only rewritten when the
+result cannot change: the login is unique, the junction holds each id once for
+that provider (or the query is a DISTINCT listing), and the index was
+refreshed within AGENT_SCOPE_MAX_STALENESS.
+"""
+import re
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+from agno.utils.log import logger
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.engine import Engine
+
+import metrics
+from db.rollups import _ago, _load_columns
+from db.sql_text import referenced_tables
+from settings import AGENT_SCOPE_REFRESH_INTERVAL, AGENT_SCOPE_MAX_STALENESS, AGENT_SCOPE_MAX_IN_LIST
+
+KNOWLEDGE_DIR = Path(__file__).parent.parent / "knowledge"
+LOGINS = "agent_logins"
+JUNCTION = "provider_policy_access"
+KEYS = ("policy_system_id", "customer_ref")
+
+_LOGINS_SQL = "SELECT login_id, provider_ref FROM agent_logins"
+_ROWS_SQL = "SELECT provider_ref, policy_system_id, customer_ref FROM provider_policy_access"
+# Order-independent checksum of each provider's junction rows, so a refresh
+# reloads only the providers that changed.
+_MYSQL_FINGERPRINT_SQL = """
+SELECT provider_ref, COUNT(*),
+       COALESCE(SUM(CRC32(CONCAT_WS(':', policy_system_id, customer_ref))), 0)
+FROM provider_policy_access
+WHERE provider_ref IS NOT NULL
+GROUP BY provider_ref
+"""
+_WRITE_RE = re.compile(r"^\s*(insert|update|delete|replace|truncate|load)\b", re.IGNORECASE)
+# Providers per reload statement.
+_RELOAD_BATCH = 500
+# Marks a login_id that matches more than one agent_logins row.
+_AMBIGUOUS = object()
+
+
+def _login_key(login_id, fold: bool) -> str:
+    # MySQL's default collation ignores case and trailing spaces in `login_id = '...'`.
+    return str(login_id).lower().rstrip() if fold else str(login_id)
+
+
+def _pack(ids: list) -> Sequence:
+    """Sorted unique ids: an int64 array when every id is a canonical integer, else a tuple of str."""
+    unique = {str(i) for i in ids if i is not None}
+    if all(s.isdigit() and len(s) < 19 and (s == "0" or s[0] != "0") for s in unique):
+        return array("q", sorted(int(s) for s in unique))
+    return tuple(sorted(unique))
+
+
+@dataclass
+class ProviderScope:
+    """One provider's junction rows, reduced to sorted id sets and row counts."""
+
+    policies: Sequence
+    customers: Sequence
+    rows: int
+    policy_rows: int
+    customer_rows: int
+    fingerprint: Optional[tuple] = None
+
+    @classmethod
+    def build(cls, policies: list, customers: list) -> "ProviderScope":
+        return cls(
+            _pack(policies),
+            _pack(customers),
+            len(policies),
+            sum(1 for p in policies if p is not None),
+            sum(1 for c in customers if c is not None),
+        )
+
+    def ids(self, key: str) -> Sequence:
+        return self.policies if key == "policy_system_id" else self.customers
+
+    def key_rows(self, key: str) -> int:
+        return self.policy_rows if key == "policy_system_id" else self.customer_rows
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            ids.buffer_info()[1] * ids.itemsize if isinstance(ids, array) else sys.getsizeof(ids) + sum(sys.getsizeof(s) for s in ids)
+            for ids in (self.policies, self.customers)
+        )
+
+
+_EMPTY = ProviderScope((), (), 0, 0, 0)
+
+
+@dataclass
+class ScopeRewrite:
+    """A query served from the scope index, and how old the index is."""
+
+    login_id: str
+    sql: str
+    age: float
+    answered: bool = False
+
+    def note(self) -> str:
+        how = "answered" if self.answered else "scoped"
+        return f"\n\nNote: {how} from the agent-scope index for `{self.login_id}`, refreshed {_ago(self.age)} ago."
+
+
+# ---------------------------------------------------------------------------
+# Query matching
+# ---------------------------------------------------------------------------
+class _NoMatch(Exception):
+    """The query cannot be served from the scope index."""
+
+
+@dataclass
+class _Plan:
+    """What `_match` found in a scoped query; the tree is rewritten in place later."""
+
+    login_id: str
+    matcher: "_Matcher"
+    junction: str  # alias of provider_policy_access
+    where: list  # remaining WHERE conjuncts
+    count_only: bool
+    key: Optional[str] = None
+    anchor_column: Optional[object] = None
+
+
+def _conjuncts(node) -> list:
+    from sqlglot import exp
+
+    if node is None:
+        return []
+    return list(node.flatten()) if isinstance(node, exp.And) else [node]
+
+
+def _inner(join) -> bool:
+    return not join.side and (join.kind or "").upper() in ("", "INNER") and not join.args.get("using")
+
+
+class _Matcher:
+    """Resolves column owners for one SELECT against the knowledge column lists."""
+
+    def __init__(self, select, columns: dict[str, set[str]]):
+        self.columns = columns
+        self.sources = {}  # alias (lowercase) -> table name (lowercase)
+        for table in [select.args["from"].this] + [j.this for j in select.args.get("joins") or []]:
+            self.sources[table.alias_or_name.lower()] = table.name.lower()
+
+    def owner(self, column) -> Optional[str]:
+        if column.table:
+            return column.table.lower()
+        holders = [alias for alias, table in self.sources.items() if column.name.lower() in self.columns.get(table, ())]
+        return holders[0] if len(holders) == 1 else None
+
+    def is_(self, column, alias: str, name: Optional[str] = None) -> bool:
+        from sqlglot import exp
+
+        return isinstance(column, exp.Column) and self.owner(column) == alias and (name is None or column.name.lower() == name)
+
+
+def _match(select, columns: dict[str, set[str]]) -> _Plan:
+    """Check ``select`` has the canonical scope shape; raises `_NoMatch` otherwise."""
+    from sqlglot import exp
+
+    if not isinstance(select, exp.Select) or select.args.get("with") or not select.args.get("from"):
+        raise _NoMatch("not a plain SELECT")
+    if any(s is not select for s in select.find_all(exp.Select)):
+        raise _NoMatch("subquery")
+    if any(isinstance(p, exp.Star) for p in select.expressions):
+        raise _NoMatch("SELECT *")
+    joins = select.args.get("joins") or []
+    sources = [select.args["from"].this] + [j.this for j in joins]
+    if len(sources) < 2 or not all(isinstance(s, exp.Table) for s in sources):
+        raise _NoMatch("not a join of tables")
+    if sorted(s.name.lower() for s in sources[:2]) != [LOGINS, JUNCTION] or not _inner(joins[0]):
+        raise _NoMatch("does not start with agent_logins JOIN provider_policy_access")
+    if any(s.name.lower() in (LOGINS, JUNCTION) for s in sources[2:]):
+        raise _NoMatch("junction tables joined twice")
+
+    m = _Matcher(select, columns)
+    if len(m.sources) != len(sources):
+        raise _NoMatch("duplicate alias")
+    a, p = (s.alias_or_name.lower() for s in sorted(sources[:2], key=lambda s: s.name.lower() != LOGINS))
+    link = joins[0].args.get("on")
+    if not (isinstance(link, exp.EQ) and {(m.owner(c), c.name.lower()) for c in (link.this, link.expression) if isinstance(c, exp.Column)} == {(a, "provider_ref"), (p, "provider_ref")}):
+        raise _NoMatch("junction join is not on provider_ref")
+
+    login_id, where = None, []
+    for cond in _conjuncts(select.args["where"].this if select.args.get("where") else None):
+        if isinstance(cond, exp.EQ) and login_id is None:
+            column, value = (cond.this, cond.expression) if isinstance(cond.this, exp.Column) else (cond.expression, cond.this)
+            if m.is_(column, a, "login_id") and isinstance(value, exp.Literal) and value.is_string:
+                login_id = value.this
+                continue
+        where.append(cond)
+    if login_id is None:
+        raise _NoMatch("no login_id = '...' filter")
+
+    plan = _Plan(login_id, m, p, where, count_only=len(sources) == 2)
+    if not plan.count_only:
+        anchor = joins[1]
+        if not _inner(anchor):
+            raise _NoMatch("outer join to the scoped table")
+        t = anchor.this.alias_or_name.lower()
+        rest = []
+        for cond in _conjuncts(anchor.args.get("on")):
+            if plan.key is None and isinstance(cond, exp.EQ):
+                left, right = cond.this, cond.expression
+                if m.is_(right, t) and m.is_(left, p):
+                    left, right = right, left
+                if m.is_(left, t) and any(m.is_(right, p, key) for key in KEYS):
+                    plan.key, plan.anchor_column = right.name.lower(), left
+                    continue
+            rest.append(cond)
+        if plan.key is None:
+            raise _NoMatch("scoped table is not joined on policy_system_id or customer_ref")
+        plan.where.extend(rest)
+
+    # Nothing else may read agent_logins or the junction, except the scoped key itself.
+    outside = list(plan.where) + [e for j in joins[2:] for e in [j.args.get("on")] if e is not None]
+    outside += [select.args[k] for k in ("group", "having", "order", "qualify") if select.args.get(k)] + list(select.expressions)
+    for node in outside:
+        for column in node.find_all(exp.Column):
+            owner = m.owner(column)
+            if owner is None and column.name.lower() in columns.get(LOGINS, set()) | columns.get(JUNCTION, set()):
+                raise _NoMatch(f"ambiguous column {column.name}")
+            if owner == a or (owner == p and column.name.lower() not in (KEYS if plan.count_only else (plan.key,))):
+                raise _NoMatch(f"reads {column.sql('mysql')} outside the scope join")
+    return plan
+
+
+def _count_answer(select, plan: _Plan, scope: ProviderScope) -> str:
+    """``SELECT <n> AS ...`` for a bare count over the scope join."""
+    from sqlglot import exp
+
+    if plan.where or any(select.args.get(k) for k in ("group", "having", "distinct", "limit", "offset")):
+        raise _NoMatch("not a bare count")
+    m, p = plan.matcher, plan.junction
+    values = []
+    for projection in select.expressions:
+        count = projection.this if isinstance(projection, exp.Alias) else projection
+        if not isinstance(count, exp.Count):
+            raise _NoMatch("not a count")
+        arg = count.this
+        if isinstance(arg, exp.Star):
+            n = scope.rows
+        elif isinstance(arg, exp.Distinct) and len(arg.expressions) == 1 and any(m.is_(arg.expressions[0], p, k) for k in KEYS):
+            n = len(scope.ids(arg.expressions[0].name.lower()))
+        elif any(m.is_(arg, p, k) for k in KEYS):
+            n = scope.key_rows(arg.name.lower())
+        else:
+            raise _NoMatch("count of another column")
+        values.append(exp.alias_(exp.Literal.number(n), projection.alias_or_name if isinstance(projection, exp.Alias) else projection.sql("mysql"), quoted=True))
+    return exp.select(*values).sql("mysql")
+
+
+def _scoped_sql(select, plan: _Plan, scope: ProviderScope, max_in_list: int) -> str:
+    """``select`` with the junction tables replaced by ``anchor.column IN (ids)``."""
+    from sqlglot import exp
+
+    ids = scope.ids(plan.key)
+    if len(ids) > max_in_list:
+        raise _NoMatch(f"{len(ids)} ids exceed AGENT_SCOPE_MAX_IN_LIST")
+    if scope.key_rows(plan.key) != len(ids) and not (select.args.get("distinct") and not select.find(exp.AggFunc)):
+        raise _NoMatch("junction repeats ids for this provider; dropping it would change the row count")
+
+    joins = select.args["joins"]
+    select.set("from", exp.From(this=joins[1].this))
+    select.set("joins", joins[2:] or None)
+    select.set("where", exp.Where(this=exp.and_(*plan.where)) if plan.where else None)
+    # `_match` left only the scoped key on the junction side; read it from the anchor instead.
+    for column in list(select.find_all(exp.Column)):
+        if plan.matcher.owner(column) == plan.junction:
+            replacement = plan.anchor_column.copy()
+            column.replace(exp.alias_(replacement, column.name) if column.parent is select else replacement)
+    scoped = exp.In(this=plan.anchor_column.copy(), expressions=[exp.Literal.string(str(i)) for i in ids]) if ids else exp.false()
+    select.where(scoped, copy=False)
+    return select.sql("mysql")
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class AgentScopeIndex:
+    """login_id → policy/customer ids, kept current in the background and used to rewrite scoped queries."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        columns: dict[str, set[str]],
+        refresh_interval: float = AGENT_SCOPE_REFRESH_INTERVAL,
+        max_staleness: float = AGENT_SCOPE_MAX_STALENESS,
+        max_in_list: int = AGENT_SCOPE_MAX_IN_LIST,
+    ):
+        self.engine = engine
+        self.columns = columns
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.max_in_list = max_in_list
+        self._logins: dict[str, object] = {}
+        self._providers: dict[str, ProviderScope] = {}
+        self._refreshed_at: Optional[float] = None
+        self._fold = engine.dialect.name == "mysql"
+        # Scope-table writes seen, and how many of them the last successful refresh covers.
+        self._writes = 0
+        self._synced = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def age(self) -> Optional[float]:
+        """Seconds since the index was last brought up to date, or None when it is not usable."""
+        if self._refreshed_at is None or self._writes != self._synced:
+            return None
+        return max(time.time() - self._refreshed_at, 0.0)
+
+    def scope(self, login_id: str) -> Optional[ProviderScope]:
+        """The scope of ``login_id``; None when the login is unknown, not unique or the index is stale."""
+        age = self.age()
+        if age is None or age > self.max_staleness:
+            return None
+        provider_ref = self._logins.get(_login_key(login_id, self._fold), _AMBIGUOUS)
+        if provider_ref is _AMBIGUOUS:
+            return None
+        return self._providers.get(provider_ref, _EMPTY)  # no junction rows: the join is empty
+
+    def rewrite(self, sql: str) -> Optional[ScopeRewrite]:
+        """``sql`` with the agent_logins/provider_policy_access join replaced by the index, or None."""
+        lowered = sql.lower()
+        if JUNCTION not in lowered or LOGINS not in lowered:
+            return None
+        import sqlglot
+
+        try:
+            select = sqlglot.parse_one(sql, read="mysql")
+            plan = _match(select, self.columns)
+        except (sqlglot.errors.SqlglotError, _NoMatch) as e:
+            logger.debug(f"Agent scope index does not apply: {e}")
+            return None
+        age = self.age()
+        if age is None or age > self.max_staleness:
+            metrics.incr("agent_scope_queries_total", result="stale")
+            return None
+        scope = self.scope(plan.login_id)
+        if scope is None:
+            metrics.incr("agent_scope_queries_total", result="unknown_login")
+            return None
+        try:
+            if plan.count_only:
+                rewritten = _count_answer(select, plan, scope)
+            else:
+                rewritten = _scoped_sql(select, plan, scope, self.max_in_list)
+        except _NoMatch as e:
+            metrics.incr("agent_scope_queries_total", result="miss")
+            logger.debug(f"Agent scope index does not apply: {e}")
+            return None
+        metrics.incr("agent_scope_queries_total", result="answered" if plan.count_only else "scoped")
+        logger.info(f"Agent scope index serves login {plan.login_id} (refreshed {age:.0f}s ago)")
+        return ScopeRewrite(plan.login_id, rewritten, age, answered=plan.count_only)
+
+    # ------------------------------------------------------------------
+    # Refreshing
+    # ------------------------------------------------------------------
+    def _load(self, conn, refs: Optional[list[str]]) -> dict[str, ProviderScope]:
+        """Scopes of the providers in ``refs`` (every provider when None)."""
+        rows: dict[str, tuple[list, list]] = {}
+        batches = [None] if refs is None else [refs[i : i + _RELOAD_BATCH] for i in range(0, len(refs), _RELOAD_BATCH)]
+        for batch in batches:
+            if batch is None:
+                result = conn.execution_options(stream_results=True).execute(text(_ROWS_SQL))
+            else:
+                stmt = text(f"{_ROWS_SQL} WHERE provider_ref IN :refs").bindparams(bindparam("refs", expanding=True))
+                result = conn.execution_options(stream_results=True).execute(stmt, {"refs": batch})
+            for provider_ref, policy, customer in result:
+                if provider_ref is None:
+                    continue  # never matches agent_logins.provider_ref
+                policies, customers = rows.setdefault(provider_ref, ([], []))
+                policies.append(policy)
+                customers.append(customer)
+        return {ref: ProviderScope.build(policies, customers) for ref, (policies, customers) in rows.items()}
+
+    def refresh(self) -> int:
+        """Bring the index up to date; returns the number of providers reloaded."""
+        start = time.perf_counter()
+        generation = self._writes  # writes seen after this point stay pending
+        with self.engine.connect() as conn:
+            logins: dict[str, object] = {}
+            for login_id, provider_ref in conn.execute(text(_LOGINS_SQL)):
+                key = _login_key(login_id, self._fold)
+                logins[key] = _AMBIGUOUS if key in logins else provider_ref
+            if self.engine.dialect.name == "mysql":
+                prints = {ref: (int(n), int(crc)) for ref, n, crc in conn.execute(text(_MYSQL_FINGERPRINT_SQL))}
+                changed = [ref for ref, fp in prints.items() if getattr(self._providers.get(ref), "fingerprint", None) != fp]
+                kept = {ref: s for ref, s in self._providers.items() if ref in prints and ref not in set(changed)}
+                loaded = self._load(conn, changed) if changed else {}
+                for ref, scope in loaded.items():
+                    scope.fingerprint = prints[ref]
+            else:
+                kept, loaded = {}, self._load(conn, None)
+        providers = {**kept, **loaded}
+        with self._lock:
+            self._logins, self._providers, self._refreshed_at = logins, providers, time.time()
+            self._synced = generation  # only now: a failed refresh leaves the index stale
+
+        elapsed = time.perf_counter() - start
+        metrics.incr("agent_scope_refreshes_total", mode="incremental" if kept else "full")
+        metrics.observe("agent_scope_refresh_seconds", elapsed)
+        metrics.set_gauge("agent_scope_logins", len(logins))
+        metrics.set_gauge("agent_scope_providers", len(providers))
+        metrics.set_gauge("agent_scope_bytes", sum(s.nbytes for s in providers.values()))
+        if loaded:
+            logger.info(f"Agent scope index: reloaded {len(loaded)} of {len(providers)} provider(s), {len(logins)} login(s) in {elapsed * 1000:.0f} ms")
+        return len(loaded)
+
+    def watch_writes(self, engine: Engine) -> None:
+        """Mark the index stale, and wake the refresher, when ``engine`` writes to the scope tables."""
+
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            if not _WRITE_RE.match(statement):
+                return
+            if (referenced_tables(statement) or set()) & {LOGINS, JUNCTION}:
+                conn.info["agent_scope_write"] = True
+                self._written()
+
+        def _commit(conn):
+            # A refresh that ran between the statement and its commit read the old rows.
+            if conn.info.pop("agent_scope_write", False):
+                self._written()
+
+        def _rollback(conn):
+            conn.info.pop("agent_scope_write", None)
+
+        event.listen(engine, "after_cursor_execute", _after_execute)
+        event.listen(engine, "commit", _commit)
+        event.listen(engine, "rollback", _rollback)
+
+    def _written(self) -> None:
+        with self._lock:
+            self._writes += 1
+        self._wake.set()
+
+    def start(self) -> None:
+        """Start the background refresher (idempotent); the first refresh runs immediately."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="agent-scope-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                metrics.incr("agent_scope_refresh_errors_total")
+                logger.warning(f"Agent scope refresh failed: {e}")
+            self._wake.wait(self.refresh_interval)
+
+    def stats(self) -> dict:
+        providers = self._providers
+        return {
+            "age_seconds": self.age(),
+            "logins": len(self._logins),
+            "providers": len(providers),
+            "policy_ids": sum(len(s.policies) for s in providers.values()),
+            "customer_ids": sum(len(s.customers) for s in providers.values()),
+            "bytes": sum(s.nbytes for s in providers.values()),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+_INDEXES: dict[str, AgentScopeIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_agent_scope_index(engine: Engine) -> AgentScopeIndex:
+    """Return the shared scope index for this engine's database, starting its refresher."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = AgentScopeIndex(engine, _load_columns(KNOWLEDGE_DIR))
+            index.watch_writes(engine)
+            index.start()
+            _INDEXES[key] = index
+        return index
@@ -1,11 +1,13 @@
 from agno.db.postgres import PostgresDb
-from agno.knowledge.embedder.openai import OpenAIEmbedder
 from agno.knowledge.knowledge import Knowledge
-from agno.vectordb.pgvector import PgVector, SearchType
+from agno.vectordb.pgvector import SearchType
 
 import os
 from agno.utils.log import logger
-from settings import MYSQL_URL, PG_URL, KNOWLEDGE_TABLE, LEARNINGS_TABLE
+from db.embedders import create_embedder
+from db.embedding_cache import CachedEmbedder, embedding_cache
+from db.vectordb import DeferredKnowledge, DeferredPgVector
+from settings import MYSQL_URL, PG_URL, KNOWLEDGE_TABLE, LEARNINGS_TABLE, EMBEDDER, EMBEDDING_DIMENSIONS
 
 # Re-export for backward compatibility
 mysql_url: str = MYSQL_URL
@@ -15,19 +17,20 @@ def get_demo_db() -> PostgresDb:
     return PostgresDb(id="demo2-db", db_url=pg_url)
 
 def create_knowledge_base(name: str, table_name: str, contents_db: PostgresDb = None) -> Knowledge:
-    """Create a Knowledge instance backed by PgVector."""
+    """Create a Knowledge instance backed by PgVector; its table is created on first use."""
     
-    if not os.getenv("OPENAI_API_KEY"):
-        logger.warning(f"OPENAI_API_KEY is not set. Creating {name} with OpenAIEmbedder may fail to generate valid 1536-dimensional embeddings for PgVector.")
+    if EMBEDDER == "openai" and not os.getenv("OPENAI_API_KEY"):
+        logger.warning(f"OPENAI_API_KEY is not set. Creating {name} with OpenAIEmbedder may fail to generate valid {EMBEDDING_DIMENSIONS}-dimensional embeddings for PgVector.")
 
-    return Knowledge(
+    return DeferredKnowledge(
         name=name,
-        vector_db=PgVector(
+        vector_db=DeferredPgVector(
             db_url=pg_url,
             table_name=table_name,
             search_type=SearchType.hybrid,
-            # We explicitly define the dimensions so PgVector knows what table schema to create
-            embedder=OpenAIEmbedder(id="text-embedding-3-small", dimensions=1536),
+            # The embedder defines the dimensions so PgVector knows what table schema to create.
+            # Both knowledge bases share one embedding cache (memory LRU + persistent tier).
+            embedder=CachedEmbedder(embedder=create_embedder(), cache=embedding_cache),
         ),
         max_results=5,
         contents_db=contents_db,
@@ -0,0 +1,77 @@
+"""Embedders used by the knowledge bases.
+
+`create_embedder()` returns the embedder selected by EMBEDDER: the OpenAI
+model used in production, or `LocalHashEmbedder`, a deterministic offline
+embedder for tests and benchmarks. `embed_texts` embeds many texts with as
+few requests as the embedder allows.
+"""
+import hashlib
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+from settings import EMBEDDER, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class LocalHashEmbedder(Embedder):
+    """Deterministic feature-hashing embedder; needs no network or API key.
+
+    Words and word bigrams are hashed into a signed vector and L2-normalized,
+    so texts sharing vocabulary land close together. Good enough to exercise
+    hybrid search and ingestion offline; not a substitute for a real model.
+    """
+
+    id: str = "local-hash"
+    dimensions: Optional[int] = EMBEDDING_DIMENSIONS
+
+    def get_embedding(self, text: str) -> List[float]:
+        vec = [0.0] * self.dimensions
+        words = _WORD_RE.findall(text.lower())
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            slot = int.from_bytes(digest[:4], "little") % self.dimensions
+            vec[slot] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self.get_embedding(t) for t in texts]
+
+
+def create_embedder() -> Embedder:
+    if EMBEDDER == "local":
+        return LocalHashEmbedder(dimensions=EMBEDDING_DIMENSIONS)
+    return OpenAIEmbedder(id=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS)
+
+
+def embed_texts(embedder: Embedder, texts: List[str]) -> List[List[float]]:
+    """Embed ``texts`` in one request per `embedder.batch_size` where the embedder supports it."""
+    if not texts:
+        return []
+    batch_fn = getattr(embedder, "get_embeddings_batch", None)
+    if batch_fn is not None:
+        return batch_fn(texts)
+    if isinstance(embedder, OpenAIEmbedder):
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), embedder.batch_size):
+            # `response` forwards its input as-is, and the API accepts a list.
+            response = embedder.response(text=texts[i : i + embedder.batch_size])
+            vectors.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return vectors
+    return [embedder.get_embedding(t) for t in texts]
@@ -0,0 +1,239 @@
+"""Persistent embedding cache shared by every knowledge base.
+
+Each user turn embeds the question once per knowledge base searched (the
+curated knowledge and the learnings), and repeated questions pay for the
+same embedding again. `CachedEmbedder` wraps the real embedder and looks
+vectors up by (model, dimensions, normalized text) in an in-memory LRU, then
+in a persistent tier (a local SQLite file or a Postgres table), and only
+calls the provider on a miss. Lookup latency is recorded per tier.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import logger
+from sqlalchemy import Column, DateTime, LargeBinary, MetaData, String, Table, func, select
+from sqlalchemy.dialects import postgresql
+
+import metrics
+import tracing
+from db.embedders import embed_texts
+from settings import EMBEDDING_CACHE_BACKEND, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_TABLE, PG_URL
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so near-identical questions share an entry."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    return hashlib.sha256(f"{model}\0{dimensions}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+class _SqliteTier:
+    name = "disk"
+
+    def __init__(self, path: str):
+        self.path = Path(path) if Path(path).is_absolute() else _PROJECT_ROOT / path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use (under the lock), so importing the module touches no files.
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        marks = ",".join("?" * len(keys))
+        with self._lock:
+            return dict(self._connect().execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", keys).fetchall())
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", items.items())
+
+
+class _PostgresTier:
+    name = "postgres"
+
+    def __init__(self, url: str, table_name: str):
+        from db.engines import get_engine
+
+        self._engine = get_engine(url)
+        self._table = Table(
+            table_name,
+            MetaData(),
+            Column("key", String(64), primary_key=True),
+            Column("vector", LargeBinary, nullable=False),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        )
+        self._created = False
+
+    def _ensure_table(self) -> None:
+        if not self._created:
+            self._table.create(self._engine, checkfirst=True)
+            self._created = True
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        self._ensure_table()
+        t = self._table
+        with self._engine.connect() as conn:
+            return dict(conn.execute(select(t.c.key, t.c.vector).where(t.c.key.in_(keys))).all())
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        self._ensure_table()
+        stmt = postgresql.insert(self._table).on_conflict_do_nothing(index_elements=["key"])
+        with self._engine.begin() as conn:
+            conn.execute(stmt, [{"key": k, "vector": v} for k, v in items.items()])
+
+
+class EmbeddingCache:
+    """Two-tier vector cache: in-memory LRU plus an optional persistent store."""
+
+    def __init__(self, size: int = EMBEDDING_CACHE_SIZE, backend: str = EMBEDDING_CACHE_BACKEND):
+        self.size = size
+        self._memory: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+        try:
+            if backend == "disk":
+                self._store = _SqliteTier(EMBEDDING_CACHE_PATH)
+            elif backend == "postgres":
+                self._store = _PostgresTier(PG_URL, EMBEDDING_CACHE_TABLE)
+        except Exception as e:
+            logger.warning(f"Embedding cache {backend} tier unavailable, using memory only: {e}")
+
+    def __deepcopy__(self, memo):
+        # Knowledge objects may be deep-copied per run; the cache stays shared.
+        return self
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        start = time.perf_counter()
+        with self._lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+        if found:
+            metrics.observe("embedding_cache_lookup_seconds", time.perf_counter() - start, tier="memory")
+            metrics.incr("embedding_cache_hits_total", len(found), tier="memory")
+
+        missing = [k for k in keys if k not in found]
+        if missing and self._store is not None:
+            start = time.perf_counter()
+            try:
+                stored = {k: _unpack(v) for k, v in self._store.get_many(missing).items()}
+            except Exception as e:
+                logger.warning(f"Embedding cache {self._store.name} lookup failed: {e}")
+                stored = {}
+            metrics.observe("embedding_cache_lookup_seconds", time.perf_counter() - start, tier=self._store.name)
+            if stored:
+                metrics.incr("embedding_cache_hits_total", len(stored), tier=self._store.name)
+                self._remember(stored)
+                found.update(stored)
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        self._remember(vectors)
+        if self._store is not None:
+            try:
+                self._store.put_many({k: _pack(v) for k, v in vectors.items()})
+            except Exception as e:
+                logger.warning(f"Embedding cache {self._store.name} write failed: {e}")
+
+    def _remember(self, vectors: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for key, vec in vectors.items():
+                self._memory[key] = vec
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = {tier: metrics.get_counter("embedding_cache_hits_total", tier=tier) for tier in ("memory", "disk", "postgres")}
+        misses = metrics.get_counter("embedding_cache_misses_total")
+        total = sum(hits.values()) + misses
+        return {"entries": len(self._memory), "hits": hits, "misses": misses, "hit_rate": sum(hits.values()) / total if total else 0.0}
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder that serves repeated texts from an `EmbeddingCache` before calling ``embedder``."""
+
+    embedder: Optional[Embedder] = None
+    cache: Optional[EmbeddingCache] = None
+
+    def __post_init__(self):
+        self.cache = self.cache or embedding_cache
+        self.enable_batch = True
+        self.id = self.embedder.id
+        self.dimensions = self.embedder.dimensions
+        self.batch_size = self.embedder.batch_size
+
+    def _key(self, text: str) -> str:
+        return cache_key(self.embedder.id, self.embedder.dimensions, text)
+
+    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        pending = {k: t for k, t in zip(keys, texts) if k not in found}
+        if pending:
+            metrics.incr("embedding_cache_misses_total", len(pending))
+            start = time.perf_counter()
+            with tracing.span(self.embedder.id, "embedding", texts=len(pending)):
+                vectors = embed_texts(self.embedder, list(pending.values()))
+            metrics.observe("embedding_provider_seconds", time.perf_counter() - start)
+            fresh = {k: v for k, v in zip(pending, vectors) if v}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found.get(k, []) for k in keys]
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings_batch([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        # Usage is not tracked for cached vectors.
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.get_embedding, text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return await asyncio.to_thread(self.get_embedding_and_usage, text)
+
+    async def async_get_embeddings_batch_and_usage(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        vectors = await asyncio.to_thread(self.get_embeddings_batch, texts)
+        return vectors, [None] * len(vectors)
+
+
+# Process-wide cache shared by the knowledge and learnings knowledge bases.
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,154 @@
+"""Shared SQLAlchemy engine registry.
+
+Every tool gets its engine from `get_engine(url)` (or `get_async_engine(url)`
+for the asyncio driver), so SQLTools, introspection and visualization share
+one tuned connection pool per database instead of each opening its own. Pool
+checkout wait time and saturation are exported through `metrics`, every
+statement is traced as a ``db`` span, and writes made through any engine
+invalidate the dependent `query_cache` entries.
+"""
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import metrics
+import tracing
+from db.query_cache import query_cache, watch_writes
+from settings import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT,
+    DB_CONNECT_TIMEOUT,
+)
+
+_ENGINES: dict[str, Engine] = {}
+_ASYNC_ENGINES: dict[str, AsyncEngine] = {}
+_LOCK = threading.Lock()
+
+
+class _TimedPoolMixin:
+    """Records how long each pool checkout waited for a connection."""
+
+    _metrics_label = "default"
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._metrics_label = self._metrics_label
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - start, db=self._metrics_label)
+
+
+class _TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class _TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _record_saturation(pool: _TimedQueuePool, returning: int = 0) -> None:
+    # The checkin event fires before the connection is back in the queue.
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = max(pool.checkedout() - returning, 0)
+    metrics.set_gauge("db_pool_checked_out", checked_out, db=pool._metrics_label)
+    metrics.set_gauge("db_pool_saturation", checked_out / capacity if capacity else 0.0, db=pool._metrics_label)
+
+
+def _pool_kwargs(url: str) -> dict:
+    connect_args = {}
+    if url.startswith(("mysql", "postgresql")):
+        connect_args["connect_timeout"] = DB_CONNECT_TIMEOUT
+    return dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        connect_args=connect_args,
+    )
+
+
+def _instrument(engine: Engine, label: str) -> None:
+    engine.pool._metrics_label = label
+    # Resolve engine.pool lazily: dispose() swaps in a recreated pool.
+    event.listen(engine.pool, "checkout", lambda *_: _record_saturation(engine.pool))
+    event.listen(engine.pool, "checkin", lambda *_: _record_saturation(engine.pool, returning=1))
+    if query_cache is not None:
+        watch_writes(engine)
+    tracing.instrument_engine(engine, label)
+
+
+def get_engine(url: str) -> Engine:
+    """Return the process-wide engine for ``url``, creating it on first use."""
+    with _LOCK:
+        engine = _ENGINES.get(url)
+        if engine is not None:
+            return engine
+
+        engine = create_engine(url, poolclass=_TimedQueuePool, **_pool_kwargs(url))
+        _instrument(engine, engine.url.database or engine.url.get_backend_name())
+
+        _ENGINES[url] = engine
+        return engine
+
+
+def get_async_engine(url: str) -> AsyncEngine:
+    """Return the process-wide asyncio engine for ``url`` (e.g. ``mysql+aiomysql://``)."""
+    with _LOCK:
+        engine = _ASYNC_ENGINES.get(url)
+        if engine is not None:
+            return engine
+
+        engine = create_async_engine(url, poolclass=_TimedAsyncQueuePool, **_pool_kwargs(url))
+        _instrument(engine.sync_engine, f"{engine.url.database or engine.url.get_backend_name()}-async")
+
+        _ASYNC_ENGINES[url] = engine
+        return engine
+
+
+def pool_stats() -> dict[str, dict]:
+    """Current pool usage per database, keyed by the metrics label."""
+    with _LOCK:
+        engines = list(_ENGINES.values()) + [e.sync_engine for e in _ASYNC_ENGINES.values()]
+    return {
+        e.pool._metrics_label: {
+            "size": e.pool.size(),
+            "checked_out": e.pool.checkedout(),
+            "overflow": e.pool.overflow(),
+            "checked_in": e.pool.checkedin(),
+        }
+        for e in engines
+    }
+
+
+def _collect_pool_stats() -> None:
+    for label, stats in pool_stats().items():
+        for name, value in stats.items():
+            metrics.set_gauge(f"db_pool_{name}", value, db=label)
+
+
+metrics.register_collector(_collect_pool_stats)
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection (e.g. on shutdown or after fork)."""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        for async_engine in _ASYNC_ENGINES.values():
+            # Without a running loop, just drop the connections on the floor.
+            async_engine.sync_engine.dispose(close=False)
+        _ENGINES.clear()
+        _ASYNC_ENGINES.clear()
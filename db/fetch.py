@@ -0,0 +1,113 @@
+"""Streaming, capped result fetching.
+
+Results are read through server-side cursors (``stream_results``) in batches
+and stop at a hard row and byte cap, so peak memory per request stays bounded
+no matter what SQL the model writes. Callers are told when a result was cut.
+"""
+import sys
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import metrics
+from db.result_cache import compact_frame
+from settings import FETCH_MAX_ROWS, FETCH_MAX_BYTES, FETCH_BATCH_SIZE, FETCH_DTYPE_BACKEND
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class FetchResult:
+    columns: list[str]
+    rows: list[tuple] = field(default_factory=list)
+    nbytes: int = 0
+    truncated: bool = False
+    reason: str | None = None  # "rows" or "bytes" when truncated
+
+    def records(self) -> list[dict]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def frame(self) -> "pd.DataFrame":
+        """Compact frame: downcast numpy dtypes, or Arrow-backed with FETCH_DTYPE_BACKEND=pyarrow."""
+        import pandas as pd  # deferred: pandas is only needed once a frame is requested
+
+        df = pd.DataFrame.from_records(self.rows, columns=self.columns)
+        if FETCH_DTYPE_BACKEND == "pyarrow":
+            return df.convert_dtypes(dtype_backend="pyarrow")
+        return compact_frame(df)
+
+    def notice(self) -> str:
+        if not self.truncated:
+            return ""
+        cap = f"{FETCH_MAX_BYTES:,} byte" if self.reason == "bytes" else f"{len(self.rows):,} row"
+        return f"Result truncated at the {cap} limit; add filters, aggregation or a LIMIT to see everything."
+
+
+def _row_size(row: tuple) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+class _Collector:
+    def __init__(self, columns: list[str], max_rows: int, max_bytes: int):
+        self.result = FetchResult(columns=columns)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def add(self, batch) -> bool:
+        """Append a batch; returns False once a cap is hit and fetching must stop."""
+        res = self.result
+        for row in batch:
+            if len(res.rows) >= self.max_rows:
+                res.truncated, res.reason = True, "rows"
+                return False
+            size = _row_size(tuple(row))
+            if res.nbytes + size > self.max_bytes:
+                res.truncated, res.reason = True, "bytes"
+                return False
+            res.rows.append(tuple(row))
+            res.nbytes += size
+        return True
+
+    def done(self) -> FetchResult:
+        metrics.observe("fetch_rows", len(self.result.rows))
+        if self.result.truncated:
+            metrics.incr("fetch_truncated_total", reason=self.result.reason)
+        return self.result
+
+
+def fetch(conn: Connection, sql: str, max_rows: int = FETCH_MAX_ROWS, max_bytes: int = FETCH_MAX_BYTES) -> FetchResult:
+    """Stream ``sql`` on ``conn`` and keep at most ``max_rows`` rows / ``max_bytes`` bytes."""
+    result = conn.execution_options(stream_results=True, max_row_buffer=FETCH_BATCH_SIZE).execute(text(sql))
+    if not result.returns_rows:
+        return FetchResult(columns=[])
+    collector = _Collector(list(result.keys()), max_rows, max_bytes)
+    try:
+        for batch in result.partitions(FETCH_BATCH_SIZE):
+            if not collector.add(batch):
+                break
+    finally:
+        result.close()  # discards the rest of a server-side cursor
+    return collector.done()
+
+
+async def afetch(conn: AsyncConnection, sql: str, max_rows: int = FETCH_MAX_ROWS, max_bytes: int = FETCH_MAX_BYTES) -> FetchResult:
+    """Async counterpart of `fetch` using an unbuffered server-side cursor."""
+    result = await conn.stream(text(sql), execution_options={"max_row_buffer": FETCH_BATCH_SIZE})
+    collector = _Collector(list(result.keys()), max_rows, max_bytes)
+    try:
+        async for batch in result.partitions(FETCH_BATCH_SIZE):
+            if not collector.add(batch):
+                break
+    finally:
+        await result.close()
+    return collector.done()
+
+
+def fetch_frame(engine: Engine, sql: str, max_rows: int = FETCH_MAX_ROWS, max_bytes: int = FETCH_MAX_BYTES) -> tuple["pd.DataFrame", FetchResult]:
+    with engine.connect() as conn:
+        res = fetch(conn, sql, max_rows, max_bytes)
+    return res.frame(), res
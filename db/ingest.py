@@ -0,0 +1,184 @@
+"""Batched, deduplicated ingestion into the PgVector knowledge tables.
+
+`Knowledge.add_content` embeds one chunk per request and re-embeds documents
+that are already stored. `IngestionPipeline` instead hashes every chunk,
+looks up the hashes already in the table with one query, embeds only the new
+chunks in batches and writes them with bulk inserts. Chunks of a re-ingested
+source that are no longer present are deleted, so reloading `knowledge/`
+with nothing changed costs a few queries and no embedding requests.
+"""
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from agno.db.schemas.knowledge import KnowledgeRow
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.knowledge import Knowledge
+from agno.knowledge.reader.json_reader import JSONReader
+from agno.knowledge.reader.text_reader import TextReader
+from agno.utils.log import logger
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql
+
+import metrics
+from db.embedders import embed_texts
+from settings import INGEST_BATCH_SIZE
+
+
+@dataclass
+class IngestReport:
+    sources: int = 0
+    chunks: int = 0
+    skipped: int = 0  # already stored with the same content hash
+    embedded: int = 0
+    deleted: int = 0  # stale chunks of re-ingested sources
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.sources} sources, {self.chunks} chunks: {self.embedded} embedded, "
+            f"{self.skipped} unchanged, {self.deleted} stale removed in {self.seconds:.2f}s"
+        )
+
+
+def content_hash(doc: Document) -> str:
+    return hashlib.sha256(f"{doc.name}\n{doc.content}".encode()).hexdigest()
+
+
+class IngestionPipeline:
+    """Loads documents into a knowledge base's vector table with batching and hash-based skips."""
+
+    def __init__(self, knowledge: Knowledge, embedder: Optional[Embedder] = None, batch_size: int = INGEST_BATCH_SIZE):
+        self.knowledge = knowledge
+        self.vector_db = knowledge.vector_db
+        self.embedder = embedder or self.vector_db.embedder
+        self.batch_size = batch_size
+        self._table_ready = False
+
+    def content_id(self, source: str) -> str:
+        """Stable id for a source, so re-ingesting it replaces its old chunks."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.knowledge.name}/{source}"))
+
+    # ------------------------------------------------------------------
+    # Entry points
+    # ------------------------------------------------------------------
+    def ingest_path(self, path: Path) -> IngestReport:
+        """Ingest a file, or every .json/.txt/.md file in a directory."""
+        path = Path(path)
+        files = sorted(p for p in path.iterdir() if p.suffix in (".json", ".txt", ".md")) if path.is_dir() else [path]
+        sources = {}
+        for fp in files:
+            reader = JSONReader() if fp.suffix == ".json" else TextReader()
+            sources[fp.name] = reader.read(fp)
+        return self.ingest(sources)
+
+    def ingest_texts(self, items: Iterable[tuple[str, str]]) -> IngestReport:
+        """Ingest ``(name, text)`` pairs, e.g. a saved query payload."""
+        reader = TextReader()
+        sources = {name: reader.chunk_document(Document(name=name, content=text)) for name, text in items}
+        return self.ingest(sources)
+
+    def ingest(self, sources: dict[str, List[Document]]) -> IngestReport:
+        """Ingest chunked documents grouped by source name."""
+        start = time.perf_counter()
+        report = IngestReport(sources=len(sources))
+        self._ensure_table()
+
+        chunks: dict[str, Document] = {}  # hash -> chunk, deduplicated across sources
+        keep: dict[str, set[str]] = {}  # content_id -> hashes it should keep
+        for source, docs in sources.items():
+            cid = self.content_id(source)
+            keep[cid] = set()
+            for i, doc in enumerate(docs, start=1):
+                doc.id = None  # record ids derive from content, not reader uuids
+                doc.content_id = cid
+                doc.meta_data = {**(doc.meta_data or {}), "source": source}
+                doc.meta_data.setdefault("chunk", i)
+                h = content_hash(doc)
+                keep[cid].add(h)
+                chunks.setdefault(h, doc)
+        report.chunks = len(chunks)
+
+        hashes = list(chunks)
+        for i in range(0, len(hashes), self.batch_size):
+            batch = hashes[i : i + self.batch_size]
+            existing = self._existing_hashes(batch)
+            pending = [h for h in batch if h not in existing]
+            report.skipped += len(batch) - len(pending)
+            if pending:
+                self._embed_and_insert([(h, chunks[h]) for h in pending])
+                report.embedded += len(pending)
+
+        report.deleted = self._delete_stale(keep)
+        self._record_contents(sources)
+        report.seconds = time.perf_counter() - start
+        metrics.incr("ingest_chunks_embedded_total", report.embedded)
+        metrics.incr("ingest_chunks_skipped_total", report.skipped)
+        logger.info(f"Ingested into {self.knowledge.name}: {report}")
+        return report
+
+    # ------------------------------------------------------------------
+    # Steps
+    # ------------------------------------------------------------------
+    def _ensure_table(self) -> None:
+        if not self._table_ready:
+            self.vector_db.create()  # no-op when the table exists
+            self._table_ready = True
+
+    def _existing_hashes(self, hashes: List[str]) -> set[str]:
+        table = self.vector_db.table
+        with self.vector_db.db_engine.connect() as conn:
+            rows = conn.execute(select(table.c.content_hash).where(table.c.content_hash.in_(hashes)))
+            return {r[0] for r in rows}
+
+    def _embed_and_insert(self, batch: List[tuple[str, Document]]) -> None:
+        vectors = embed_texts(self.embedder, [doc.content for _, doc in batch])
+        records = []
+        for (h, doc), vector in zip(batch, vectors):
+            if not vector:
+                logger.warning(f"No embedding returned for a chunk of {doc.name}; skipping it")
+                continue
+            doc.embedding = vector
+            records.append(self.vector_db._get_document_record(doc, None, h, None, prepared=True))
+        if not records:
+            return
+        stmt = postgresql.insert(self.vector_db.table).on_conflict_do_nothing(index_elements=["id"])
+        with self.vector_db.db_engine.begin() as conn:
+            conn.execute(stmt, records)
+
+    def _delete_stale(self, keep: dict[str, set[str]]) -> int:
+        table = self.vector_db.table
+        deleted = 0
+        with self.vector_db.db_engine.begin() as conn:
+            for cid, hashes in keep.items():
+                stmt = delete(table).where(table.c.content_id == cid)
+                if hashes:
+                    stmt = stmt.where(table.c.content_hash.not_in(hashes))
+                deleted += conn.execute(stmt).rowcount or 0
+        return deleted
+
+    def _record_contents(self, sources: dict[str, List[Document]]) -> None:
+        """Keep the contents DB (used by the AgentOS knowledge UI) in step with the vector table."""
+        contents_db = self.knowledge.contents_db
+        if contents_db is None:
+            return
+        now = int(time.time())
+        for source, docs in sources.items():
+            contents_db.upsert_knowledge_content(
+                knowledge_row=KnowledgeRow(
+                    id=self.content_id(source),
+                    name=source,
+                    description="",
+                    metadata={"chunks": len(docs)},
+                    type=Path(source).suffix.lstrip(".") or "text",
+                    size=sum(len(d.content) for d in docs),
+                    linked_to=self.knowledge.name,
+                    status="completed",
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
@@ -7,6 +7,7 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 from agno.utils.log import logger
 
 from db.config import sql_agent_knowledge
+from db.ingest import IngestionPipeline
 
 # ============================================================================
 # Path to SQL Agent Knowledge
@@ -19,5 +20,6 @@ knowledge_dir = cwd.joinpath("knowledge")
 # ============================================================================
 if __name__ == "__main__":
     logger.info(f"Loading SQL Agent Knowledge from {knowledge_dir}")
-    sql_agent_knowledge.add_content(path=str(knowledge_dir))
-    logger.info("SQL Agent Knowledge loaded.")
+    # Unchanged files are skipped by content hash; new chunks are embedded in batches.
+    report = IngestionPipeline(sql_agent_knowledge).ingest_path(knowledge_dir)
+    logger.info(f"SQL Agent Knowledge loaded: {report}")
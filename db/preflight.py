@@ -0,0 +1,246 @@
+"""Pre-flight cost gate for model-written SQL.
+
+Before `run_sql_query` executes a statement, `check` parses it and, on MySQL,
+runs ``EXPLAIN FORMAT=JSON`` to estimate how many rows the plan examines and
+which tables it scans in full. A query is then:
+
+- allowed when the estimate is within PREFLIGHT_MAX_ROWS_EXAMINED;
+- rewritten with ``LIMIT PREFLIGHT_AUTO_LIMIT`` when it is over budget but is
+  a plain row listing that MySQL can stop early once enough rows are found;
+- rejected otherwise, or when tables are joined without any join condition,
+  with a reason the agent can act on.
+
+Every decision is logged with its estimate so the budget can be tuned.
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from agno.utils.log import logger
+from sqlalchemy import text
+
+import metrics
+from settings import PREFLIGHT_MAX_ROWS_EXAMINED, PREFLIGHT_AUTO_LIMIT, PREFLIGHT_REJECT_CARTESIAN
+
+ALLOW, REWRITE, REJECT = "allow", "rewrite", "reject"
+# access_type values that read every row of the table (or of an index).
+_FULL_SCANS = {"ALL", "index"}
+
+
+@dataclass
+class PlanEstimate:
+    rows_examined: float = 0.0
+    query_cost: Optional[float] = None
+    full_scans: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Decision:
+    action: str
+    sql: str
+    reasons: list[str] = field(default_factory=list)
+    estimate: Optional[PlanEstimate] = None
+
+    def message(self) -> str:
+        """Text for the agent: why the query was stopped or changed, and what to do."""
+        if self.action == ALLOW:
+            return ""
+        if self.action == REWRITE:
+            return f"\n\nNote: pre-flight check added LIMIT {PREFLIGHT_AUTO_LIMIT} ({'; '.join(self.reasons)})."
+        lines = ["Error running query: rejected by the pre-flight cost check."]
+        lines += [f"- {reason}" for reason in self.reasons]
+        lines.append(
+            "Fix: join every table with an ON condition, filter on indexed key columns "
+            "(system_id / *_ref), aggregate instead of listing rows, or add a LIMIT."
+        )
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# EXPLAIN FORMAT=JSON
+# ---------------------------------------------------------------------------
+def _table(table: dict, est: PlanEstimate, prefix: float) -> float:
+    """Account one table access reached by ``prefix`` rows; returns the rows it produces."""
+    examined = prefix * float(table.get("rows_examined_per_scan", 0) or 0)
+    est.rows_examined += examined
+    if table.get("access_type") in _FULL_SCANS:
+        est.full_scans.append(table.get("table_name", "?"))
+    for value in table.values():
+        if isinstance(value, (dict, list)):
+            _scan(value, est)  # materialized derived tables, attached subqueries
+    return float(table.get("rows_produced_per_join", examined) or 0)
+
+
+def _scan(node, est: PlanEstimate) -> None:
+    if isinstance(node, list):
+        for item in node:
+            _scan(item, est)
+        return
+    if not isinstance(node, dict):
+        return
+    if "nested_loop" in node:
+        rows = 1.0
+        for item in node["nested_loop"]:
+            rows = _table(item.get("table", {}), est, rows)
+    elif isinstance(node.get("table"), dict):
+        _table(node["table"], est, 1.0)
+    for key, value in node.items():
+        if key not in ("nested_loop", "table") and isinstance(value, (dict, list)):
+            _scan(value, est)
+
+
+def parse_explain(plan: dict) -> PlanEstimate:
+    """Rows examined (join fan-out included), total cost and full scans of a MySQL JSON plan."""
+    est = PlanEstimate()
+    _scan(plan, est)
+    cost = plan.get("query_block", {}).get("cost_info", {}).get("query_cost")
+    est.query_cost = float(cost) if cost is not None else None
+    return est
+
+
+# ---------------------------------------------------------------------------
+# Static checks
+# ---------------------------------------------------------------------------
+def cartesian_joins(sql: str) -> list[str]:
+    """Groups of tables in one SELECT that no join condition connects (empty if none or unparseable)."""
+    import sqlglot
+    from sqlglot import exp
+
+    try:
+        tree = sqlglot.parse_one(sql, read="mysql")
+    except sqlglot.errors.SqlglotError:
+        return []
+    found = []
+    for select in tree.find_all(exp.Select):
+        sources = []
+        if select.args.get("from"):
+            sources.append(select.args["from"].this)
+        joins = select.args.get("joins") or []
+        sources += [j.this for j in joins]
+        names = [s.alias_or_name for s in sources if s.alias_or_name]
+        if len(names) < 2:
+            continue
+        if any(j.args.get("using") or j.args.get("kind") == "NATURAL" or j.args.get("method") == "NATURAL" for j in joins):
+            continue
+        parent = {n: n for n in names}
+
+        def root(n):
+            while parent[n] != n:
+                n = parent[n]
+            return n
+
+        conditions = [j.args.get("on") for j in joins if j.args.get("on")]
+        if select.args.get("where"):
+            conditions.append(select.args["where"])
+        unqualified = False
+        for cond in conditions:
+            for eq in cond.find_all(exp.EQ, exp.NullSafeEQ, exp.In, exp.GT, exp.GTE, exp.LT, exp.LTE):
+                cols = list(eq.find_all(exp.Column))
+                if any(not c.table for c in cols):
+                    unqualified = True
+                sides = sorted({c.table for c in cols if c.table in parent})
+                for other in sides[1:]:
+                    parent[root(other)] = root(sides[0])
+        groups: dict[str, list[str]] = {}
+        for n in names:
+            groups.setdefault(root(n), []).append(n)
+        if len(groups) > 1 and not unqualified:
+            found.append(" × ".join(", ".join(g) for g in groups.values()))
+    return found
+
+
+def _limitable(sql: str) -> Optional[str]:
+    """``sql`` with a LIMIT added, if it is a plain row listing without one; else None."""
+    import sqlglot
+    from sqlglot import exp
+
+    try:
+        tree = sqlglot.parse_one(sql, read="mysql")
+    except sqlglot.errors.SqlglotError:
+        return None
+    if not isinstance(tree, exp.Select) or tree.args.get("limit"):
+        return None
+    if tree.args.get("group") or tree.args.get("order") or tree.args.get("distinct"):
+        return None  # the server must read everything before the first row anyway
+    if any(isinstance(e.unalias(), exp.AggFunc) or e.find(exp.AggFunc) for e in tree.expressions):
+        return None
+    return tree.limit(PREFLIGHT_AUTO_LIMIT).sql(dialect="mysql")
+
+
+def decide(sql: str, estimate: Optional[PlanEstimate], cartesian: list[str], budget: float = PREFLIGHT_MAX_ROWS_EXAMINED) -> Decision:
+    if cartesian and PREFLIGHT_REJECT_CARTESIAN:
+        reasons = [f"no join condition between {group}: every row is paired with every other row" for group in cartesian]
+        if estimate is not None:
+            reasons.append(f"estimated {estimate.rows_examined:,.0f} rows examined")
+        return Decision(REJECT, sql, reasons, estimate)
+    if estimate is None or estimate.rows_examined <= budget:
+        return Decision(ALLOW, sql, estimate=estimate)
+
+    reasons = [f"estimated {estimate.rows_examined:,.0f} rows examined, budget {budget:,.0f}"]
+    if estimate.full_scans:
+        reasons.append(f"full table scans on {', '.join(dict.fromkeys(estimate.full_scans))}")
+    rewritten = _limitable(sql) if PREFLIGHT_AUTO_LIMIT > 0 else None
+    if rewritten is not None:
+        return Decision(REWRITE, rewritten, reasons, estimate)
+    return Decision(REJECT, sql, reasons, estimate)
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+def _is_select(sql: str) -> bool:
+    head = sql.lstrip(" \t\r\n(").lower()
+    return head.startswith("select") or head.startswith("with")
+
+
+def _explain_sql(sql: str) -> str:
+    return "EXPLAIN FORMAT=JSON " + sql.strip().rstrip(";")
+
+
+def _record(decision: Decision, started: float) -> Decision:
+    elapsed = time.perf_counter() - started
+    metrics.incr("preflight_decisions_total", action=decision.action)
+    metrics.observe("preflight_seconds", elapsed)
+    est = decision.estimate
+    detail = (
+        f"rows_examined={est.rows_examined:,.0f} cost={est.query_cost} full_scans={est.full_scans}" if est else "no plan"
+    )
+    log = logger.info if decision.action == ALLOW else logger.warning
+    reasons = f": {'; '.join(decision.reasons)}" if decision.reasons else ""
+    log(f"Preflight {decision.action} ({elapsed * 1000:.1f} ms) {detail} budget={PREFLIGHT_MAX_ROWS_EXAMINED:,}{reasons}")
+    return decision
+
+
+def _estimate(rows) -> Optional[PlanEstimate]:
+    row = rows.first()
+    return parse_explain(json.loads(row[0])) if row is not None else None
+
+
+def check(conn, sql: str) -> Decision:
+    """Pre-flight ``sql`` on a sync connection."""
+    if not _is_select(sql):
+        return Decision(ALLOW, sql)
+    started = time.perf_counter()
+    estimate = None
+    if conn.dialect.name == "mysql":
+        try:
+            estimate = _estimate(conn.execute(text(_explain_sql(sql))))
+        except Exception as e:
+            # Invalid SQL fails EXPLAIN too; let execution report the real error.
+            logger.debug(f"Preflight EXPLAIN failed: {e}")
+    return _record(decide(sql, estimate, cartesian_joins(sql)), started)
+
+
+async def acheck(conn, sql: str) -> Decision:
+    """Pre-flight ``sql`` on an async connection."""
+    if not _is_select(sql):
+        return Decision(ALLOW, sql)
+    started = time.perf_counter()
+    estimate = None
+    if conn.dialect.name == "mysql":
+        try:
+            estimate = _estimate(await conn.execute(text(_explain_sql(sql))))
+        except Exception as e:
+            logger.debug(f"Preflight EXPLAIN failed: {e}")
+    return _record(decide(sql, estimate, cartesian_joins(sql)), started)
@@ -0,0 +1,287 @@
+"""Process-wide cache of SQL results, shared by every session.
+
+Queries are keyed by their canonical form (see `canonical_sql`), the schema
+version reported by the schema catalog and the row cap, so the same question
+written with different whitespace, aliases or predicate order is answered
+from memory. Entries expire after a TTL, are evicted least-recently-used once
+the byte budget is exceeded and, when QUERY_CACHE_DIR is set, are also written
+to disk so they survive restarts.
+
+Writes made through the shared engines expire only the entries that read the
+written tables; `invalidate_tables` does the same for writes made elsewhere.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from agno.utils.log import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import metrics
+from db.fetch import FetchResult
+from db.sql_text import canonical_sql, referenced_tables
+from settings import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_TTL,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_DIR,
+    QUERY_CACHE_DISK_MAX_BYTES,
+)
+
+_READ_RE = re.compile(r"^\s*(\(\s*)*(select|with)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(r"^\s*(insert|update|delete|replace|truncate|alter|drop|create|rename|load)\b", re.IGNORECASE)
+# Results that change on every execution are never cached. Date functions are
+# allowed: the TTL bounds how stale "today" can get.
+_VOLATILE_RE = re.compile(
+    r"\b(rand|uuid|uuid_short|now|sysdate|current_timestamp|unix_timestamp|connection_id|last_insert_id|found_rows)\s*\(",
+    re.IGNORECASE,
+)
+_INVALIDATIONS_FILE = "invalidations.json"
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    digest: str
+    tables: frozenset[str]
+    # Taken before the query runs, so a write that lands mid-query still invalidates the result.
+    created_at: float = field(default_factory=time.time, compare=False)
+
+
+@dataclass
+class _Entry:
+    result: FetchResult
+    tables: frozenset[str]
+    nbytes: int
+    created_at: float
+
+
+class QueryCache:
+    """TTL + LRU cache of `FetchResult`s with an optional on-disk tier."""
+
+    def __init__(
+        self,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        ttl: float = QUERY_CACHE_TTL,
+        directory: str | os.PathLike | None = QUERY_CACHE_DIR or None,
+        disk_max_bytes: int = QUERY_CACHE_DISK_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._invalidated: dict[str, float] = {}  # table -> time of last write
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_disk_state()
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key_for(sql: str, scope: str = "", version=None, max_rows: int | None = None) -> CacheKey | None:
+        """Cache key for a read-only query, or None when it must not be cached."""
+        if not _READ_RE.match(sql) or _VOLATILE_RE.search(sql):
+            return None
+        tables = referenced_tables(sql)
+        if not tables:
+            return None
+        raw = json.dumps([scope, repr(version), max_rows, canonical_sql(sql)])
+        return CacheKey(digest=hashlib.sha256(raw.encode()).hexdigest()[:32], tables=frozenset(tables))
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get(self, key: CacheKey) -> FetchResult | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key.digest)
+            if entry is not None and not self._is_fresh(entry, now):
+                self._drop_locked(key.digest)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key.digest)
+                metrics.incr("query_cache_hits_total", tier="memory")
+                return entry.result
+
+        entry = self._read_disk(key.digest, now)
+        if entry is None:
+            metrics.incr("query_cache_misses_total")
+            return None
+        with self._lock:
+            self._insert_locked(key.digest, entry)
+        metrics.incr("query_cache_hits_total", tier="disk")
+        return entry.result
+
+    def put(self, key: CacheKey, result: FetchResult) -> None:
+        nbytes = max(result.nbytes, 1)
+        if nbytes > self.max_bytes:
+            return
+        entry = _Entry(result=result, tables=key.tables, nbytes=nbytes, created_at=key.created_at)
+        with self._lock:
+            self._insert_locked(key.digest, entry)
+        self._write_disk(key.digest, entry)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate_tables(self, tables) -> int:
+        """Expire every entry that reads any of ``tables``; returns how many were dropped from memory."""
+        tables = {t.lower() for t in tables}
+        if not tables:
+            return 0
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._invalidated[table] = now
+            stale = [k for k, e in self._entries.items() if e.tables & tables]
+            for digest in stale:
+                self._drop_locked(digest)
+            metrics.set_gauge("query_cache_bytes", self._bytes)
+        # Disk entries are checked lazily against the persisted timestamps.
+        self._save_invalidations()
+        metrics.incr("query_cache_invalidations_total", len(stale))
+        logger.debug(f"Query cache invalidated {len(stale)} entries for {sorted(tables)}")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            metrics.set_gauge("query_cache_bytes", 0)
+        if self.directory is not None:
+            for path in self.directory.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+            with self._lock:
+                self._disk_bytes = 0
+
+    def _is_fresh(self, entry: _Entry, now: float) -> bool:
+        if now - entry.created_at >= self.ttl:
+            return False
+        return all(self._invalidated.get(t, 0.0) < entry.created_at for t in entry.tables)
+
+    def _insert_locked(self, digest: str, entry: _Entry) -> None:
+        self._drop_locked(digest)
+        self._entries[digest] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop_locked(oldest)
+            metrics.incr("query_cache_evictions_total")
+        metrics.set_gauge("query_cache_bytes", self._bytes)
+
+    def _drop_locked(self, digest: str) -> None:
+        old = self._entries.pop(digest, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+    def _load_disk_state(self) -> None:
+        try:
+            self._invalidated = json.loads((self.directory / _INVALIDATIONS_FILE).read_text())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable query cache invalidations: {e}")
+        self._disk_bytes = sum(p.stat().st_size for p in self.directory.glob("*.pkl"))
+
+    def _save_invalidations(self) -> None:
+        if self.directory is None:
+            return
+        with self._lock:
+            payload = json.dumps(self._invalidated)
+        tmp = self.directory / f".{_INVALIDATIONS_FILE}.{uuid.uuid4().hex}"
+        tmp.write_text(payload)
+        os.replace(tmp, self.directory / _INVALIDATIONS_FILE)
+
+    def _read_disk(self, digest: str, now: float) -> _Entry | None:
+        if self.directory is None:
+            return None
+        path = self.directory / f"{digest}.pkl"
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable query cache file {path.name}: {e}")
+            entry = None
+        if entry is None or not self._is_fresh(entry, now):
+            self._unlink(path)
+            return None
+        return entry
+
+    def _write_disk(self, digest: str, entry: _Entry) -> None:
+        if self.directory is None:
+            return
+        path = self.directory / f"{digest}.pkl"
+        tmp = self.directory / f".{digest}.{uuid.uuid4().hex}.tmp"
+        try:
+            with tmp.open("wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = tmp.stat().st_size
+            self._unlink(path)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_bytes += size
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"Failed to write query cache file {path.name}: {e}")
+            return
+        if self._disk_bytes > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = sorted(self.directory.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            if self._disk_bytes <= self.disk_max_bytes:
+                break
+            self._unlink(path)
+            metrics.incr("query_cache_evictions_total", tier="disk")
+
+    def _unlink(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._disk_bytes = max(self._disk_bytes - size, 0)
+
+
+def watch_writes(engine: Engine, cache: "QueryCache | None" = None) -> None:
+    """Invalidate cached reads of every table written through ``engine``.
+
+    Every table a write statement names is invalidated, including the ones an
+    INSERT ... SELECT only reads. A connection whose writes are known to touch
+    fewer tables says so with the ``written_tables`` execution option.
+    """
+
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        if not _WRITE_RE.match(statement):
+            return
+        tables = conn.get_execution_options().get("written_tables")
+        if tables is None:
+            tables = referenced_tables(statement)
+        if tables:
+            (cache or query_cache).invalidate_tables(tables)
+
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+# Process-wide instance; None when QUERY_CACHE_ENABLED is off.
+query_cache: QueryCache | None = QueryCache() if QUERY_CACHE_ENABLED else None
@@ -0,0 +1,107 @@
+"""Per-session cache of query results returned to the agent.
+
+`run_sql_query` stores each complete result here so follow-up tools (e.g.
+`visualize_last_query_results`) can reuse it instead of re-executing the SQL.
+Entries are keyed by (session_id, normalized SQL), stored as compact pandas
+frames and evicted least-recently-used once the byte budget is exceeded.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import metrics
+from db.sql_text import normalize_sql
+from settings import RESULT_CACHE_MAX_BYTES
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Object columns with at most this share of distinct values become categoricals.
+_CATEGORY_RATIO = 0.5
+
+
+@dataclass
+class CachedResult:
+    sql: str
+    frame: "pd.DataFrame"
+    nbytes: int
+    created_at: float
+
+
+def compact_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Downcast numeric columns and dictionary-encode repetitive text columns."""
+    import pandas as pd
+
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="float")
+        elif series.dtype == object and len(series) and series.nunique(dropna=True) <= len(series) * _CATEGORY_RATIO:
+            try:
+                df[col] = series.astype("category")
+            except TypeError:
+                pass  # unhashable values (e.g. JSON columns) stay as objects
+    return df
+
+
+def frame_nbytes(df: "pd.DataFrame") -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ResultCache:
+    """Size-bounded LRU of query result frames, keyed per session."""
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], CachedResult] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, session_id: str | None, sql: str, df: "pd.DataFrame") -> None:
+        frame = compact_frame(df)
+        nbytes = frame_nbytes(frame)
+        if nbytes > self.max_bytes:
+            return
+        key = (session_id or "", normalize_sql(sql))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = CachedResult(sql=sql, frame=frame, nbytes=nbytes, created_at=time.time())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                metrics.incr("result_cache_evictions_total")
+            metrics.set_gauge("result_cache_bytes", self._bytes)
+
+    def get(self, session_id: str | None, sql: str) -> "pd.DataFrame | None":
+        key = (session_id or "", normalize_sql(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.incr("result_cache_misses_total")
+                return None
+            self._entries.move_to_end(key)
+        metrics.incr("result_cache_hits_total")
+        metrics.incr("result_cache_bytes_saved_total", entry.nbytes)
+        return entry.frame
+
+    def clear(self, session_id: str | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                for key in [k for k in self._entries if k[0] == session_id]:
+                    self._bytes -= self._entries.pop(key).nbytes
+            metrics.set_gauge("result_cache_bytes", self._bytes)
+
+
+# Process-wide instance shared by the SQL and visualization tools.
+result_cache = ResultCache()
@@ -0,0 +1,596 @@
+"""Materialized rollups for the hot aggregate query patterns.
+
+Summary tables are declared in knowledge/rollups/*.json, next to the table
+metadata. A declaration names its source (one table, or tables joined with ON
+conditions), dimension expressions and measures that can be re-aggregated:
+
+    {"rollup_name": "rollup_claims_monthly", "source": "claims",
+     "dimensions": {"report_month": "DATE_FORMAT(claims.reported_date, '%Y-%m')", ...},
+     "measures": {"claim_count": ["COUNT(*)", "COUNT(claims.system_id)"]},
+     "partition": {"dimension": "report_month", "column": "claims.reported_date", "lookback_months": 2},
+     "refresh_interval": 600, "max_staleness": 1800}
+
+A measure may list equivalent expressions; the first one computes it.
+
+`RollupManager` materializes each rollup as a table in the queried database
+and refreshes it from a daemon thread every ``refresh_interval`` seconds.
+Partitioned rollups recompute only their last ``lookback_months`` months (the
+partition dimension must sort like its column) and are rebuilt in full every
+ROLLUP_FULL_REFRESH_INTERVAL; the others are rebuilt in full each time.
+Refresh times are kept in the ``rollup_state`` table so every replica sees
+them; on MySQL, GET_LOCK stops two replicas refreshing one rollup at once.
+
+`RollupManager.rewrite` routes an aggregate query to a rollup when the query
+reads the same tables with the same join conditions, groups and filters only
+on rollup dimensions, uses aggregates computable from the rollup's measures,
+and the rollup was refreshed within its ``max_staleness``. For a partitioned
+rollup that is the last full rebuild, unless the query filters the partition
+dimension to the months the last incremental refresh recomputed.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from agno.utils.log import logger
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+import metrics
+from settings import ROLLUP_REFRESH_INTERVAL, ROLLUP_MAX_STALENESS, ROLLUP_FULL_REFRESH_INTERVAL
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parent.parent / "knowledge"
+ROLLUPS_DIR = KNOWLEDGE_DIR / "rollups"
+STATE_TABLE = "rollup_state"
+_POLL_SECONDS = 30
+
+_STATE_DDL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    name VARCHAR(128) PRIMARY KEY,
+    definition_hash VARCHAR(32) NOT NULL,
+    refreshed_at DOUBLE NOT NULL,
+    full_refreshed_at DOUBLE NOT NULL
+)
+"""
+
+
+@dataclass
+class Rollup:
+    """One declared summary table; the index fields are filled by `_index`."""
+
+    name: str
+    source: str
+    dimensions: dict[str, str]
+    measures: dict[str, list[str]]
+    description: str = ""
+    partition: Optional[dict] = None
+    refresh_interval: float = ROLLUP_REFRESH_INTERVAL
+    max_staleness: float = ROLLUP_MAX_STALENESS
+    tables: frozenset = frozenset()
+    joins: frozenset = frozenset()
+    dim_index: dict[str, str] = field(default_factory=dict)  # canonical expression SQL -> column
+    measure_index: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Rollup":
+        return cls(
+            name=data["rollup_name"],
+            source=data["source"],
+            dimensions=dict(data["dimensions"]),
+            measures={k: [v] if isinstance(v, str) else list(v) for k, v in data["measures"].items()},
+            description=data.get("description", ""),
+            partition=data.get("partition"),
+            refresh_interval=float(data.get("refresh_interval", ROLLUP_REFRESH_INTERVAL)),
+            max_staleness=float(data.get("max_staleness", ROLLUP_MAX_STALENESS)),
+        )
+
+    @property
+    def columns(self) -> list[str]:
+        return [*self.dimensions, *self.measures]
+
+    @property
+    def definition_hash(self) -> str:
+        spec = [self.source, self.dimensions, {k: v[0] for k, v in self.measures.items()}]
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    def select_sql(self, where: str = "") -> str:
+        """The aggregate query that computes the rollup's rows."""
+        cols = [f"{expr} AS {name}" for name, expr in self.dimensions.items()]
+        cols += [f"{exprs[0]} AS {name}" for name, exprs in self.measures.items()]
+        sql = f"SELECT {', '.join(cols)} FROM {self.source}"
+        if where:
+            sql += f" WHERE {where}"
+        return sql + f" GROUP BY {', '.join(self.dimensions.values())}"
+
+
+@dataclass
+class RollupState:
+    definition_hash: str
+    refreshed_at: float
+    full_refreshed_at: float
+
+
+@dataclass
+class Rewrite:
+    """A query routed to a rollup, and how old that rollup's data is."""
+
+    rollup: str
+    sql: str
+    age: float
+
+    def note(self) -> str:
+        return f"\n\nNote: answered from the `{self.rollup}` summary table, refreshed {_ago(self.age)} ago."
+
+
+def _ago(seconds: float) -> str:
+    if seconds < 60:
+        return "less than a minute"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def _month_start(months_back: int, today: Optional[date] = None) -> str:
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1).isoformat()
+
+
+def _cutoff(rollup: "Rollup", refreshed_at: Optional[float] = None) -> str:
+    """First day of the months an incremental refresh at ``refreshed_at`` (default: now) recomputes."""
+    today = date.fromtimestamp(refreshed_at) if refreshed_at is not None else None
+    return _month_start(int(rollup.partition.get("lookback_months", 1)), today)
+
+
+def _bucket_sql(rollup: "Rollup", cutoff: str) -> str:
+    """The partition dimension evaluated at ``cutoff``: the first bucket an incremental refresh recomputes."""
+    import sqlglot
+    from sqlglot import exp
+
+    column = rollup.partition["column"].lower()
+    bucket = sqlglot.parse_one(rollup.dimensions[rollup.partition["dimension"]], read="mysql").transform(
+        lambda n: exp.Literal.string(cutoff) if isinstance(n, exp.Column) and n.sql("mysql").lower() == column else n
+    )
+    return bucket.sql("mysql")
+
+
+def internal_tables(directory: Path = ROLLUPS_DIR) -> set[str]:
+    """Tables the rollups own (each declared rollup and the state table), hidden from schema introspection."""
+    names = {STATE_TABLE}
+    for fp in sorted(Path(directory).glob("*.json")) if Path(directory).is_dir() else []:
+        try:
+            names.add(json.loads(fp.read_text())["rollup_name"].lower())
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            continue
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Query matching
+# ---------------------------------------------------------------------------
+class _NoMatch(Exception):
+    """The query cannot be answered from the rollup."""
+
+
+def _load_columns(knowledge_dir: Path) -> dict[str, set[str]]:
+    """Column names per table from knowledge/*.json, to qualify bare column references."""
+    columns: dict[str, set[str]] = {}
+    for fp in sorted(knowledge_dir.glob("*.json")):
+        try:
+            data = json.loads(fp.read_text())
+        except (OSError, json.JSONDecodeError):
+            continue
+        if data.get("table_name"):
+            columns[data["table_name"].lower()] = {c["name"].lower() for c in data.get("table_columns", []) if c.get("name")}
+    return columns
+
+
+def _normalize(select, columns: dict[str, set[str]]) -> tuple[frozenset, frozenset]:
+    """Qualify every column of ``select`` with its lowercase table name, in place.
+
+    Returns the tables read and the join conditions; raises `_NoMatch` for
+    shapes a rollup cannot serve (outer joins, derived tables, self-joins).
+    """
+    from sqlglot import exp
+
+    if not isinstance(select, exp.Select) or not select.args.get("from"):
+        raise _NoMatch("not a plain SELECT")
+    joins = select.args.get("joins") or []
+    for j in joins:
+        if j.args.get("side") or j.args.get("kind") not in (None, "INNER") or j.args.get("using") or not j.args.get("on"):
+            raise _NoMatch("only inner joins with ON conditions")
+    aliases: dict[str, str] = {}
+    for source in [select.args["from"].this] + [j.this for j in joins]:
+        if not isinstance(source, exp.Table) or source.args.get("db"):
+            raise _NoMatch("derived table or other schema")
+        alias = (source.alias or source.name).lower()
+        if alias in aliases:
+            raise _NoMatch("table read twice")
+        aliases[alias] = source.name.lower()
+
+    tables = set(aliases.values())
+    outputs = {p.alias.lower() for p in select.expressions if p.alias}
+    for col in list(select.find_all(exp.Column)):
+        name = col.name.lower()
+        if isinstance(col.this, exp.Star):
+            raise _NoMatch("SELECT *")
+        if col.table:
+            table = aliases.get(col.table.lower())
+            if table is None:
+                raise _NoMatch(f"unknown table {col.table}")
+        else:
+            owners = sorted(t for t in tables if name in columns.get(t, ())) if len(tables) > 1 else sorted(tables)
+            known = any(name in columns.get(t, ()) for t in tables)
+            # MySQL resolves ORDER BY names to output aliases first, GROUP BY / HAVING to columns first.
+            if name in outputs and (col.find_ancestor(exp.Order) or (not known and col.find_ancestor(exp.Group, exp.Having))):
+                continue
+            if len(owners) != 1:
+                raise _NoMatch(f"cannot resolve column {col.name}")
+            table = owners[0]
+        col.set("table", exp.to_identifier(table))
+        col.set("this", exp.to_identifier(name))
+
+    conditions = set()
+    for j in joins:
+        on = j.args["on"]
+        for cond in (on.flatten() if isinstance(on, exp.And) else [on]):
+            if isinstance(cond, exp.EQ):
+                conditions.add(" = ".join(sorted((cond.this.sql("mysql"), cond.expression.sql("mysql")))))
+            else:
+                conditions.add(cond.sql("mysql"))
+    return frozenset(tables), frozenset(conditions)
+
+
+def _filters_from(select, rollup: Rollup, bucket) -> bool:
+    """Whether ``select`` (normalized) keeps only partition buckets at or after ``bucket``."""
+    from sqlglot import exp
+
+    where = select.args.get("where")
+    if where is None or bucket is None:
+        return False
+
+    def at_least(node) -> bool:
+        if not isinstance(node, exp.Literal):
+            return False
+        if isinstance(bucket, str):
+            return node.is_string and node.this >= bucket
+        try:
+            return not node.is_string and float(node.this) >= float(bucket)
+        except ValueError:
+            return False
+
+    cond = where.this.unnest()
+    for c in cond.flatten() if isinstance(cond, exp.And) else [cond]:
+        c = c.unnest()
+        this = c.args.get("this")
+        if this is None or rollup.dim_index.get(this.sql("mysql")) != rollup.partition["dimension"]:
+            continue
+        if isinstance(c, (exp.GTE, exp.GT, exp.EQ)) and at_least(c.expression):
+            return True
+        if isinstance(c, exp.Between) and at_least(c.args.get("low")):
+            return True
+        if isinstance(c, exp.In) and c.expressions and all(at_least(e) for e in c.expressions):
+            return True
+    return False
+
+
+def _index(rollup: Rollup, columns: dict[str, set[str]]) -> None:
+    """Fill the rollup's source signature and expression indexes."""
+    import sqlglot
+
+    exprs = list(rollup.dimensions.values()) + [e for es in rollup.measures.values() for e in es]
+    names = list(rollup.dimensions) + [name for name, es in rollup.measures.items() for _ in es]
+    tree = sqlglot.parse_one(f"SELECT {', '.join(exprs)} FROM {rollup.source}", read="mysql")
+    rollup.tables, rollup.joins = _normalize(tree, columns)
+    for i, (proj, name) in enumerate(zip(tree.expressions, names)):
+        index = rollup.dim_index if i < len(rollup.dimensions) else rollup.measure_index
+        index[proj.sql("mysql")] = name
+
+
+def _aggregate(rollup: Rollup, node):
+    """``node`` (an aggregate over base columns) recomputed from rollup columns."""
+    from sqlglot import exp
+
+    measure = rollup.measure_index.get(node.sql("mysql"))
+    arg = node.this
+    if isinstance(node, exp.Count) and isinstance(arg, exp.Distinct):
+        cols = [rollup.dim_index.get(e.sql("mysql")) for e in arg.expressions]
+        if all(cols):
+            return exp.Count(this=exp.Distinct(expressions=[exp.column(c) for c in cols]))
+    elif isinstance(node, exp.Count) and measure:
+        return exp.func("COALESCE", exp.func("SUM", exp.column(measure)), exp.Literal.number(0))
+    elif isinstance(node, exp.Sum) and measure:
+        return exp.func("SUM", exp.column(measure))
+    elif isinstance(node, (exp.Min, exp.Max)):
+        col = measure or rollup.dim_index.get(arg.sql("mysql"))
+        if col:
+            return node.__class__(this=exp.column(col))
+    elif isinstance(node, exp.Avg):
+        total = rollup.measure_index.get(exp.Sum(this=arg.copy()).sql("mysql"))
+        count = rollup.measure_index.get(exp.Count(this=arg.copy()).sql("mysql"))
+        if total and count:
+            return exp.Div(
+                this=exp.func("SUM", exp.column(total)),
+                expression=exp.func("NULLIF", exp.func("SUM", exp.column(count)), exp.Literal.number(0)),
+            )
+    raise _NoMatch(f"{node.sql('mysql')} cannot be computed from {rollup.name}")
+
+
+def _rewrite(rollup: Rollup, select, output_names: list[str]) -> str:
+    """SQL for ``select`` (already normalized) against the rollup table; raises `_NoMatch`."""
+    from sqlglot import exp
+
+    def substitute(node):
+        if isinstance(node, exp.AggFunc):
+            return _aggregate(rollup, node)
+        if isinstance(node, (exp.Identifier, exp.Literal)):
+            return node
+        col = rollup.dim_index.get(node.sql("mysql"))
+        return exp.column(col) if col else node
+
+    tree = select.copy()
+    tree.set("joins", None)
+    tree.set("from", exp.From(this=exp.to_table(rollup.name)))
+    tree = tree.transform(substitute)
+    allowed = set(rollup.columns) | {n.lower() for n in output_names}
+    for col in tree.find_all(exp.Column):
+        if col.table or col.name not in allowed:
+            raise _NoMatch(f"{col.sql('mysql')} is not a dimension of {rollup.name}")
+    tree.set(
+        "expressions",
+        [exp.alias_(p.unalias(), name, quoted=not name.isidentifier()) for p, name in zip(tree.expressions, output_names)],
+    )
+    return tree.sql(dialect="mysql")
+
+
+# ---------------------------------------------------------------------------
+# Manager
+# ---------------------------------------------------------------------------
+class RollupManager:
+    """Refreshes the declared rollups and routes matching queries to them."""
+
+    def __init__(self, engine: Engine, rollups: list[Rollup], columns: dict[str, set[str]], full_refresh_interval: float = ROLLUP_FULL_REFRESH_INTERVAL):
+        self.engine = engine
+        self.rollups = rollups
+        self.columns = columns
+        self.full_refresh_interval = full_refresh_interval
+        self._table_names = {t for r in rollups for t in r.tables}
+        self._state: dict[str, RollupState] = {}
+        self._failed_at: dict[str, float] = {}
+        self._buckets: dict[str, tuple[str, object]] = {}  # rollup -> (cutoff, first recomputed bucket)
+        self._state_table_ready = False
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_directory(cls, engine: Engine, directory: Path = ROLLUPS_DIR, knowledge_dir: Path = KNOWLEDGE_DIR) -> "RollupManager":
+        columns = _load_columns(knowledge_dir)
+        rollups = []
+        for fp in sorted(Path(directory).glob("*.json")) if Path(directory).is_dir() else []:
+            try:
+                rollup = Rollup.from_json(json.loads(fp.read_text()))
+                _index(rollup, columns)
+            except Exception as e:
+                logger.warning(f"Skipping rollup declaration {fp.name}: {e}")
+                continue
+            rollups.append(rollup)
+        logger.info(f"Loaded {len(rollups)} rollup(s) from {directory}")
+        return cls(engine, rollups, columns)
+
+    # ------------------------------------------------------------------
+    # Rewriting
+    # ------------------------------------------------------------------
+    def age(self, rollup: Rollup, recent: bool = False) -> Optional[float]:
+        """Seconds since the rollup was last rebuilt in full with its current definition.
+
+        With ``recent``, seconds since its last refresh of any kind, which is
+        only the age of the buckets an incremental refresh recomputed.
+        """
+        state = self._state.get(rollup.name)
+        if state is None or state.definition_hash != rollup.definition_hash:
+            return None
+        return max(time.time() - (state.refreshed_at if recent else state.full_refreshed_at), 0.0)
+
+    def _recent_only(self, select, rollup: Rollup) -> bool:
+        """Whether ``select`` reads only buckets the last incremental refresh recomputed."""
+        state = self._state.get(rollup.name)
+        if not rollup.partition or state is None:
+            return False
+        cutoff, bucket = self._buckets.get(rollup.name, (None, None))
+        return cutoff == _cutoff(rollup, state.refreshed_at) and _filters_from(select, rollup, bucket)
+
+    def rewrite(self, sql: str) -> Optional[Rewrite]:
+        """``sql`` routed to the smallest fresh rollup that can answer it, or None."""
+        lowered = sql.lower()
+        if not any(t in lowered for t in self._table_names):
+            return None
+        import sqlglot
+        from sqlglot import exp
+
+        try:
+            select = sqlglot.parse_one(sql, read="mysql")
+        except sqlglot.errors.SqlglotError:
+            return None
+        if not isinstance(select, exp.Select) or select.args.get("with") or select.find(exp.Window):
+            return None
+        if any(isinstance(p, exp.Star) for p in select.expressions):
+            return None
+        if any(s is not select for s in select.find_all(exp.Select)):
+            return None
+        if not select.args.get("group") and not any(p.find(exp.AggFunc) for p in select.expressions):
+            return None  # a row listing: rollup rows are already grouped
+        output_names = [p.alias_or_name if isinstance(p, (exp.Alias, exp.Column)) else p.sql("mysql") for p in select.expressions]
+        try:
+            signature = _normalize(select, self.columns)
+        except _NoMatch:
+            return None
+
+        candidates = []
+        for rollup in self.rollups:
+            if (rollup.tables, rollup.joins) != signature:
+                continue
+            try:
+                candidates.append((len(rollup.dimensions), rollup, _rewrite(rollup, select, output_names)))
+            except _NoMatch as e:
+                logger.debug(f"Rollup {rollup.name} does not match: {e}")
+        for _, rollup, rewritten in sorted(candidates, key=lambda c: c[0]):
+            age = self.age(rollup, recent=self._recent_only(select, rollup))
+            if age is None or age > rollup.max_staleness:
+                metrics.incr("rollup_queries_total", rollup=rollup.name, result="stale")
+                freshness = "never refreshed" if age is None else f"refreshed {_ago(age)} ago"
+                logger.info(f"Rollup {rollup.name} matches but is stale ({freshness}); using base tables")
+                continue
+            metrics.incr("rollup_queries_total", rollup=rollup.name, result="hit")
+            metrics.set_gauge("rollup_age_seconds", age, rollup=rollup.name)
+            logger.info(f"Rollup {rollup.name} answers the query (refreshed {age:.0f}s ago)")
+            return Rewrite(rollup.name, rewritten, age)
+        return None
+
+    # ------------------------------------------------------------------
+    # Refreshing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _read_state(conn) -> dict[str, RollupState]:
+        rows = conn.execute(text(f"SELECT name, definition_hash, refreshed_at, full_refreshed_at FROM {STATE_TABLE}"))
+        return {r[0]: RollupState(r[1], float(r[2]), float(r[3])) for r in rows}
+
+    def refresh(self, rollup: Rollup, full: bool = False) -> bool:
+        """Refresh one rollup; False when another replica holds its lock."""
+        started = time.perf_counter()
+        is_mysql = self.engine.dialect.name == "mysql"
+        # The refresh reads the source tables but writes only these; cached reads of the sources stay valid.
+        with self.engine.connect().execution_options(written_tables={rollup.name, STATE_TABLE}) as conn:
+            if is_mysql and not conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": f"rollup:{rollup.name}"}).scalar():
+                return False
+            try:
+                with conn.begin():
+                    state = self._read_state(conn).get(rollup.name)
+                    exists = inspect(conn).has_table(rollup.name)
+                    redefined = state is None or state.definition_hash != rollup.definition_hash
+                    full = full or redefined or not exists or not rollup.partition
+                    if exists and redefined:
+                        conn.execute(text(f"DROP TABLE {rollup.name}"))
+                        exists = False
+                    if not exists:
+                        conn.execute(text(f"CREATE TABLE {rollup.name} AS {rollup.select_sql()}"))
+                    elif full:
+                        conn.execute(text(f"DELETE FROM {rollup.name}"))
+                        conn.execute(text(f"INSERT INTO {rollup.name} ({', '.join(rollup.columns)}) {rollup.select_sql()}"))
+                    else:
+                        self._refresh_partitions(conn, rollup)
+                    now = time.time()
+                    new_state = RollupState(rollup.definition_hash, now, now if full else state.full_refreshed_at)
+                    conn.execute(text(f"DELETE FROM {STATE_TABLE} WHERE name = :name"), {"name": rollup.name})
+                    conn.execute(
+                        text(f"INSERT INTO {STATE_TABLE} VALUES (:name, :hash, :refreshed, :full)"),
+                        {"name": rollup.name, "hash": new_state.definition_hash, "refreshed": new_state.refreshed_at, "full": new_state.full_refreshed_at},
+                    )
+            finally:
+                if is_mysql:
+                    conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": f"rollup:{rollup.name}"})
+        self._state[rollup.name] = new_state
+        elapsed = time.perf_counter() - started
+        mode = "full" if full else "incremental"
+        metrics.incr("rollup_refreshes_total", rollup=rollup.name, mode=mode)
+        metrics.observe("rollup_refresh_seconds", elapsed, rollup=rollup.name)
+        logger.info(f"Rollup {rollup.name} refreshed ({mode}) in {elapsed * 1000:.0f} ms")
+        return True
+
+    @staticmethod
+    def _refresh_partitions(conn, rollup: Rollup) -> None:
+        """Recompute the rollup rows for the last ``lookback_months`` months of the partition column."""
+        part = rollup.partition
+        cutoff = _cutoff(rollup)
+        conn.execute(text(f"DELETE FROM {rollup.name} WHERE {part['dimension']} >= {_bucket_sql(rollup, cutoff)}"))
+        where = f"{part['column']} >= :cutoff"
+        conn.execute(text(f"INSERT INTO {rollup.name} ({', '.join(rollup.columns)}) {rollup.select_sql(where=where)}"), {"cutoff": cutoff})
+
+    def refresh_due(self) -> None:
+        """Refresh every rollup whose ``refresh_interval`` has passed."""
+        with self._lock:
+            with self.engine.connect().execution_options(written_tables={STATE_TABLE}) as conn, conn.begin():
+                if not self._state_table_ready:
+                    conn.execute(text(_STATE_DDL))
+                self._state = self._read_state(conn)
+            self._state_table_ready = True
+            now = time.time()
+            for rollup in self.rollups:
+                age = self.age(rollup, recent=True)
+                if age is not None and age < rollup.refresh_interval:
+                    continue
+                if now - self._failed_at.get(rollup.name, 0.0) < rollup.refresh_interval:
+                    continue
+                state = self._state.get(rollup.name)
+                full = state is None or now - state.full_refreshed_at >= self.full_refresh_interval
+                try:
+                    self.refresh(rollup, full=full)
+                except Exception as e:
+                    self._failed_at[rollup.name] = now
+                    metrics.incr("rollup_refresh_errors_total", rollup=rollup.name)
+                    logger.warning(f"Rollup {rollup.name} refresh failed: {e}")
+            self._load_buckets()
+
+    def _load_buckets(self) -> None:
+        """Evaluate the first bucket each partitioned rollup's last refresh recomputed, once per cutoff."""
+        due = []
+        for rollup in self.rollups:
+            state = self._state.get(rollup.name)
+            if rollup.partition and state is not None:
+                cutoff = _cutoff(rollup, state.refreshed_at)
+                if self._buckets.get(rollup.name, (None, None))[0] != cutoff:
+                    due.append((rollup, cutoff))
+        if not due:
+            return
+        try:
+            with self.engine.connect() as conn:
+                for rollup, cutoff in due:
+                    self._buckets[rollup.name] = (cutoff, conn.execute(text(f"SELECT {_bucket_sql(rollup, cutoff)}")).scalar())
+        except Exception as e:
+            logger.warning(f"Rollup partition buckets could not be evaluated: {e}")
+
+    def start(self) -> None:
+        """Start the background refresher (idempotent); the first pass runs immediately."""
+        if not self.rollups or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rollup-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.warning(f"Rollup refresh pass failed: {e}")
+            if self._stop.wait(_POLL_SECONDS):
+                return
+
+    def stats(self) -> dict:
+        return {r.name: {"age_seconds": self.age(r), "max_staleness": r.max_staleness} for r in self.rollups}
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+_MANAGERS: dict[str, RollupManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def get_rollup_manager(engine: Engine) -> RollupManager:
+    """Return the shared rollup manager for this engine's database, starting its refresher."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.get(key)
+        if manager is None:
+            manager = RollupManager.from_directory(engine)
+            manager.start()
+            _MANAGERS[key] = manager
+        return manager
@@ -0,0 +1,116 @@
+"""Row counts for the introspect_schema table listing.
+
+Three modes, picked with ROW_COUNT_MODE:
+
+- ``estimated``: one query against information_schema.TABLES (InnoDB statistics).
+- ``exact``: ``SELECT COUNT(*)`` per table, run in parallel on a bounded pool.
+- ``cached``: exact counts kept per table for ROW_COUNT_TTL seconds.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agno.utils.log import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DatabaseError, OperationalError
+
+from settings import ROW_COUNT_MODE, ROW_COUNT_TTL, ROW_COUNT_WORKERS
+
+ROW_COUNT_MODES = ("estimated", "exact", "cached")
+
+_MYSQL_ESTIMATES_SQL = """
+SELECT TABLE_NAME, TABLE_ROWS
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+
+@dataclass(frozen=True)
+class RowCount:
+    count: int | None
+    exact: bool
+
+    def label(self) -> str:
+        if self.count is None:
+            return ""
+        if self.exact:
+            return f"{self.count:,} rows, exact"
+        return f"~{self.count:,} rows, estimated"
+
+
+class RowCountProvider:
+    """Return row counts for many tables without an N+1 sequence of full scans."""
+
+    def __init__(self, engine: Engine, mode: str = ROW_COUNT_MODE, ttl: int = ROW_COUNT_TTL, max_workers: int = ROW_COUNT_WORKERS):
+        if mode not in ROW_COUNT_MODES:
+            raise ValueError(f"Unknown row count mode '{mode}'. Expected one of: {', '.join(ROW_COUNT_MODES)}")
+        self.engine = engine
+        self.mode = mode
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="row-count")
+        self._cache: dict[str, tuple[RowCount, float]] = {}
+        self._lock = threading.Lock()
+
+    def counts(self, tables: list[str]) -> dict[str, RowCount]:
+        if self.mode == "estimated":
+            return self._estimated(tables)
+        if self.mode == "cached":
+            return self._cached(tables)
+        return self._exact(tables)
+
+    def invalidate(self, table: str | None = None) -> None:
+        with self._lock:
+            if table is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(table, None)
+
+    # ------------------------------------------------------------------
+    # Modes
+    # ------------------------------------------------------------------
+    def _estimated(self, tables: list[str]) -> dict[str, RowCount]:
+        if self.engine.dialect.name != "mysql":
+            # Table statistics are MySQL-specific; other dialects get exact counts.
+            return self._exact(tables)
+        try:
+            with self.engine.connect() as conn:
+                stats = {name: rows for name, rows in conn.execute(text(_MYSQL_ESTIMATES_SQL))}
+        except (OperationalError, DatabaseError) as e:
+            logger.warning(f"Failed to read table statistics: {e}")
+            stats = {}
+        # Views have no TABLE_ROWS; leave them uncounted rather than scanning them.
+        return {t: RowCount(int(stats[t]) if stats.get(t) is not None else None, exact=False) for t in tables}
+
+    def _exact(self, tables: list[str]) -> dict[str, RowCount]:
+        return dict(zip(tables, self._pool.map(self._count_one, tables)))
+
+    def _cached(self, tables: list[str]) -> dict[str, RowCount]:
+        now = time.monotonic()
+        result: dict[str, RowCount] = {}
+        stale: list[str] = []
+        with self._lock:
+            for t in tables:
+                entry = self._cache.get(t)
+                if entry is not None and now - entry[1] < self.ttl:
+                    result[t] = entry[0]
+                else:
+                    stale.append(t)
+
+        fresh = self._exact(stale)
+        with self._lock:
+            for t, rc in fresh.items():
+                if rc.count is not None:
+                    self._cache[t] = (rc, now)
+        result.update(fresh)
+        return result
+
+    def _count_one(self, table: str) -> RowCount:
+        try:
+            with self.engine.connect() as conn:
+                count = conn.execute(text(f'SELECT COUNT(*) FROM `{table}`')).scalar()
+                return RowCount(int(count), exact=True)
+        except (OperationalError, DatabaseError) as e:
+            logger.warning(f"Failed to count rows in {table}: {e}")
+            return RowCount(None, exact=True)
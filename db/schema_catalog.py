@@ -0,0 +1,202 @@
+"""Process-wide schema catalog.
+
+Reflects every table and view once, keeps the result in memory and serves it
+to all sessions. A daemon thread re-checks a cheap schema fingerprint every
+poll interval and reloads the catalog when the fingerprint changes or the TTL
+expires, so `introspect_schema` never pays information_schema round-trips on
+the request path. The rollup tables are left out: the model must query the
+base tables, which `db.rollups` rewrites with a freshness check.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+from agno.utils.log import logger
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.reflection import ObjectKind
+
+import metrics
+from db.rollups import internal_tables
+from settings import SCHEMA_CATALOG_TTL, SCHEMA_CATALOG_POLL_INTERVAL
+
+# Order-independent checksum over every column definition in the current
+# schema. One row, no GROUP_CONCAT truncation, cheap enough to poll.
+_MYSQL_SCHEMA_VERSION_SQL = """
+SELECT COUNT(*),
+       COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE,
+                                    IS_NULLABLE, COLUMN_KEY, ORDINAL_POSITION))), 0)
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+
+@dataclass
+class TableInfo:
+    """Reflected metadata for one table or view, plus its rendered markdown."""
+
+    name: str
+    is_view: bool
+    columns: list[dict] = field(default_factory=list)
+    primary_key: list[str] = field(default_factory=list)
+    markdown: str = ""
+
+
+def _render_markdown(info: TableInfo) -> str:
+    lines = [f"## {info.name}", ""]
+
+    if info.columns:
+        lines.extend(["### Columns", "", "| Column | Type | Nullable |", "| --- | --- | --- |"])
+        for c in info.columns:
+            nullable = "Yes" if c.get("nullable", True) else "No"
+            lines.append(f"| {c['name']} | {c['type']} | {nullable} |")
+        lines.append("")
+
+    if info.primary_key:
+        lines.append(f"**Primary Key:** {', '.join(info.primary_key)}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+class SchemaCatalog:
+    """In-memory snapshot of the database schema with background refresh."""
+
+    def __init__(self, engine: Engine, ttl: int = SCHEMA_CATALOG_TTL, poll_interval: int = SCHEMA_CATALOG_POLL_INTERVAL, hidden: set[str] | None = None):
+        self.engine = engine
+        self.hidden = internal_tables() if hidden is None else {name.lower() for name in hidden}
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._tables: dict[str, TableInfo] | None = None
+        self._version: tuple | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def tables(self) -> dict[str, TableInfo]:
+        """Return all tables and views, loading the catalog on first use."""
+        tables = self._tables
+        if tables is not None:
+            metrics.incr("schema_catalog_hits_total")
+            return tables
+        metrics.incr("schema_catalog_misses_total")
+        return self.refresh()
+
+    @property
+    def version(self) -> tuple | None:
+        """Fingerprint of the loaded schema (None for dialects without one)."""
+        if self._tables is None:
+            self.refresh()  # a cache-key lookup, not a catalog read: not counted as a hit or miss
+        return self._version
+
+    def names(self) -> list[str]:
+        return sorted(self.tables())
+
+    def get(self, table_name: str) -> TableInfo | None:
+        """Return one table, re-checking the schema version if it is unknown."""
+        info = self.tables().get(table_name)
+        if info is not None:
+            return info
+        # The model may be asking about a table created after the last load.
+        metrics.incr("schema_catalog_misses_total")
+        if self._read_version() != self._version:
+            return self.refresh().get(table_name)
+        return None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def refresh(self) -> dict[str, TableInfo]:
+        """Reflect the whole schema and swap it in atomically."""
+        with self._lock:
+            version = self._read_version()
+            insp = inspect(self.engine)
+            view_names = set(insp.get_view_names())
+            columns = insp.get_multi_columns(kind=ObjectKind.ANY)
+            pks = insp.get_multi_pk_constraint(kind=ObjectKind.ANY)
+
+            tables: dict[str, TableInfo] = {}
+            for (_schema, name), cols in columns.items():
+                if name.lower() in self.hidden:
+                    continue
+                pk = pks.get((_schema, name)) or {}
+                info = TableInfo(
+                    name=name,
+                    is_view=name in view_names,
+                    columns=[{"name": c["name"], "type": str(c["type"]), "nullable": c.get("nullable", True)} for c in cols],
+                    primary_key=list(pk.get("constrained_columns") or []),
+                )
+                info.markdown = _render_markdown(info)
+                tables[name] = info
+
+            self._tables = tables
+            self._version = version
+            self._loaded_at = time.monotonic()
+            metrics.incr("schema_catalog_refreshes_total")
+            logger.info(f"Schema catalog loaded {len(tables)} tables/views")
+            return tables
+
+    def _read_version(self) -> tuple | None:
+        """Cheap schema fingerprint; None when the dialect has no support for it."""
+        if self.engine.dialect.name != "mysql":
+            return None
+        with self.engine.connect() as conn:
+            return tuple(conn.execute(text(_MYSQL_SCHEMA_VERSION_SQL)).one())
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the background refresher (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="schema-catalog-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self._tables is None:
+                continue
+            try:
+                expired = time.monotonic() - self._loaded_at >= self.ttl
+                if expired or self._read_version() != self._version:
+                    self.refresh()
+            except Exception as e:
+                metrics.incr("schema_catalog_refresh_errors_total")
+                logger.warning(f"Schema catalog refresh failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "hits": metrics.get_counter("schema_catalog_hits_total"),
+            "misses": metrics.get_counter("schema_catalog_misses_total"),
+            "refreshes": metrics.get_counter("schema_catalog_refreshes_total"),
+            "tables": len(self._tables or {}),
+            "age_seconds": time.monotonic() - self._loaded_at if self._tables is not None else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+_CATALOGS: dict[str, SchemaCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_schema_catalog(engine: Engine) -> SchemaCatalog:
+    """Return the shared catalog for this engine's database, starting its refresher."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(key)
+        if catalog is None:
+            catalog = SchemaCatalog(engine)
+            catalog.start()
+            _CATALOGS[key] = catalog
+        return catalog
@@ -0,0 +1,100 @@
+"""Helpers for turning model-written SQL into stable cache keys.
+
+sqlglot is imported on first parse; `normalize_sql` needs only the regex tokenizer.
+"""
+import re
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)      # comments are dropped
+    | (?P<string>'(?:[^'\\]|\\.|'')*')   # string literals keep their case
+    | (?P<quoted>`[^`]*`|"[^"]*")        # quoted identifiers keep their case
+    | (?P<space>\s+)
+    | (?P<other>[^'"`\s\-/]+|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace, drop comments and trailing semicolons, lowercase unquoted text.
+
+    Two queries that differ only in formatting normalize to the same string;
+    string literals and quoted identifiers are left untouched.
+    """
+    parts: list[str] = []
+    pending_space = False
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup
+        if kind in ("comment", "space"):
+            pending_space = bool(parts)
+            continue
+        if pending_space:
+            parts.append(" ")
+            pending_space = False
+        token = m.group()
+        parts.append(token if kind in ("string", "quoted") else token.lower())
+    return "".join(parts).rstrip("; ")
+
+
+def _parse(sql: str):
+    import sqlglot
+
+    try:
+        return sqlglot.parse_one(sql, read="mysql")
+    except sqlglot.errors.SqlglotError:
+        return None
+
+
+def canonical_sql(sql: str) -> str:
+    """Canonical form of a query for result caching.
+
+    On top of `normalize_sql`, table aliases are replaced by table names,
+    literal IN lists are sorted and top-level AND predicates are ordered, so
+    queries that differ only in aliasing or predicate order share a key.
+    Falls back to `normalize_sql` when the statement does not parse.
+    """
+    tree = _parse(sql)
+    if tree is None:
+        return normalize_sql(sql)
+    from sqlglot import exp
+
+    tables = list(tree.find_all(exp.Table))
+    names = [t.name for t in tables]
+    aliases = {t.alias for t in tables if t.alias}
+    # Only safe when each table appears once and no alias shadows a table name.
+    if len(names) == len(set(names)) and not aliases & set(names):
+        mapping = {}
+        for t in tables:
+            if t.alias:
+                mapping[t.alias] = t.name
+                t.set("alias", None)
+        for col in tree.find_all(exp.Column):
+            if col.table in mapping:
+                col.set("table", exp.to_identifier(mapping[col.table]))
+        # With a single table and no subqueries, qualifiers carry no meaning.
+        if len(names) == 1 and len(list(tree.find_all(exp.Select))) == 1:
+            for col in tree.find_all(exp.Column):
+                col.set("table", None)
+
+    for node in tree.find_all(exp.In):
+        values = node.expressions
+        if values and all(isinstance(v, exp.Literal) for v in values):
+            node.set("expressions", sorted(values, key=lambda v: v.sql()))
+
+    for where in tree.find_all(exp.Where):
+        if isinstance(where.this, exp.And):
+            conjuncts = sorted(where.this.flatten(), key=lambda c: c.sql(dialect="mysql"))
+            where.set("this", exp.and_(*conjuncts))
+
+    return tree.sql(dialect="mysql")
+
+
+def referenced_tables(sql: str) -> set[str] | None:
+    """Base tables a query reads (CTE names excluded), or None if it does not parse."""
+    tree = _parse(sql)
+    if tree is None:
+        return None
+    from sqlglot import exp
+    ctes = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    return {t.name.lower() for t in tree.find_all(exp.Table) if t.name and t.name.lower() not in ctes}
@@ -0,0 +1,63 @@
+"""Knowledge bases whose vector tables are created on first use.
+
+`Knowledge()` checks for (and creates) its PgVector table as soon as it is
+constructed, so importing the agent needed a live Postgres connection and paid
+two round-trips per knowledge base. Here the check runs once, on the first
+search or write, so the agent module imports without touching the database.
+Searches and writes are traced as ``vector`` spans, their statements as ``db``.
+"""
+import asyncio
+
+from agno.knowledge.knowledge import Knowledge
+from agno.vectordb.pgvector import PgVector
+
+import tracing
+
+
+class DeferredPgVector(PgVector):
+    """PgVector that creates its table on first search or write instead of at construction."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._table_ready = False
+        tracing.instrument_engine(self.db_engine, "pgvector")
+
+    def ensure_table(self) -> None:
+        # Racing first calls are harmless: create() is a no-op once the table exists.
+        if not self._table_ready:
+            self.create()
+            self._table_ready = True
+
+    def search(self, *args, **kwargs):
+        self.ensure_table()
+        with tracing.span(self.table_name, "vector", op="search"):
+            return super().search(*args, **kwargs)
+
+    def insert(self, *args, **kwargs):
+        self.ensure_table()
+        with tracing.span(self.table_name, "vector", op="insert"):
+            return super().insert(*args, **kwargs)
+
+    async def async_insert(self, *args, **kwargs):
+        await asyncio.to_thread(self.ensure_table)
+        with tracing.span(self.table_name, "vector", op="insert"):
+            return await super().async_insert(*args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        self.ensure_table()
+        with tracing.span(self.table_name, "vector", op="upsert"):
+            return super().upsert(*args, **kwargs)
+
+    async def async_upsert(self, *args, **kwargs):
+        await asyncio.to_thread(self.ensure_table)
+        with tracing.span(self.table_name, "vector", op="upsert"):
+            return await super().async_upsert(*args, **kwargs)
+
+
+class DeferredKnowledge(Knowledge):
+    """Knowledge that leaves table creation to its `DeferredPgVector`."""
+
+    def __post_init__(self):
+        if self.page_store is not None:
+            return super().__post_init__()
+        self.construct_readers()
@@ -0,0 +1,135 @@
+"""In-process metrics shared by the agent's tools and database helpers.
+
+Counters, gauges and histograms are keyed by name plus optional labels so
+callers can record e.g. ``incr("schema_catalog_hits_total")`` without any setup.
+`render_prometheus` exports everything in the Prometheus text format.
+"""
+import threading
+from collections import defaultdict
+
+from agno.utils.log import logger
+
+_LOCK = threading.Lock()
+_COUNTERS: dict[tuple, float] = defaultdict(float)
+_GAUGES: dict[tuple, float] = {}
+_HISTOGRAMS: dict[tuple, dict] = {}
+_COLLECTORS: list = []
+
+# Latency buckets in seconds, from sub-millisecond pool checkouts to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+def incr(name: str, value: float = 1.0, **labels) -> None:
+    """Increment a monotonically increasing counter."""
+    with _LOCK:
+        _COUNTERS[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge to an absolute value."""
+    with _LOCK:
+        _GAUGES[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation in a cumulative-bucket histogram."""
+    with _LOCK:
+        hist = _HISTOGRAMS.get(_key(name, labels))
+        if hist is None:
+            hist = {"buckets": dict.fromkeys(DEFAULT_BUCKETS, 0), "count": 0, "sum": 0.0}
+            _HISTOGRAMS[_key(name, labels)] = hist
+        for bound in DEFAULT_BUCKETS:
+            if value <= bound:
+                hist["buckets"][bound] += 1
+        hist["count"] += 1
+        hist["sum"] += value
+
+
+def get_counter(name: str, **labels) -> float:
+    with _LOCK:
+        return _COUNTERS.get(_key(name, labels), 0.0)
+
+
+def snapshot() -> dict:
+    """Return a copy of every metric as ``{"counters", "gauges", "histograms"}``."""
+    with _LOCK:
+        return {
+            "counters": dict(_COUNTERS),
+            "gauges": dict(_GAUGES),
+            "histograms": {k: {**v, "buckets": dict(v["buckets"])} for k, v in _HISTOGRAMS.items()},
+        }
+
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition
+# ---------------------------------------------------------------------------
+def register_collector(fn) -> None:
+    """Call ``fn()`` before every `render_prometheus`, e.g. to set gauges read at scrape time."""
+    _COLLECTORS.append(fn)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple, extra: tuple = ()) -> str:
+    items = [*labels, *extra]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}" if items else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def hit_ratios(counters: dict) -> dict[str, float]:
+    """``<cache>_hit_ratio`` for every ``<cache>_hits_total`` with a matching ``<cache>_misses_total``."""
+    totals: dict[str, float] = defaultdict(float)
+    for (name, _), value in counters.items():
+        totals[name] += value
+    ratios = {}
+    for name, hits in totals.items():
+        if not name.endswith("_hits_total"):
+            continue
+        misses = totals.get(name[: -len("_hits_total")] + "_misses_total")
+        if misses is not None and hits + misses:
+            ratios[name[: -len("_hits_total")] + "_hit_ratio"] = hits / (hits + misses)
+    return ratios
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    for collect in list(_COLLECTORS):
+        try:
+            collect()
+        except Exception as e:
+            logger.warning(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+    snap = snapshot()
+    gauges = dict(snap["gauges"])
+    gauges.update({(name, ()): ratio for name, ratio in hit_ratios(snap["counters"]).items()})
+
+    lines: list[str] = []
+    for kind, series in (("counter", snap["counters"]), ("gauge", gauges)):
+        by_name: dict[str, list] = defaultdict(list)
+        for (name, labels), value in series.items():
+            by_name[name].append((labels, value))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in sorted(by_name[name], key=lambda item: str(item[0]))]
+
+    by_name = defaultdict(list)
+    for (name, labels), hist in snap["histograms"].items():
+        by_name[name].append((labels, hist))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, hist in sorted(by_name[name], key=lambda item: str(item[0])):
+            # observe() already counts each value in every bucket at or above it.
+            for bound, count in hist["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(labels, (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {hist['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(hist['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,239 @@
+"""Offline end-to-end benchmark of the SQL agent.
+
+Runs the real agent (hooks, history compaction, fast path, every tool) with
+its external services replaced by local stand-ins:
+
+- the insurance database: a synthetic SQLite file (scripts/synthetic_db.py)
+  with MySQL date/string functions registered on every connection;
+- the vector store and embeddings: `LocalVectorDb` with the deterministic
+  local embedder, loaded from knowledge/ by the ingestion pipeline;
+- the LLM: `ScriptedResponses`, replaying the tool calls recorded in
+  scripts/benchmark_traces.json (with an optional fixed delay per call).
+
+N concurrent sessions each replay the whole trace corpus. The report has
+p50/p95 latency per turn and per tool, throughput and peak RSS; it is compared
+against a stored baseline and the script exits 1 on a regression.
+
+    python scripts/benchmark.py --rows 100000 --sessions 8 --save-baseline
+    python scripts/benchmark.py --rows 100000 --sessions 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+WORK_DIR = PROJECT_ROOT / ".cache" / "benchmark"
+DEFAULT_TRACES = Path(__file__).resolve().parent / "benchmark_traces.json"
+DEFAULT_BASELINE = WORK_DIR / "baseline.json"
+TOOLS = ("run_sql_query", "introspect_schema", "search_context", "visualize_last_query_results", "save_validated_query")
+# Latency differences below this are noise, whatever the relative change.
+NOISE_FLOOR_MS = 5.0
+# Below this many samples (in the run or the baseline) a p95 is one or two outliers, so only p50 is compared.
+MIN_P95_SAMPLES = 40
+
+
+def _configure(db_path: Path, query_cache: bool) -> None:
+    """Point the settings at the local stand-ins; must run before any project import."""
+    os.environ.update(
+        {
+            "MYSQL_URL": f"sqlite:///{db_path}",
+            "MYSQL_ASYNC_URL": f"sqlite+aiosqlite:///{db_path}",
+            "EMBEDDER": "local",
+            "EMBEDDING_CACHE_BACKEND": "memory",
+            "QUERY_CACHE_ENABLED": "true" if query_cache else "false",
+            "QUERY_CACHE_DIR": "",
+        }
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")  # never used; silences the embedder warning
+
+
+def _setup(args):
+    """Build the database, swap in the stand-ins and return the agent."""
+    from synthetic_db import build, install_mysql_functions
+
+    db_path = WORK_DIR / f"synthetic_{args.rows}.db"
+    build(db_path, args.rows, args.seed)
+    _configure(db_path, args.query_cache)
+    install_mysql_functions()
+
+    from agno.db.in_memory import InMemoryDb
+
+    from benchmark_fakes import LocalVectorDb, ScriptedResponses, Trace
+    from db.config import sql_agent_knowledge, sql_agent_learnings
+    from db.ingest import IngestionPipeline
+    from text2sql_agent.fast_path import normalize_question
+
+    vectors = WORK_DIR / "vectors.db"
+    vectors.unlink(missing_ok=True)
+    for kb in (sql_agent_knowledge, sql_agent_learnings):
+        kb.vector_db = LocalVectorDb(vectors, kb.vector_db.table_name, kb.vector_db.embedder)
+        kb.contents_db = None
+        kb.vector_db.create()
+    print(f"knowledge: {IngestionPipeline(sql_agent_knowledge).ingest_path(PROJECT_ROOT / 'knowledge')}")
+
+    # The tools bind the knowledge bases when the agent module is imported.
+    from text2sql_agent.agent import sql_agent
+
+    traces = Trace.load_all(args.traces)
+    current = sql_agent.model
+    sql_agent.model = ScriptedResponses(
+        id=current.id,
+        saved_queries=getattr(current, "saved_queries", None),
+        history_compactor=current.history_compactor,
+        traces={normalize_question(t.question): t for t in traces},
+        latency_ms=args.model_latency_ms,
+    )
+    sql_agent.db = InMemoryDb()
+    return sql_agent, traces
+
+
+# ---------------------------------------------------------------------------
+# Run
+# ---------------------------------------------------------------------------
+async def _session(agent, traces, session_id: str, repeat: int, samples: dict) -> int:
+    """Replay the corpus ``repeat`` times in one session; returns the number of failed turns."""
+    failures = 0
+    for _ in range(repeat):
+        for trace in traces:
+            start = time.perf_counter()
+            run = await agent.arun(trace.question, session_id=session_id, user_id="benchmark")
+            samples["turn"].append((time.perf_counter() - start) * 1000)
+            if getattr(run.status, "value", run.status) == "ERROR":
+                failures += 1
+            for execution in run.tools or []:
+                duration = execution.metrics.duration if execution.metrics else None
+                if duration is not None:
+                    samples.setdefault(execution.tool_name, []).append(duration * 1000)
+    return failures
+
+
+async def _run(agent, traces, sessions: int, repeat: int, prefix: str) -> tuple[dict, int, float]:
+    samples: dict[str, list[float]] = {"turn": []}
+    start = time.perf_counter()
+    failures = await asyncio.gather(*(_session(agent, traces, f"{prefix}-{i}", repeat, samples) for i in range(sessions)))
+    return samples, sum(failures), time.perf_counter() - start
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def summarize(samples: dict, failures: int, elapsed: float, config: dict) -> dict:
+    latency = {
+        name: {"count": len(values), "p50": _percentile(values, 0.50), "p95": _percentile(values, 0.95)}
+        for name, values in samples.items()
+        if values
+    }
+    # ru_maxrss is KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "config": config,
+        "latency_ms": latency,
+        "turns_per_second": len(samples["turn"]) / elapsed if elapsed else 0.0,
+        "failed_turns": failures,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of ``current`` against ``baseline`` beyond ``tolerance`` (a fraction)."""
+    problems = []
+    if current["config"] != baseline.get("config"):
+        problems.append(f"config differs from baseline ({baseline.get('config')}); re-run with --save-baseline")
+        return problems
+    for name, now in current["latency_ms"].items():
+        before = baseline["latency_ms"].get(name)
+        if not before:
+            continue
+        stats = ("p50", "p95") if min(now["count"], before.get("count", 0)) >= MIN_P95_SAMPLES else ("p50",)
+        for stat in stats:
+            limit = before[stat] * (1 + tolerance)
+            if now[stat] > limit and now[stat] - before[stat] > NOISE_FLOOR_MS:
+                problems.append(f"{name} {stat} {now[stat]:.1f} ms > {before[stat]:.1f} ms baseline (+{tolerance:.0%})")
+    if current["turns_per_second"] < baseline["turns_per_second"] * (1 - tolerance):
+        problems.append(f"throughput {current['turns_per_second']:.2f} turns/s < {baseline['turns_per_second']:.2f} baseline (-{tolerance:.0%})")
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        problems.append(f"peak RSS {current['peak_rss_mb']:.0f} MB > {baseline['peak_rss_mb']:.0f} MB baseline (+{tolerance:.0%})")
+    if current["failed_turns"] > baseline.get("failed_turns", 0):
+        problems.append(f"{current['failed_turns']} failed turns (baseline {baseline.get('failed_turns', 0)})")
+    return problems
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    print(f"\n{'':32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'base p95':>10}")
+    for name in ("turn", *TOOLS, *sorted(set(result["latency_ms"]) - {"turn", *TOOLS})):
+        stats = result["latency_ms"].get(name)
+        if not stats:
+            continue
+        base = (baseline or {}).get("latency_ms", {}).get(name)
+        base_p95 = f"{base['p95']:10.1f}" if base else f"{'-':>10}"
+        print(f"{name:32}{stats['count']:7d}{stats['p50']:10.1f}{stats['p95']:10.1f}{base_p95}")
+    print(f"\nthroughput: {result['turns_per_second']:.2f} turns/s   peak RSS: {result['peak_rss_mb']:.0f} MB   failed turns: {result['failed_turns']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="approximate rows in the synthetic database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the trace corpus per session")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured passes (one session) before the run")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="simulated provider latency per model call")
+    parser.add_argument("--query-cache", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--traces", type=Path, default=DEFAULT_TRACES)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    WORK_DIR.mkdir(parents=True, exist_ok=True)
+    agent, traces = _setup(args)
+    config = {
+        "rows": args.rows,
+        "seed": args.seed,
+        "sessions": args.sessions,
+        "repeat": args.repeat,
+        "warmup": args.warmup,
+        "model_latency_ms": args.model_latency_ms,
+        "query_cache": args.query_cache,
+        "traces": len(traces),
+    }
+
+    async def run():
+        if args.warmup:
+            await _run(agent, traces, 1, args.warmup, "warmup")
+        return await _run(agent, traces, args.sessions, args.repeat, "bench")
+
+    samples, failures, elapsed = asyncio.run(run())
+    result = summarize(samples, failures, elapsed, config)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    print_report(result, baseline)
+
+    if args.save_baseline:
+        if args.baseline.exists():
+            shutil.copy(args.baseline, args.baseline.with_suffix(".previous.json"))
+        args.baseline.write_text(json.dumps(result, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    problems = compare(result, baseline, args.tolerance)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Offline stand-ins used by scripts/benchmark.py.
+
+- `LocalVectorDb`: a vector store on a local SQLite file with the same row
+  layout as the PgVector tables, so `IngestionPipeline` and the fast path's
+  saved-query loader run against it unchanged. Search is a cosine scan.
+- `ScriptedResponses`: the agent's model with the provider call replaced by a
+  replay of recorded tool calls. Prompt formatting (history compaction,
+  per-turn context) still runs, so its cost is part of every measured turn.
+
+Import this module only after the benchmark has pointed the settings at the
+local database: it imports the agent's own modules.
+"""
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from agno.metrics import MessageMetrics
+from agno.models.response import ModelResponse
+from agno.vectordb.base import VectorDb
+from sqlalchemy import JSON, Column, MetaData, String, Table, Text, create_engine, delete, inspect, select
+from sqlalchemy.dialects import sqlite
+
+from text2sql_agent.context.schema_scope import estimate_tokens
+from text2sql_agent.fast_path import FastPathResponses, normalize_question
+
+
+# ---------------------------------------------------------------------------
+# Vector store
+# ---------------------------------------------------------------------------
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class LocalVectorDb(VectorDb):
+    """PgVector-shaped vector table on SQLite; brute-force cosine search."""
+
+    def __init__(self, path: Path, table_name: str, embedder: Embedder):
+        super().__init__(name=table_name)
+        self.embedder = embedder
+        self.db_engine = create_engine(f"sqlite:///{path}")
+        self.table = Table(
+            table_name,
+            MetaData(),
+            Column("id", String, primary_key=True),
+            Column("name", String),
+            Column("meta_data", JSON),
+            Column("filters", JSON),
+            Column("content", Text),
+            Column("embedding", JSON),
+            Column("usage", JSON),
+            Column("content_hash", String, index=True),
+            Column("content_id", String, index=True),
+            Column("user_id", String),
+        )
+
+    # Layout shared with PgVector -------------------------------------------
+    def _get_document_record(self, doc: Document, filters=None, content_hash: str = "", user_id=None, *, prepared: bool = False) -> Dict[str, Any]:
+        if not prepared or not doc.embedding:
+            doc.embed(embedder=self.embedder)
+        content = doc.content.replace("\x00", "�")
+        meta_data = {**(doc.meta_data or {}), **(filters or {})}
+        return {
+            "id": md5(f"{doc.id or content}:{content_hash}:{user_id}".encode()).hexdigest(),
+            "name": doc.name,
+            "meta_data": meta_data,
+            "filters": filters,
+            "content": content,
+            "embedding": doc.embedding,
+            "usage": doc.usage,
+            "content_hash": content_hash,
+            "content_id": doc.content_id,
+            "user_id": user_id,
+        }
+
+    def create(self) -> None:
+        self.table.metadata.create_all(self.db_engine)
+
+    async def async_create(self) -> None:
+        await asyncio.to_thread(self.create)
+
+    def exists(self) -> bool:
+        return inspect(self.db_engine).has_table(self.table.name)
+
+    async def async_exists(self) -> bool:
+        return await asyncio.to_thread(self.exists)
+
+    def _exists_where(self, clause) -> bool:
+        with self.db_engine.connect() as conn:
+            return conn.execute(select(self.table.c.id).where(clause).limit(1)).first() is not None
+
+    def name_exists(self, name: str) -> bool:
+        return self._exists_where(self.table.c.name == name)
+
+    async def async_name_exists(self, name: str) -> bool:
+        return await asyncio.to_thread(self.name_exists, name)
+
+    def id_exists(self, id: str) -> bool:
+        return self._exists_where(self.table.c.id == id)
+
+    def content_hash_exists(self, content_hash: str, user_id: Optional[str] = None) -> bool:
+        return self._exists_where((self.table.c.content_hash == content_hash) & (self.table.c.user_id.is_(user_id) if user_id is None else self.table.c.user_id == user_id))
+
+    # Writes -----------------------------------------------------------------
+    def insert(self, content_hash: str, documents: List[Document], filters=None, user_id: Optional[str] = None) -> None:
+        records = [self._get_document_record(doc, filters, content_hash, user_id) for doc in documents]
+        if not records:
+            return
+        stmt = sqlite.insert(self.table)
+        stmt = stmt.on_conflict_do_update(index_elements=["id"], set_={c: stmt.excluded[c] for c in records[0] if c != "id"})
+        with self.db_engine.begin() as conn:
+            conn.execute(stmt, records)
+
+    async def async_insert(self, content_hash: str, documents: List[Document], filters=None, user_id: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.insert, content_hash, documents, filters, user_id)
+
+    def upsert_available(self) -> bool:
+        return True
+
+    def upsert(self, content_hash: str, documents: List[Document], filters=None, user_id: Optional[str] = None) -> None:
+        self.insert(content_hash, documents, filters, user_id)
+
+    async def async_upsert(self, content_hash: str, documents: List[Document], filters=None, user_id: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.insert, content_hash, documents, filters, user_id)
+
+    def _delete_where(self, clause=None) -> bool:
+        stmt = delete(self.table) if clause is None else delete(self.table).where(clause)
+        with self.db_engine.begin() as conn:
+            return (conn.execute(stmt).rowcount or 0) > 0
+
+    def delete(self) -> bool:
+        return self._delete_where()
+
+    def delete_by_id(self, id: str) -> bool:
+        return self._delete_where(self.table.c.id == id)
+
+    def delete_by_name(self, name: str) -> bool:
+        return self._delete_where(self.table.c.name == name)
+
+    def delete_by_metadata(self, metadata: Dict[str, Any]) -> bool:
+        with self.db_engine.connect() as conn:
+            rows = conn.execute(select(self.table.c.id, self.table.c.meta_data)).all()
+        ids = [r.id for r in rows if all((r.meta_data or {}).get(k) == v for k, v in metadata.items())]
+        return bool(ids) and self._delete_where(self.table.c.id.in_(ids))
+
+    def delete_by_content_id(self, content_id: str, user_id: Optional[str] = None) -> bool:
+        clause = self.table.c.content_id == content_id
+        if user_id is not None:
+            clause &= self.table.c.user_id == user_id
+        return self._delete_where(clause)
+
+    def drop(self) -> None:
+        self.table.drop(self.db_engine, checkfirst=True)
+
+    async def async_drop(self) -> None:
+        await asyncio.to_thread(self.drop)
+
+    # Search -----------------------------------------------------------------
+    def search(self, query: str, limit: int = 5, filters: Optional[Any] = None, user_id: Optional[str] = None) -> List[Document]:
+        vector = self.embedder.get_embedding(query)
+        stmt = select(self.table.c.name, self.table.c.meta_data, self.table.c.content, self.table.c.embedding, self.table.c.content_id)
+        if user_id is not None:
+            stmt = stmt.where(self.table.c.user_id == user_id)
+        with self.db_engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        if isinstance(filters, dict):
+            rows = [r for r in rows if all((r.meta_data or {}).get(k) == v for k, v in filters.items())]
+        scored = sorted(((_cosine(vector, r.embedding or []), r) for r in rows), key=lambda s: s[0], reverse=True)
+        return [
+            Document(
+                name=r.name,
+                content=r.content,
+                meta_data={**(r.meta_data or {}), "similarity_score": score},
+                embedding=r.embedding,
+                content_id=r.content_id,
+            )
+            for score, r in scored[:limit]
+        ]
+
+    async def async_search(self, query: str, limit: int = 5, filters: Optional[Any] = None, user_id: Optional[str] = None) -> List[Document]:
+        return await asyncio.to_thread(self.search, query, limit, filters, user_id)
+
+    def get_supported_search_types(self) -> List[str]:
+        return ["vector"]
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+@dataclass
+class Trace:
+    """One recorded turn: the question, the tool calls of each model step, and the final answer."""
+
+    question: str
+    steps: List[List[dict]]
+    answer: str = "Done."
+
+    @classmethod
+    def load_all(cls, path: Path) -> List["Trace"]:
+        return [cls(t["question"], t.get("steps", []), t.get("answer", "Done.")) for t in json.loads(Path(path).read_text())]
+
+
+@dataclass
+class ScriptedResponses(FastPathResponses):
+    """Agent model that replays `Trace` tool calls instead of calling the provider.
+
+    The step is the number of assistant messages since the latest user message,
+    so a turn replays its steps in order and then returns the recorded answer.
+    ``latency_ms`` adds a fixed delay per call to stand in for the provider.
+    """
+
+    traces: Dict[str, Trace] = field(default_factory=dict)
+    latency_ms: float = 0.0
+
+    def _step(self, messages, tools) -> ModelResponse:
+        formatted = self._format_messages(messages, False, tools=tools)
+        last_user = max((i for i, m in enumerate(messages) if m.role == "user"), default=-1)
+        question = messages[last_user].get_content_string() if last_user >= 0 else ""
+        step = sum(1 for m in messages[last_user + 1 :] if m.role == "assistant")
+        trace = self.traces.get(normalize_question(question))
+
+        input_tokens = estimate_tokens(json.dumps(formatted, default=str)) + estimate_tokens(json.dumps(tools or [], default=str))
+        if trace is None:
+            response = ModelResponse(role="assistant", content=f"No scripted trace for: {question}")
+        elif step < len(trace.steps):
+            calls = [
+                {"id": f"call_{step}_{i}", "type": "function", "function": {"name": c["tool"], "arguments": json.dumps(c.get("args", {}))}}
+                for i, c in enumerate(trace.steps[step])
+            ]
+            response = ModelResponse(role="assistant", tool_calls=calls)
+        else:
+            response = ModelResponse(role="assistant", content=trace.answer)
+        output_tokens = estimate_tokens(response.content or json.dumps(response.tool_calls))
+        response.response_usage = MessageMetrics(input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens)
+        return response
+
+    def invoke(self, messages, assistant_message=None, response_format=None, tools=None, tool_choice=None, run_response=None, compress_tool_results=False, **kwargs) -> ModelResponse:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._step(messages, tools)
+
+    async def ainvoke(self, messages, assistant_message=None, response_format=None, tools=None, tool_choice=None, run_response=None, compress_tool_results=False, **kwargs) -> ModelResponse:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._step(messages, tools)
+
+    def invoke_stream(self, *args, **kwargs):
+        yield self.invoke(*args, **kwargs)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        yield await self.ainvoke(*args, **kwargs)
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
@@ -0,0 +1,86 @@
+"""Import-time benchmark for agent startup.
+
+Imports a module in fresh interpreters with ``python -X importtime`` and
+fails (exit code 1) when the median cumulative import time exceeds the
+budget, or when a module that should be loaded lazily was imported.
+
+    python scripts/import_time.py
+    python scripts/import_time.py --module agno_agentos --max-ms 4000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy dependencies only needed once a chart or a SQL parse is requested.
+DEFAULT_FORBIDDEN = ("pandas", "matplotlib", "PIL", "pandasai", "sqlglot")
+
+
+def measure(module: str) -> tuple[float, dict[str, int], set[str]]:
+    """Import ``module`` once; return (cumulative ms, self-time µs per module, loaded top-level packages)."""
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative = None
+    self_us: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, total, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not own.isdigit():
+            continue  # header row
+        self_us[name] = int(own)
+        if name == module:
+            cumulative = int(total) / 1000
+    if cumulative is None:
+        raise SystemExit(f"{module} not found in -X importtime output (already imported by site?)")
+    return cumulative, self_us, {name.split(".")[0] for name in self_us}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="text2sql_agent.agent")
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "2500")))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list (by self time)")
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN), help="comma-separated packages that must not load")
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        ms, self_us, loaded = measure(args.module)
+        timings.append(ms)
+    median = statistics.median(timings)
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs ({', '.join(f'{t:.0f}' for t in timings)})")
+    print("Slowest modules (self time, last run):")
+    for name, us in sorted(self_us.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted(p for p in args.forbid.split(",") if p and p in loaded)
+    if forbidden:
+        print(f"FAIL: eagerly imported {', '.join(forbidden)}; import them inside the functions that use them")
+        failed = True
+    if median > args.max_ms:
+        print(f"FAIL: {median:.0f} ms exceeds the {args.max_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print(f"OK: within the {args.max_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
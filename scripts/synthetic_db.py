@@ -0,0 +1,330 @@
+"""Synthetic SQLite stand-in for the insurance database.
+
+Tables and columns come from knowledge/*.json; primary and foreign keys from
+the ``(PK)`` / ``(FK→table.column)`` markers in the semantic model and the
+"FK to" / "JOIN to" / "Matches" hints in the column descriptions. Rows are
+generated deterministically from a seed, parents before children, so every
+foreign key points at an existing row. Total size scales with ``--rows``.
+
+`install_mysql_functions` registers the MySQL date and string functions the
+agent's SQL uses (YEAR, DATE_FORMAT, CURDATE, CONCAT, ...) on every SQLite
+connection, so model-style queries run unchanged.
+
+    python scripts/synthetic_db.py --rows 100000 --out .cache/benchmark/synthetic_100000.db
+"""
+import argparse
+import json
+import random
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+KNOWLEDGE_DIR = PROJECT_ROOT / "knowledge"
+
+# Share of the total row count per table; unknown tables get DEFAULT_WEIGHT.
+TABLE_WEIGHTS = {
+    "providers": 0.001,
+    "agent_logins": 0.002,
+    "customers": 0.10,
+    "policies": 0.12,
+    "provider_policy_access": 0.15,
+    "vehicles": 0.15,
+    "coverages": 0.30,
+    "claims": 0.04,
+    "billing_accounts": 0.04,
+    "billing_history": 0.097,
+}
+DEFAULT_WEIGHT = 0.01
+MIN_ROWS = 10
+BATCH_SIZE = 10_000
+
+# Values the sample questions and traces filter on.
+SEED_VALUES = {"agent_logins.login_id": ["acmegroup", "acmea1", "acmea2"]}
+VALUE_POOLS = {
+    "claims.loss_cause": ["Collision", "Hail", "Theft", "Fire", "Vandalism", "Flood", "Glass"],
+    "vehicles.make": ["NISSAN", "TOYOTA", "FORD", "HONDA", "CHEVROLET", "BMW"],
+    "coverages.description": ["Bodily Injury", "Property Damage", "Collision", "Comprehensive", "Medical Payments"],
+    "billing_history.type_cd": ["CreateAccount", "Receipt", "Invoice", "Adjustment"],
+}
+FIRST_NAMES = ["Patrick", "Maria", "James", "Linda", "Robert", "Aisha", "Chen", "Sofia"]
+LAST_NAMES = ["Myers", "Garcia", "Smith", "Johnson", "Nguyen", "Brown", "Okafor", "Rossi"]
+
+_SQLITE_TYPES = {"INT": "INTEGER", "INTEGER": "INTEGER", "FLOAT": "REAL", "DECIMAL": "REAL", "DOUBLE": "REAL"}
+_FK_MARK_RE = re.compile(r"^\|\s*(\w+)\s*\((PK|FK→(\w+)\.(\w+))\)", re.MULTILINE)
+_FK_HINT_RE = re.compile(r"(?:FK to|JOIN to|Matches)\s+(\w+)\.(\w+)")
+_TABLE_RE = re.compile(r"^### Table: (\w+)", re.MULTILINE)
+
+
+@dataclass
+class ColumnSpec:
+    name: str
+    type: str
+    description: str = ""
+    primary_key: bool = False
+    references: Optional[tuple[str, str]] = None
+
+
+@dataclass
+class TableSpec:
+    name: str
+    columns: list[ColumnSpec] = field(default_factory=list)
+
+    def column(self, name: str) -> Optional[ColumnSpec]:
+        return next((c for c in self.columns if c.name == name), None)
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+def _semantic_keys() -> dict[str, dict[str, Optional[tuple[str, str]]]]:
+    """table -> column -> referenced (table, column), or None for a primary key."""
+    from text2sql_agent.context.semantic_model import semantic_model
+
+    keys: dict[str, dict] = {}
+    sections = _TABLE_RE.split(semantic_model)
+    for name, body in zip(sections[1::2], sections[2::2]):
+        for col, mark, ref_table, ref_col in _FK_MARK_RE.findall(body):
+            keys.setdefault(name, {})[col] = (ref_table, ref_col) if ref_table else None
+    return keys
+
+
+def load_schema(knowledge_dir: Path = KNOWLEDGE_DIR) -> list[TableSpec]:
+    """Tables from knowledge/*.json with keys resolved, ordered parents first."""
+    keys = _semantic_keys()
+    tables: dict[str, TableSpec] = {}
+    for fp in sorted(knowledge_dir.glob("*.json")):
+        data = json.loads(fp.read_text(encoding="utf-8"))
+        name = data.get("table_name")
+        if not name:
+            continue
+        spec = TableSpec(name)
+        for c in data.get("table_columns", []):
+            desc = c.get("description", "")
+            col = ColumnSpec(c["name"], c.get("type", "VARCHAR").upper(), desc)
+            marked = keys.get(name, {})
+            if c["name"] in marked:
+                col.primary_key = marked[c["name"]] is None
+                col.references = marked[c["name"]]
+            else:
+                col.primary_key = desc.startswith("PK")
+                hint = _FK_HINT_RE.search(desc)
+                if hint and hint.group(1) != name:
+                    col.references = (hint.group(1), hint.group(2))
+            spec.columns.append(col)
+        tables[name] = spec
+
+    ordered: list[TableSpec] = []
+    visiting: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in visiting or any(t.name == name for t in ordered):
+            return
+        visiting.add(name)
+        for col in tables[name].columns:
+            if col.references and col.references[0] in tables:
+                visit(col.references[0])
+        ordered.append(tables[name])
+
+    for name in tables:
+        visit(name)
+    return ordered
+
+
+def row_counts(schema: list[TableSpec], total_rows: int) -> dict[str, int]:
+    weights = {t.name: TABLE_WEIGHTS.get(t.name, DEFAULT_WEIGHT) for t in schema}
+    scale = total_rows / sum(weights.values())
+    return {name: max(MIN_ROWS, int(w * scale)) for name, w in weights.items()}
+
+
+# ---------------------------------------------------------------------------
+# Values
+# ---------------------------------------------------------------------------
+def _choices(description: str) -> Optional[list[str]]:
+    """Enumerated values from descriptions like "Open, Closed." or "Active, Cancelled, etc."."""
+    text = description.split(". ")[0].rstrip(".")
+    if ":" in text:
+        text = text.split(":", 1)[1]
+    parts = [p.strip().strip("'\"") for p in re.split(r",| or ", text)]
+    etc = any(p.lower() == "etc" for p in parts)
+    parts = [p for p in parts if p and p.lower() != "etc"]
+    if not parts or not all(re.fullmatch(r"[A-Z][\w ]{0,24}", p) for p in parts):
+        return None
+    return parts if etc or len(parts) > 1 else None
+
+
+class _ColumnGenerator:
+    def __init__(self, table: str, col: ColumnSpec, rng: random.Random, parents: dict[str, list], counts: dict[str, int]):
+        self.table, self.col, self.rng = table, col, rng
+        key = f"{table}.{col.name}"
+        self.seeds = SEED_VALUES.get(key, [])
+        self.pool = VALUE_POOLS.get(key) or _choices(col.description)
+        self.parent_values = None
+        self.parent_count = 0
+        if col.references:
+            ref = f"{col.references[0]}.{col.references[1]}"
+            self.parent_values = parents.get(ref)
+            self.parent_count = counts.get(col.references[0], 0)
+
+    def value(self, i: int):
+        col, rng = self.col, self.rng
+        if i < len(self.seeds):
+            return self.seeds[i]
+        if col.primary_key:
+            return i + 1 if col.type in ("INT", "INTEGER") else str(i + 1)
+        if self.parent_values is not None:
+            return rng.choice(self.parent_values)
+        if self.parent_count:
+            return str(rng.randrange(self.parent_count) + 1)
+        if self.pool:
+            return rng.choice(self.pool)
+        if col.type == "DATE":
+            return (date(2020, 1, 1) + timedelta(days=rng.randrange(2400))).isoformat()
+        if col.type in ("INT", "INTEGER"):
+            return rng.randint(1995, 2025) if col.name == "year" else rng.randint(1, 100)
+        if col.type in _SQLITE_TYPES:
+            return round(rng.uniform(10, 5000), 2)
+        if "name" in col.name:
+            return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        return f"{col.name}-{i + 1}"
+
+
+def _referenced_columns(schema: list[TableSpec]) -> set[str]:
+    """Non-key columns other tables reference; their values are kept to sample from."""
+    pks = {f"{t.name}.{c.name}" for t in schema for c in t.columns if c.primary_key}
+    refs = {f"{c.references[0]}.{c.references[1]}" for t in schema for c in t.columns if c.references}
+    return refs - pks
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+def _read_meta(path: Path) -> dict:
+    try:
+        with sqlite3.connect(path) as conn:
+            return dict(conn.execute("SELECT key, value FROM _synthetic_meta").fetchall())
+    except sqlite3.Error:
+        return {}
+
+
+def build(path: Path, total_rows: int, seed: int = 42, force: bool = False) -> dict[str, int]:
+    """Create (or reuse, when rows and seed match) the synthetic database at ``path``."""
+    path = Path(path)
+    schema = load_schema()
+    counts = row_counts(schema, total_rows)
+    if not force and path.exists() and _read_meta(path) == {"rows": str(total_rows), "seed": str(seed)}:
+        return counts
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    rng = random.Random(seed)
+    keep = _referenced_columns(schema)
+    parents: dict[str, list] = {}
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for table in schema:
+        cols = ", ".join(f"{c.name} {_SQLITE_TYPES.get(c.type, 'TEXT')}" for c in table.columns)
+        conn.execute(f"CREATE TABLE {table.name} ({cols})")
+        gens = [_ColumnGenerator(table.name, c, rng, parents, counts) for c in table.columns]
+        kept = {i: parents.setdefault(f"{table.name}.{c.name}", []) for i, c in enumerate(table.columns) if f"{table.name}.{c.name}" in keep}
+        insert = f"INSERT INTO {table.name} VALUES ({', '.join('?' * len(gens))})"
+        for start in range(0, counts[table.name], BATCH_SIZE):
+            batch = [tuple(g.value(i) for g in gens) for i in range(start, min(start + BATCH_SIZE, counts[table.name]))]
+            for idx, values in kept.items():
+                values.extend(row[idx] for row in batch)
+            conn.executemany(insert, batch)
+        for c in table.columns:
+            if c.primary_key or c.references:
+                unique = "UNIQUE " if c.primary_key else ""
+                conn.execute(f"CREATE {unique}INDEX ix_{table.name}_{c.name} ON {table.name} ({c.name})")
+        conn.commit()
+    conn.execute("CREATE TABLE _synthetic_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO _synthetic_meta VALUES (?, ?)", [("rows", str(total_rows)), ("seed", str(seed))])
+    conn.commit()
+    conn.close()
+    print(f"Built {path} with {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# MySQL functions on SQLite
+# ---------------------------------------------------------------------------
+_DATE_FORMAT = {"%Y": "%Y", "%y": "%y", "%m": "%m", "%c": "%m", "%d": "%d", "%e": "%d", "%M": "%B", "%b": "%b", "%H": "%H", "%i": "%M", "%s": "%S"}
+
+
+def _date(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)[:19])
+    except ValueError:
+        return None
+
+
+def _date_format(value, fmt):
+    d = _date(value)
+    if d is None or fmt is None:
+        return None
+    return re.sub(r"%[a-zA-Z]", lambda m: d.strftime(_DATE_FORMAT.get(m.group(), m.group())), fmt)
+
+
+def _part(attr):
+    def extract(value):
+        d = _date(value)
+        return getattr(d, attr) if d else None
+
+    return extract
+
+
+def _datediff(a, b):
+    da, db = _date(a), _date(b)
+    return (da.date() - db.date()).days if da and db else None
+
+
+def register_mysql_functions(conn) -> None:
+    """Register MySQL functions on one SQLite DBAPI connection."""
+    conn.create_function("YEAR", 1, _part("year"), deterministic=True)
+    conn.create_function("MONTH", 1, _part("month"), deterministic=True)
+    conn.create_function("DAY", 1, _part("day"), deterministic=True)
+    conn.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+    conn.create_function("DATEDIFF", 2, _datediff, deterministic=True)
+    conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    conn.create_function("NOW", 0, lambda: datetime.now().isoformat(sep=" ", timespec="seconds"))
+    conn.create_function("CONCAT", -1, lambda *args: None if None in args else "".join(str(a) for a in args), deterministic=True)
+
+
+def install_mysql_functions() -> None:
+    """Register the MySQL functions on every SQLite connection SQLAlchemy opens from now on."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        if hasattr(dbapi_connection, "create_function"):
+            register_mysql_functions(dbapi_connection)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="approximate total rows across all tables")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--force", action="store_true", help="rebuild even when a matching database exists")
+    args = parser.parse_args()
+    out = args.out or PROJECT_ROOT / ".cache" / "benchmark" / f"synthetic_{args.rows}.db"
+    for table, count in build(out, args.rows, args.seed, args.force).items():
+        print(f"  {count:>10,}  {table}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
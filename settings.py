@@ -26,3 +26,152 @@ CHART_SERVER_PORT = int(os.getenv("CHART_SERVER_PORT", "7777"))
 # ---------------------------------------------------------------------------
 KNOWLEDGE_TABLE = os.getenv("KNOWLEDGE_TABLE", "json_sql_agent_knowledge_v1")
 LEARNINGS_TABLE = os.getenv("LEARNINGS_TABLE", "json_sql_agent_learnings_v1")
+
+# ---------------------------------------------------------------------------
+# Embeddings & Ingestion
+# ---------------------------------------------------------------------------
+EMBEDDER = os.getenv("EMBEDDER", "openai")  # "openai" or "local" (deterministic, offline)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "disk")  # "memory", "disk" (SQLite file) or "postgres"
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # in-memory entries
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")  # relative to the project root
+EMBEDDING_CACHE_TABLE = os.getenv("EMBEDDING_CACHE_TABLE", "embedding_cache")
+
+# ---------------------------------------------------------------------------
+# Schema Catalog (introspect_schema)
+# ---------------------------------------------------------------------------
+SCHEMA_CATALOG_TTL = int(os.getenv("SCHEMA_CATALOG_TTL", "600"))
+SCHEMA_CATALOG_POLL_INTERVAL = int(os.getenv("SCHEMA_CATALOG_POLL_INTERVAL", "60"))
+
+# ---------------------------------------------------------------------------
+# Row Counts (introspect_schema table listing)
+# ---------------------------------------------------------------------------
+# "estimated" (information_schema statistics), "exact" (parallel COUNT(*)) or "cached" (exact with TTL)
+ROW_COUNT_MODE = os.getenv("ROW_COUNT_MODE", "estimated")
+ROW_COUNT_TTL = int(os.getenv("ROW_COUNT_TTL", "300"))
+ROW_COUNT_WORKERS = int(os.getenv("ROW_COUNT_WORKERS", "4"))
+
+# ---------------------------------------------------------------------------
+# Connection Pool (shared engine registry)
+# ---------------------------------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+# ---------------------------------------------------------------------------
+# Query Result Cache (reused by visualize_last_query_results)
+# ---------------------------------------------------------------------------
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# ---------------------------------------------------------------------------
+# Chart Cache (exports/charts)
+# ---------------------------------------------------------------------------
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHART_CACHE_MAX_AGE = int(os.getenv("CHART_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# ---------------------------------------------------------------------------
+# Chart Output
+# ---------------------------------------------------------------------------
+CHART_FORMATS = ("png", "webp", "svg")
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png").strip().lower()
+if CHART_FORMAT not in CHART_FORMATS:
+    raise ValueError(f"Unknown CHART_FORMAT '{CHART_FORMAT}'. Expected one of: {', '.join(CHART_FORMATS)}")
+CHART_PNG_OPTIMIZE = os.getenv("CHART_PNG_OPTIMIZE", "true").lower() == "true"
+CHART_WEBP_QUALITY = int(os.getenv("CHART_WEBP_QUALITY", "85"))
+CHART_PADDING = int(os.getenv("CHART_PADDING", "200"))  # pixels of white border
+CHART_DPI = int(os.getenv("CHART_DPI", "100"))
+
+# ---------------------------------------------------------------------------
+# Chart Worker Pool (async visualization tool)
+# ---------------------------------------------------------------------------
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))  # 0 = render in-process (sync tool)
+CHART_QUEUE_LIMIT = int(os.getenv("CHART_QUEUE_LIMIT", "8"))
+CHART_TIMEOUT = float(os.getenv("CHART_TIMEOUT", "90"))
+
+# ---------------------------------------------------------------------------
+# SQL Execution
+# ---------------------------------------------------------------------------
+SQL_ASYNC = os.getenv("SQL_ASYNC", "true").lower() == "true"
+MYSQL_ASYNC_URL = os.getenv("MYSQL_ASYNC_URL", MYSQL_URL.replace("+pymysql", "+aiomysql"))
+SQL_TIMEOUT = float(os.getenv("SQL_TIMEOUT", "30"))  # per-statement limit (seconds)
+
+# ---------------------------------------------------------------------------
+# Result Fetching (streamed through server-side cursors)
+# ---------------------------------------------------------------------------
+FETCH_MAX_ROWS = int(os.getenv("FETCH_MAX_ROWS", "10000"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(32 * 1024 * 1024)))
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "1000"))
+FETCH_DTYPE_BACKEND = os.getenv("FETCH_DTYPE_BACKEND", "numpy")  # "numpy" (downcast) or "pyarrow" (needs pyarrow installed)
+
+# ---------------------------------------------------------------------------
+# Query Result Cache (shared across sessions, keyed on canonical SQL)
+# ---------------------------------------------------------------------------
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "")  # empty = memory only
+QUERY_CACHE_DISK_MAX_BYTES = int(os.getenv("QUERY_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# ---------------------------------------------------------------------------
+# Saved Query Fast Path (answers repeated questions without the LLM)
+# ---------------------------------------------------------------------------
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.getenv("FAST_PATH_THRESHOLD", "1.0"))  # 1.0 = exact normalized match only
+FAST_PATH_REFRESH = int(os.getenv("FAST_PATH_REFRESH", "300"))
+FAST_PATH_MAX_ROWS = int(os.getenv("FAST_PATH_MAX_ROWS", "50"))
+
+# ---------------------------------------------------------------------------
+# Schema Scoping (per-question subset of the semantic model in the prompt)
+# ---------------------------------------------------------------------------
+SCHEMA_SCOPE_ENABLED = os.getenv("SCHEMA_SCOPE_ENABLED", "true").lower() == "true"
+SCHEMA_SCOPE_MAX_TABLES = int(os.getenv("SCHEMA_SCOPE_MAX_TABLES", "3"))  # before adding join neighbors
+SCHEMA_SCOPE_MIN_SCORE = float(os.getenv("SCHEMA_SCOPE_MIN_SCORE", "1.0"))
+SCHEMA_SCOPE_EMBEDDINGS = os.getenv("SCHEMA_SCOPE_EMBEDDINGS", "false").lower() == "true"
+
+# ---------------------------------------------------------------------------
+# Prompt Caching (static prompt prefix, per-turn context last)
+# ---------------------------------------------------------------------------
+PROMPT_STABLE_PREFIX = os.getenv("PROMPT_STABLE_PREFIX", "true").lower() == "true"
+PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY", "text2sql-agent")  # empty = don't send one
+
+# ---------------------------------------------------------------------------
+# Conversation History (token budget for replayed runs)
+# ---------------------------------------------------------------------------
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))  # 0 = replay history as stored
+HISTORY_TOOL_RESULT_CHARS = int(os.getenv("HISTORY_TOOL_RESULT_CHARS", "500"))  # older non-SQL tool results
+
+# ---------------------------------------------------------------------------
+# SQL Pre-flight (EXPLAIN cost gate before run_sql_query executes)
+# ---------------------------------------------------------------------------
+PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED", "true").lower() == "true"
+PREFLIGHT_MAX_ROWS_EXAMINED = int(os.getenv("PREFLIGHT_MAX_ROWS_EXAMINED", "5000000"))
+PREFLIGHT_AUTO_LIMIT = int(os.getenv("PREFLIGHT_AUTO_LIMIT", "1000"))  # 0 = reject instead of adding a LIMIT
+PREFLIGHT_REJECT_CARTESIAN = os.getenv("PREFLIGHT_REJECT_CARTESIAN", "true").lower() == "true"
+
+# ---------------------------------------------------------------------------
+# Materialized Rollups (summary tables declared in knowledge/rollups/*.json)
+# ---------------------------------------------------------------------------
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"  # needs CREATE/INSERT rights on the database
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "900"))  # default per rollup (seconds)
+ROLLUP_MAX_STALENESS = float(os.getenv("ROLLUP_MAX_STALENESS", "3600"))  # default per rollup; older rollups are bypassed
+ROLLUP_FULL_REFRESH_INTERVAL = float(os.getenv("ROLLUP_FULL_REFRESH_INTERVAL", "86400"))  # full rebuild of partitioned rollups
+
+# ---------------------------------------------------------------------------
+# Agent Scope Index (login_id -> policy/customer ids, replaces the junction join)
+# ---------------------------------------------------------------------------
+AGENT_SCOPE_ENABLED = os.getenv("AGENT_SCOPE_ENABLED", "true").lower() == "true"
+AGENT_SCOPE_REFRESH_INTERVAL = float(os.getenv("AGENT_SCOPE_REFRESH_INTERVAL", "60"))  # junction change check (seconds)
+AGENT_SCOPE_MAX_STALENESS = float(os.getenv("AGENT_SCOPE_MAX_STALENESS", "300"))  # older indexes are bypassed
+AGENT_SCOPE_MAX_IN_LIST = int(os.getenv("AGENT_SCOPE_MAX_IN_LIST", "10000"))  # larger scopes keep the join
+
+# ---------------------------------------------------------------------------
+# Tracing (per-run span trees; Prometheus text at /metrics/prometheus)
+# ---------------------------------------------------------------------------
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SLOW_TURN_MS = float(os.getenv("TRACE_SLOW_TURN_MS", "0"))  # 0 = never dump span trees
+TRACE_DUMP_DIR = os.getenv("TRACE_DUMP_DIR", "exports/traces")
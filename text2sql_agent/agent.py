@@ -2,9 +2,7 @@ import json
 from pathlib import Path
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIResponses
 from agno.tools.reasoning import ReasoningTools
-from agno.tools.sql import SQLTools
 
 from agno.learn import (
     LearnedKnowledgeConfig,
@@ -12,12 +10,23 @@ from agno.learn import (
     LearningMode,
 )
 
-from settings import MYSQL_URL, LLM_MODEL
+from settings import MYSQL_URL, MYSQL_ASYNC_URL, LLM_MODEL, CHART_WORKERS, SQL_ASYNC, FAST_PATH_ENABLED, SCHEMA_SCOPE_ENABLED, PROMPT_STABLE_PREFIX, HISTORY_TOKEN_BUDGET
 from db.config import mysql_url, get_demo_db, sql_agent_knowledge, sql_agent_learnings
+from db.engines import get_async_engine, get_engine
+from text2sql_agent.context.schema_scope import scope_schema_hook
 from text2sql_agent.context.system_prompt import SYSTEM_MESSAGE
+from text2sql_agent.fast_path import FastPathResponses, SavedQueryIndex
+from text2sql_agent.history import HistoryCompactor
+from text2sql_agent.prompt_cache import StablePrefixResponses, report_prompt_cache, turn_context_hook
+from tracing import end_turn, start_turn, trace_tool
 from text2sql_agent.tools import (
+    AgentSQLTools,
+    AsyncAgentSQLTools,
+    SearchContextLearnings,
     create_introspect_schema_tool,
     create_save_validated_query_tool,
+    create_search_context_tool,
+    avisualize_last_query_results,
     visualize_last_query_results,
 )
 
@@ -48,16 +57,49 @@ def _load_table_hints() -> dict:
 # ---------------------------------------------------------------------------
 # Tools Configuration
 # ---------------------------------------------------------------------------
-save_validated_query = create_save_validated_query_tool(sql_agent_knowledge)
 introspect_schema = create_introspect_schema_tool(mysql_url)
+# Knowledge + learnings searched concurrently in one tool call
+search_context = create_search_context_tool(sql_agent_knowledge, sql_agent_learnings)
+# AgentOS runs the agent asynchronously; the async variant renders charts in a worker pool.
+visualize_tool = avisualize_last_query_results if CHART_WORKERS > 0 else visualize_last_query_results
 
-sql_tools = [
-    SQLTools(
-        db_url=mysql_url,
+if SQL_ASYNC:
+    # Non-blocking execution with a server-side statement timeout and KILL QUERY on cancel
+    run_sql_tools = AsyncAgentSQLTools(
+        async_engine=get_async_engine(MYSQL_ASYNC_URL),
+        db_engine=get_engine(mysql_url),
         tables=_load_table_hints(),
-    ),
+    )
+else:
+    run_sql_tools = AgentSQLTools(
+        db_engine=get_engine(mysql_url),
+        tables=_load_table_hints(),
+    )
+
+# Repeated saved questions are answered by running the stored SQL, skipping the LLM.
+saved_query_index = SavedQueryIndex(knowledge=sql_agent_knowledge, sql_tools=run_sql_tools) if FAST_PATH_ENABLED else None
+save_validated_query = create_save_validated_query_tool(sql_agent_knowledge, saved_queries=saved_query_index)
+
+# Per-turn pre-hooks: pick the schema for the question, then collect the volatile
+# context that goes after the user's message (keeps the system prompt cacheable).
+pre_hooks = [start_turn]  # root span first, so the other hooks' work is inside the turn
+if SCHEMA_SCOPE_ENABLED:
+    pre_hooks.append(scope_schema_hook)
+if PROMPT_STABLE_PREFIX:
+    pre_hooks.append(turn_context_hook)
+
+# Replayed history is kept under HISTORY_TOKEN_BUDGET (old tool results summarized)
+history_compactor = HistoryCompactor() if HISTORY_TOKEN_BUDGET > 0 else None
+if FAST_PATH_ENABLED:
+    model = FastPathResponses(id=LLM_MODEL, saved_queries=saved_query_index, history_compactor=history_compactor)
+else:
+    model = StablePrefixResponses(id=LLM_MODEL, history_compactor=history_compactor)
+
+sql_tools = [
+    search_context,
+    run_sql_tools,
     ReasoningTools(add_instructions=True),
-    visualize_last_query_results,
+    visualize_tool,
     save_validated_query,
     introspect_schema,
 ]
@@ -68,18 +110,26 @@ sql_tools = [
 sql_agent = Agent(
     id="sql-agent",
     name="SQL Agent",
-    model=OpenAIResponses(id=LLM_MODEL),
+    model=model,
     db=get_demo_db(),
     system_message=SYSTEM_MESSAGE,
+    pre_hooks=pre_hooks,
+    # Logs cached vs uncached input tokens per run; closes the turn's span tree
+    post_hooks=[report_prompt_cache, end_turn],
+    # Every tool call runs inside a span of the turn
+    tool_hooks=[trace_tool],
     
     # Static Curated Knowledge
     knowledge=sql_agent_knowledge,
-    search_knowledge=True,
+    # search_context is the only knowledge search tool: it reads both bases in one call
+    search_knowledge=False,
     
-    # Dynamic Learned Knowledge (The Dash LearningMachine)
+    # Dynamic Learned Knowledge (The Dash LearningMachine); save_learning only
     learning=LearningMachine(
         knowledge=sql_agent_learnings,
-        learned_knowledge=LearnedKnowledgeConfig(mode=LearningMode.AGENTIC),
+        learned_knowledge=SearchContextLearnings(
+            LearnedKnowledgeConfig(knowledge=sql_agent_learnings, mode=LearningMode.AGENTIC)
+        ),
     ),
     
     enable_agentic_memory=True,
@@ -0,0 +1,256 @@
+"""Question-scoped semantic model.
+
+The full `semantic_model` covers every table, column and example query, but a
+single question rarely needs more than a few tables. `SchemaScope` scores the
+tables against the question with keyword matching (and optionally embedding
+similarity) over knowledge/*.json, adds the tables the selected ones join to,
+and assembles a compact semantic model containing only those sections.
+
+`scope_schema_hook` runs as an agent pre-hook and publishes the result as the
+`schema_context` dependency, which the system prompt references.
+"""
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from agno.utils.log import logger
+
+import metrics
+from db.embedders import embed_texts
+from settings import SCHEMA_SCOPE_MAX_TABLES, SCHEMA_SCOPE_MIN_SCORE, SCHEMA_SCOPE_EMBEDDINGS
+from .semantic_model import semantic_model
+
+_KNOWLEDGE_DIR = Path(__file__).resolve().parent.parent.parent / "knowledge"
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_TABLE_HEADER_RE = re.compile(r"^### Table: (\w+)", re.MULTILINE)
+_BOLD_RE = re.compile(r"\*\*(\w+)\*\*")
+_STOPWORDS = frozenset(
+    "a an the of in on for to by with and or is are was were be me my show list give find get all any each "
+    "how many much what which who whose when where have has do does did than that this these those top per "
+    "total number count most least from into their there".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for savings reports."""
+    return (len(text) + 3) // 4
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def _terms(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+@dataclass
+class _Table:
+    name: str
+    section: str
+    name_terms: set = field(default_factory=set)
+    column_terms: set = field(default_factory=set)
+    text_terms: set = field(default_factory=set)
+    joins: set = field(default_factory=set)  # tables this one needs to be joined through
+    embedding: Optional[List[float]] = None
+
+
+@dataclass
+class ScopedSchema:
+    text: str
+    tables: List[str]
+    full_tokens: int
+    scoped_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.scoped_tokens
+
+
+class SchemaScope:
+    """Builds the part of the semantic model that a question needs."""
+
+    def __init__(
+        self,
+        model: str = semantic_model,
+        knowledge_dir: Path = _KNOWLEDGE_DIR,
+        embedder=None,
+        max_tables: int = SCHEMA_SCOPE_MAX_TABLES,
+        min_score: float = SCHEMA_SCOPE_MIN_SCORE,
+    ):
+        self.model = model
+        self.embedder = embedder
+        self.max_tables = max_tables
+        self.min_score = min_score
+        self.full_tokens = estimate_tokens(model)
+        self._parse(model)
+        self._load_knowledge(knowledge_dir)
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+    def _parse(self, model: str) -> None:
+        headers = list(_TABLE_HEADER_RE.finditer(model))
+        self.preamble = model[: headers[0].start()] if headers else model
+        self.tables: dict[str, _Table] = {}
+        for i, m in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else model.find("\n---", m.end())
+            section = model[m.start() : end if end != -1 else len(model)].rstrip()
+            self.tables[m.group(1)] = _Table(name=m.group(1), section=section, name_terms=set(_terms(m.group(1).replace("_", " "))))
+        last = model.find("\n---", headers[-1].end()) if headers else -1
+        self.tail = model[last:] if last != -1 else ""
+
+        # Join edges: FK markers and `table.column` references inside each section...
+        for table in self.tables.values():
+            table.joins |= {t for t in re.findall(r"(\w+)\.\w+", table.section) if t in self.tables and t != table.name}
+        # ...and the relationship list, where "via `junction`" makes the junction a required hop.
+        for line in self.tail.splitlines():
+            ends = [t for t in _BOLD_RE.findall(line) if t in self.tables]
+            if len(ends) != 2:
+                continue
+            parent, child = ends
+            via = {t for t in re.findall(r"`(\w+)", line) if t in self.tables} - {parent, child}
+            if via:
+                for junction in via:
+                    self.tables[parent].joins.add(junction)
+                    self.tables[junction].joins.add(child)
+            else:
+                self.tables[child].joins.add(parent)
+
+    def _load_knowledge(self, knowledge_dir: Path) -> None:
+        for fp in sorted(Path(knowledge_dir).glob("*.json")):
+            try:
+                data = json.loads(fp.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                continue
+            table = self.tables.get(data.get("table_name", fp.stem))
+            if table is None:
+                continue
+            for col in data.get("table_columns", []):
+                table.column_terms.update(_terms(col.get("name", "").replace("_", " ")))
+                table.text_terms.update(_terms(col.get("description", "")))
+            table.text_terms.update(_terms(data.get("table_description", "")))
+            table.text_terms.update(t for q in data.get("sample_queries", []) for t in _terms(q.get("question", "")))
+        for table in self.tables.values():
+            table.text_terms.update(_terms(table.section))
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+    def score(self, question: str) -> dict[str, float]:
+        terms = set(_terms(question))
+        scores = {}
+        for name, table in self.tables.items():
+            s = 3.0 * len(terms & table.name_terms) + 1.0 * len(terms & table.column_terms) + 0.25 * len(terms & table.text_terms)
+            scores[name] = s
+        if self.embedder is not None:
+            for name, sim in self._similarities(question).items():
+                scores[name] += 2.0 * max(sim, 0.0)
+        return scores
+
+    def _similarities(self, question: str) -> dict[str, float]:
+        try:
+            q = self.embedder.get_embedding(question)
+            pending = [t for t in self.tables.values() if t.embedding is None]
+            if pending:
+                for table, vector in zip(pending, embed_texts(self.embedder, [t.section for t in pending])):
+                    table.embedding = vector
+        except Exception as e:
+            logger.warning(f"Schema scope embedding failed, using keywords only: {e}")
+            return {}
+        qn = math.sqrt(sum(v * v for v in q)) or 1.0
+        sims = {}
+        for name, table in self.tables.items():
+            tn = math.sqrt(sum(v * v for v in table.embedding)) or 1.0
+            sims[name] = sum(a * b for a, b in zip(q, table.embedding)) / (qn * tn)
+        return sims
+
+    def select(self, question: str) -> List[str]:
+        """Relevant tables plus the tables they join through; empty when nothing matches."""
+        scores = self.score(question)
+        # Weak matches (one shared column word) only count when nothing matches strongly.
+        cutoff = max(self.min_score, 0.5 * max(scores.values(), default=0.0))
+        ranked = [n for n, s in sorted(scores.items(), key=lambda kv: -kv[1]) if s >= cutoff][: self.max_tables]
+        selected = set(ranked)
+        for name in ranked:
+            selected |= self.tables[name].joins
+        return [n for n in self.tables if n in selected]  # keep semantic-model order
+
+    # ------------------------------------------------------------------
+    # Assembly
+    # ------------------------------------------------------------------
+    def build(self, question: str) -> ScopedSchema:
+        tables = self.select(question)
+        if not tables:
+            metrics.incr("schema_scope_fallbacks_total")
+            return ScopedSchema(text=self.model, tables=list(self.tables), full_tokens=self.full_tokens, scoped_tokens=self.full_tokens)
+
+        selected = set(tables)
+        parts = [self.preamble.rstrip(), ""]
+        parts.extend(self.tables[n].section + "\n" for n in tables)
+        parts.append(self._filter_tail(selected))
+        omitted = [n for n in self.tables if n not in selected]
+        if omitted:
+            parts.append(f"\nOther tables (ask `introspect_schema` if needed): {', '.join(omitted)}\n")
+        text = "\n".join(parts)
+        return ScopedSchema(text=text, tables=tables, full_tokens=self.full_tokens, scoped_tokens=estimate_tokens(text))
+
+    def _filter_tail(self, selected: set) -> str:
+        """Keep relationship bullets and note sections that only involve selected tables."""
+        out: List[str] = []
+        sections = re.split(r"(?m)^(?=## )", self.tail)
+        for section in sections:
+            # A prose section is about the tables named in its opening line (e.g. the junction table).
+            body = [line for line in section.splitlines()[1:] if line.strip() and not line.startswith("- ")]
+            if section.startswith("## ") and body:
+                subject = {t for t in self.tables if re.search(rf"\b{t}\b", body[0])}
+                if subject and not subject & selected:
+                    continue
+            lines = []
+            for line in section.splitlines():
+                if line.startswith("- "):
+                    line_tables = {t for t in self.tables if re.search(rf"\b{t}\b", line)}
+                    if line_tables and not line_tables <= selected:
+                        continue
+                lines.append(line)
+            out.append("\n".join(lines))
+        return "\n".join(out)
+
+
+_scope: Optional[SchemaScope] = None
+
+
+def get_schema_scope() -> SchemaScope:
+    global _scope
+    if _scope is None:
+        embedder = None
+        if SCHEMA_SCOPE_EMBEDDINGS:
+            from db.embedders import create_embedder
+            from db.embedding_cache import CachedEmbedder
+
+            embedder = CachedEmbedder(embedder=create_embedder())
+        _scope = SchemaScope(embedder=embedder)
+    return _scope
+
+
+def scope_schema_hook(run_input, run_context) -> None:
+    """Agent pre-hook: set the `schema_context` dependency for this turn's question."""
+    try:
+        scoped = get_schema_scope().build(run_input.input_content_string() if run_input is not None else "")
+    except Exception as e:
+        logger.warning(f"Schema scoping failed, using the full semantic model: {e}")
+        run_context.dependencies = {**(run_context.dependencies or {}), "schema_context": semantic_model}
+        return
+    run_context.dependencies = {**(run_context.dependencies or {}), "schema_context": scoped.text}
+    metrics.incr("schema_scope_tokens_saved_total", scoped.saved_tokens)
+    logger.info(
+        f"Schema scope: {len(scoped.tables)} tables ({', '.join(scoped.tables)}), "
+        f"~{scoped.scoped_tokens} of ~{scoped.full_tokens} tokens, saved ~{scoped.saved_tokens}"
+    )
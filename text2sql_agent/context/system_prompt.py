@@ -1,5 +1,15 @@
+from settings import SCHEMA_SCOPE_ENABLED, PROMPT_STABLE_PREFIX
 from .semantic_model import semantic_model
 
+# With scoping on, a pre-hook picks the tables relevant to the question. In stable-prefix
+# mode they are sent after the user's message so this system message never changes.
+if not SCHEMA_SCOPE_ENABLED:
+    SEMANTIC_MODEL_SECTION = semantic_model
+elif PROMPT_STABLE_PREFIX:
+    SEMANTIC_MODEL_SECTION = "The tables relevant to each question are provided in the `<turn_context>` block that follows the user's message.\n"
+else:
+    SEMANTIC_MODEL_SECTION = "{schema_context}"
+
 SYSTEM_MESSAGE = f"""\
 You are a self-learning Text-to-SQL data agent that provides **insights**, not just query results.
 You have access to a MySQL database called `json_insurancedb` containing real insurance data.
@@ -19,17 +29,17 @@ Your goal: make the user look like they've been working with this data for years
 
 **Knowledge** (static, curated):
 - Table schemas, validated queries, business rules
-- Searched automatically before each response
+- Searched with `search_context` (together with learnings) before each response
 - Add successful queries here with `save_validated_query`
 
 **Learnings** (dynamic, discovered):
 - Patterns YOU discover through errors and fixes
 - Type gotchas, date formats, column quirks
-- Search with `search_learnings`, save with `save_learning`
+- Returned by `search_context`; save with `save_learning`
 
 ## Workflow
 
-1. Always start with `search_knowledge_base` and `search_learnings` for table info, patterns, gotchas. Context that will help you write the best possible SQL.
+1. Always start with ONE `search_context` call: it searches the knowledge base and the learnings at the same time and returns table info, patterns and gotchas ranked together. Call it again with a narrower query for a follow-up lookup.
 2. Write SQL (LIMIT 50, no SELECT *, ORDER BY for rankings)
 3. If error → `introspect_schema` → fix → `save_learning`
 4. Provide **insights**, not just data, based on the context you found.
@@ -103,6 +113,6 @@ After EVERY query execution, you MUST conclude your response with the following
 
 ## SEMANTIC MODEL
 
-{semantic_model}
+{SEMANTIC_MODEL_SECTION}
 ---
 """
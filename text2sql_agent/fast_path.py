@@ -0,0 +1,251 @@
+"""Exact-match fast path for saved validated queries.
+
+When a user repeats a question that was saved with `save_validated_query`,
+the stored SQL is run directly and its result returned without any LLM
+round-trips. The curated `sample_queries` in knowledge/*.json are not indexed:
+they are examples with hard-coded literals (one agent's login, one customer),
+not answers to the question as asked.
+
+`SavedQueryIndex` keeps saved questions in memory, keyed by normalized
+question text, and reloads them from the knowledge vector table every
+FAST_PATH_REFRESH seconds. `FastPathResponses` is an OpenAIResponses model
+that consults the index before calling the provider, the same way agno
+serves a cached model response.
+"""
+import asyncio
+import difflib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from agno.knowledge.knowledge import Knowledge
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+from agno.utils.log import logger
+from sqlalchemy import select
+
+import metrics
+import tracing
+from db.fetch import FetchResult
+from db.result_cache import result_cache
+from settings import FAST_PATH_THRESHOLD, FAST_PATH_REFRESH, FAST_PATH_MAX_ROWS
+from text2sql_agent.prompt_cache import StablePrefixResponses
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCT_RE.sub(" ", question.lower()).split())
+
+
+@dataclass
+class SavedQuery:
+    name: str
+    question: str
+    query: str
+    summary: Optional[str] = None
+
+
+class SavedQueryIndex:
+    """In-memory index of saved validated queries, keyed by normalized question."""
+
+    def __init__(self, knowledge: Optional[Knowledge] = None, sql_tools=None, threshold: float = FAST_PATH_THRESHOLD, refresh: float = FAST_PATH_REFRESH):
+        self.knowledge = knowledge
+        self.sql_tools = sql_tools  # AgentSQLTools used to execute matches
+        self.threshold = threshold
+        self.refresh = refresh
+        self._queries: dict[str, SavedQuery] = {}
+        self._added: dict[str, SavedQuery] = {}  # saved in this process, kept across reloads
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # Agents (and their models) are deep-copied per run; the index is shared.
+        return self
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def load(self) -> int:
+        """(Re)build the index from the queries saved in the knowledge vector table."""
+        queries: dict[str, SavedQuery] = {}
+        for saved in self._read_knowledge():
+            queries[normalize_question(saved.question)] = saved
+        with self._lock:
+            self._queries = {**queries, **self._added}
+            self._loaded_at = time.monotonic()
+            count = len(self._queries)
+        metrics.set_gauge("fast_path_saved_queries", count)
+        logger.info(f"Fast path indexed {count} saved queries")
+        return count
+
+    def add(self, name: str, question: str, query: str, summary: Optional[str] = None) -> None:
+        """Index a query saved in this process without waiting for the next reload."""
+        key = normalize_question(question)
+        with self._lock:
+            self._added[key] = self._queries[key] = SavedQuery(name=name, question=question, query=query, summary=summary)
+
+    def _read_knowledge(self) -> list[SavedQuery]:
+        """Parse `save_validated_query` payloads stored in the knowledge vector table."""
+        vector_db = getattr(self.knowledge, "vector_db", None)
+        if vector_db is None:
+            return []
+        table = vector_db.table
+        try:
+            with vector_db.db_engine.connect() as conn:
+                rows = conn.execute(select(table.c.content_id, table.c.meta_data, table.c.content)).all()
+        except Exception as e:
+            logger.warning(f"Fast path could not read saved queries: {e}")
+            return []
+
+        # Reassemble chunked documents in chunk order.
+        documents: dict[str, list[tuple[int, str]]] = {}
+        for content_id, meta, content in rows:
+            documents.setdefault(content_id, []).append(((meta or {}).get("chunk", 0), content or ""))
+
+        saved = []
+        for chunks in documents.values():
+            try:
+                payload = json.loads("".join(c for _, c in sorted(chunks)))
+            except (json.JSONDecodeError, TypeError):
+                continue
+            if isinstance(payload, dict) and payload.get("question") and payload.get("query"):
+                saved.append(SavedQuery(name=payload.get("name") or "", question=payload["question"], query=payload["query"], summary=payload.get("summary")))
+        return saved
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+    def match(self, question: str) -> Optional[tuple[SavedQuery, float]]:
+        """Best saved query for ``question`` and its similarity, if at or above the threshold."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh:
+            self.load()
+        metrics.incr("fast_path_lookups_total")
+        key = normalize_question(question)
+        with self._lock:
+            saved = self._queries.get(key)
+            if saved is not None:
+                metrics.incr("fast_path_hits_total", kind="exact")
+                return saved, 1.0
+            if self.threshold >= 1.0:
+                return None
+            candidates = difflib.get_close_matches(key, list(self._queries), n=1, cutoff=self.threshold)
+            if not candidates:
+                return None
+            saved = self._queries[candidates[0]]
+        metrics.incr("fast_path_hits_total", kind="fuzzy")
+        return saved, difflib.SequenceMatcher(None, key, candidates[0]).ratio()
+
+    def answer(self, question: str, session_id: Optional[str] = None) -> Optional[str]:
+        """Run the matching saved query and format the reply, or None to fall back to the model."""
+        if self.sql_tools is None:
+            return None
+        found = self.match(question)
+        if found is None:
+            return None
+        saved, score = found
+        start = time.perf_counter()
+        try:
+            res = self.sql_tools.execute(saved.query, max_rows=FAST_PATH_MAX_ROWS)
+        except Exception as e:
+            metrics.incr("fast_path_errors_total")
+            logger.warning(f"Fast path query '{saved.name}' failed, falling back to the model: {e}")
+            return None
+        metrics.observe("fast_path_seconds", time.perf_counter() - start)
+        if not res.truncated and res.rows:
+            # Lets visualize_last_query_results reuse the rows in a follow-up turn.
+            result_cache.put(session_id, saved.query, res.frame())
+        logger.info(f"Fast path answered with saved query '{saved.name}' (similarity {score:.2f})")
+        return _format_answer(saved, res)
+
+    def stats(self) -> dict:
+        lookups = metrics.get_counter("fast_path_lookups_total")
+        hits = metrics.get_counter("fast_path_hits_total", kind="exact") + metrics.get_counter("fast_path_hits_total", kind="fuzzy")
+        return {
+            "saved_queries": len(self._queries),
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "errors": metrics.get_counter("fast_path_errors_total"),
+        }
+
+
+def _format_answer(saved: SavedQuery, res: FetchResult) -> str:
+    lines = [f"**{saved.name or 'Saved query'}** (validated query)", ""]
+    if saved.summary:
+        lines.extend([saved.summary, ""])
+    lines.extend(["```sql", saved.query.strip(), "```", ""])
+    if not res.rows:
+        lines.append("The query returned no rows.")
+        return "\n".join(lines)
+    lines.append("| " + " | ".join(res.columns) + " |")
+    lines.append("| " + " | ".join("---" for _ in res.columns) + " |")
+    for row in res.rows:
+        lines.append("| " + " | ".join(str(v).replace("|", "\\|") for v in row) + " |")
+    if res.truncated:
+        lines.extend(["", f"Showing the first {len(res.rows):,} rows."])
+    return "\n".join(lines)
+
+
+@dataclass
+class FastPathResponses(StablePrefixResponses):
+    """StablePrefixResponses that answers saved questions from `SavedQueryIndex` without a provider call."""
+
+    saved_queries: Optional[SavedQueryIndex] = None
+
+    def _user_question(self, messages: List[Message], tools) -> Optional[str]:
+        # Only the first model call of an agent run: a user turn with nothing after it.
+        if self.saved_queries is None or not tools or not messages or messages[-1].role != "user":
+            return None
+        return messages[-1].get_content_string() or None
+
+    def _fast_response(self, messages: List[Message], content: str) -> ModelResponse:
+        messages.append(Message(role=self.assistant_message_role, content=content))
+        return ModelResponse(role=self.assistant_message_role, content=content)
+
+    def _try_fast_path(self, messages: List[Message], tools, run_response) -> Optional[ModelResponse]:
+        question = self._user_question(messages, tools)
+        if question is None:
+            return None
+        with tracing.span("saved_query", "fast_path"):
+            content = self.saved_queries.answer(question, getattr(run_response, "session_id", None))
+        return self._fast_response(messages, content) if content is not None else None
+
+    async def _atry_fast_path(self, messages: List[Message], tools, run_response) -> Optional[ModelResponse]:
+        question = self._user_question(messages, tools)
+        if question is None:
+            return None
+        with tracing.span("saved_query", "fast_path"):
+            content = await asyncio.to_thread(self.saved_queries.answer, question, getattr(run_response, "session_id", None))
+        return self._fast_response(messages, content) if content is not None else None
+
+    def response(self, messages: List[Message], *args, tools=None, run_response=None, **kwargs) -> ModelResponse:
+        fast = self._try_fast_path(messages, tools, run_response)
+        if fast is not None:
+            return fast
+        return super().response(messages, *args, tools=tools, run_response=run_response, **kwargs)
+
+    async def aresponse(self, messages: List[Message], *args, tools=None, run_response=None, **kwargs) -> ModelResponse:
+        fast = await self._atry_fast_path(messages, tools, run_response)
+        if fast is not None:
+            return fast
+        return await super().aresponse(messages, *args, tools=tools, run_response=run_response, **kwargs)
+
+    def response_stream(self, messages: List[Message], *args, tools=None, run_response=None, **kwargs) -> Iterator[Any]:
+        fast = self._try_fast_path(messages, tools, run_response)
+        if fast is not None:
+            yield fast
+            return
+        yield from super().response_stream(messages, *args, tools=tools, run_response=run_response, **kwargs)
+
+    async def aresponse_stream(self, messages: List[Message], *args, tools=None, run_response=None, **kwargs) -> AsyncIterator[Any]:
+        fast = await self._atry_fast_path(messages, tools, run_response)
+        if fast is not None:
+            yield fast
+            return
+        async for event in super().aresponse_stream(messages, *args, tools=tools, run_response=run_response, **kwargs):
+            yield event
@@ -0,0 +1,99 @@
+"""Token-budgeted conversation history.
+
+The agent replays its last few runs on every turn, including every tool
+result: raw SQL rows, search hits, reasoning steps. `HistoryCompactor` rewrites
+the history part of the prompt before it is sent. The most recent prior turn
+is kept verbatim. Older tool results are replaced by short summaries (the SQL,
+row count and column names). Whole turns are dropped oldest-first until the
+history fits HISTORY_TOKEN_BUDGET. Stored sessions are never modified.
+"""
+import json
+from typing import List
+
+from agno.models.message import Message
+
+import metrics
+from settings import HISTORY_TOKEN_BUDGET, HISTORY_TOOL_RESULT_CHARS
+from text2sql_agent.context.schema_scope import estimate_tokens
+
+
+def _message_tokens(msg: Message) -> int:
+    tokens = estimate_tokens(msg.get_content_string())
+    if msg.tool_calls:
+        tokens += estimate_tokens(json.dumps(msg.tool_calls, default=str))
+    return tokens
+
+
+def _split_turns(messages: List[Message]) -> List[List[Message]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[List[Message]] = []
+    for msg in messages:
+        if msg.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+
+def summarize_tool_result(msg: Message, max_chars: int = HISTORY_TOOL_RESULT_CHARS) -> str:
+    """Short stand-in for a tool result: SQL, row count and columns for queries, a prefix otherwise."""
+    content = msg.get_content_string()
+    args = msg.tool_args if isinstance(msg.tool_args, dict) else {}
+    if msg.tool_name == "run_sql_query" and not content.startswith("Error"):
+        body, _, notice = content.partition("\n\n")
+        try:
+            rows = json.loads(body)
+        except json.JSONDecodeError:
+            rows = None
+        if isinstance(rows, list):
+            columns = ", ".join(rows[0]) if rows and isinstance(rows[0], dict) else "-"
+            summary = f"[earlier result, rows omitted] {len(rows)} row(s); columns: {columns}"
+            if args.get("query"):
+                summary += f"\nSQL: {args['query']}"
+            return summary + (f"\n{notice}" if notice else "")
+    if len(content) <= max_chars:
+        return content
+    return content[:max_chars].rstrip() + f" … [earlier result truncated, {len(content)} chars]"
+
+
+class HistoryCompactor:
+    """Bounds the history sent to the model to a token budget."""
+
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, tool_result_chars: int = HISTORY_TOOL_RESULT_CHARS):
+        self.budget = budget
+        self.tool_result_chars = tool_result_chars
+
+    def _compact_turn(self, turn: List[Message]) -> List[Message]:
+        return [
+            msg.model_copy(update={"content": summarize_tool_result(msg, self.tool_result_chars), "compressed_content": None})
+            if msg.role == "tool"
+            else msg
+            for msg in turn
+        ]
+
+    def compact(self, messages: List[Message]) -> List[Message]:
+        """Return `messages` with the `from_history` part compacted; other messages are untouched."""
+        history = [m for m in messages if m.from_history]
+        if not history:
+            return messages
+        before = sum(_message_tokens(m) for m in history)
+
+        turns = _split_turns(history)
+        turns = [self._compact_turn(t) for t in turns[:-1]] + [turns[-1]]
+        sizes = [sum(_message_tokens(m) for m in t) for t in turns]
+        while len(turns) > 1 and sum(sizes) > self.budget:
+            turns.pop(0)
+            sizes.pop(0)
+        if sizes[0] > self.budget:
+            # Only the latest turn is left and it alone is over budget.
+            turns[0] = self._compact_turn(turns[0])
+            sizes[0] = sum(_message_tokens(m) for m in turns[0])
+
+        compacted = [m for t in turns for m in t]
+        after = sum(sizes)
+        metrics.incr("history_tokens_saved_total", before - after)
+        metrics.set_gauge("history_tokens", after)
+
+        first = next(i for i, m in enumerate(messages) if m.from_history)
+        rest = [m for m in messages[first:] if not m.from_history]
+        return messages[:first] + compacted + rest
+
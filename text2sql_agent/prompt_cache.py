@@ -0,0 +1,138 @@
+"""Stable prompt prefix for provider-side prompt caching.
+
+OpenAI reuses cached input tokens only for an identical prompt prefix. The
+agent's prompt is laid out so that everything static comes first (tool
+schemas, the system message and the semantic model, then the append-only
+history) and everything that changes per turn comes last. Per-turn context is
+the current datetime and, with schema scoping, the tables for this question.
+
+`turn_context_hook` collects that per-turn context. `StablePrefixResponses`
+sends it as a developer message right after the user's message, without
+storing it in the session history. `report_prompt_cache` records cached vs
+uncached input tokens for every run. Every provider call is traced as a
+``model`` span with its token usage.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from agno.models.message import Message
+from agno.models.openai import OpenAIResponses
+from agno.utils.log import logger
+
+import metrics
+import tracing
+from settings import PROMPT_CACHE_KEY
+from text2sql_agent.history import HistoryCompactor
+
+# Set by the pre-hook and read when the provider request is built, in the same run.
+_turn_context: ContextVar[Optional[str]] = ContextVar("turn_context", default=None)
+
+
+def turn_context_hook(run_input, run_context) -> None:
+    """Agent pre-hook: collect this turn's volatile context (runs after `scope_schema_hook`)."""
+    parts = [f"Current date and time: {datetime.now().astimezone().strftime('%Y-%m-%d %H:%M %Z')}"]
+    schema_context = (run_context.dependencies or {}).get("schema_context")
+    if schema_context:
+        parts.append(f"## SEMANTIC MODEL (tables for this question)\n\n{schema_context}")
+    _turn_context.set("<turn_context>\n" + "\n\n".join(parts) + "\n</turn_context>")
+
+
+@dataclass
+class StablePrefixResponses(OpenAIResponses):
+    """OpenAIResponses that appends the per-turn context after the user's message.
+
+    With ``history_compactor`` set, replayed history is compacted to its token budget first.
+    """
+
+    prompt_cache_key: Optional[str] = PROMPT_CACHE_KEY
+    history_compactor: Optional[HistoryCompactor] = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        if self.prompt_cache_key:
+            # Routes requests sharing the prefix to the same cache.
+            self.request_params = {"prompt_cache_key": self.prompt_cache_key, **(self.request_params or {})}
+
+    def _format_messages(
+        self,
+        messages: List[Message],
+        compress_tool_results: bool = False,
+        tools: Optional[List[Union[Any, Dict[str, Any]]]] = None,
+    ) -> List[Any]:
+        if self.history_compactor is not None:
+            messages = self.history_compactor.compact(messages)
+        formatted = super()._format_messages(messages, compress_tool_results, tools=tools)
+        context = _turn_context.get()
+        if context is None:
+            return formatted
+        # After the latest user message, so every earlier byte stays identical across turns.
+        for i in range(len(formatted) - 1, -1, -1):
+            item = formatted[i]
+            if isinstance(item, dict) and item.get("role") == "user":
+                return formatted[: i + 1] + [{"role": "developer", "content": context}] + formatted[i + 1 :]
+        return formatted
+
+    # Provider calls, traced. Model spans are leaves, so they are never made current.
+    def _end_model_span(self, span, response) -> None:
+        usage = getattr(response, "response_usage", None)
+        if span is not None and usage is not None:
+            span.attrs.update(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+        tracing.end_span(span)
+
+    def invoke(self, *args, **kwargs):
+        span = tracing.start_span(self.id, "model")
+        try:
+            response = super().invoke(*args, **kwargs)
+        except Exception as e:
+            tracing.end_span(span, e)
+            raise
+        self._end_model_span(span, response)
+        return response
+
+    async def ainvoke(self, *args, **kwargs):
+        span = tracing.start_span(self.id, "model")
+        try:
+            response = await super().ainvoke(*args, **kwargs)
+        except Exception as e:
+            tracing.end_span(span, e)
+            raise
+        self._end_model_span(span, response)
+        return response
+
+    def invoke_stream(self, *args, **kwargs):
+        span, last = tracing.start_span(self.id, "model", stream=True), None
+        try:
+            for last in super().invoke_stream(*args, **kwargs):
+                yield last
+        except Exception as e:
+            tracing.end_span(span, e)
+            raise
+        self._end_model_span(span, last)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        span, last = tracing.start_span(self.id, "model", stream=True), None
+        try:
+            async for last in super().ainvoke_stream(*args, **kwargs):
+                yield last
+        except Exception as e:
+            tracing.end_span(span, e)
+            raise
+        self._end_model_span(span, last)
+
+
+def report_prompt_cache(run_output) -> None:
+    """Agent post-hook: record cached vs uncached input tokens for the run."""
+    run_metrics = getattr(run_output, "metrics", None)
+    if run_metrics is None or not run_metrics.input_tokens:
+        return
+    cached = run_metrics.cache_read_tokens or 0
+    uncached = run_metrics.input_tokens - cached
+    metrics.incr("llm_input_tokens_total", cached, cache="hit")
+    metrics.incr("llm_input_tokens_total", uncached, cache="miss")
+    metrics.incr("llm_output_tokens_total", run_metrics.output_tokens or 0)
+    logger.info(
+        f"Prompt cache: {cached} of {run_metrics.input_tokens} input tokens cached "
+        f"({cached / run_metrics.input_tokens:.0%}), {uncached} uncached"
+    )
@@ -1,9 +1,16 @@
 from .introspect import create_introspect_schema_tool
 from .knowledge import create_save_validated_query_tool
-from .visualization import visualize_last_query_results
+from .retrieval import SearchContextLearnings, create_search_context_tool
+from .sql import AgentSQLTools, AsyncAgentSQLTools
+from .visualization import avisualize_last_query_results, visualize_last_query_results
 
 __all__ = [
+    "AgentSQLTools",
+    "AsyncAgentSQLTools",
+    "SearchContextLearnings",
     "create_introspect_schema_tool",
     "create_save_validated_query_tool",
+    "create_search_context_tool",
+    "avisualize_last_query_results",
     "visualize_last_query_results"
 ]
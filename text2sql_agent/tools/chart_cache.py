@@ -0,0 +1,145 @@
+"""Content-addressed chart cache for visualize_last_query_results.
+
+Charts are stored as ``<hash>.<ext>`` where the hash covers the result data and
+the normalized visualization request, so asking for the same chart twice
+returns the existing file. Every chart is rendered to its own temporary path
+and atomically moved into place, and an in-memory index (owner session, size,
+created-at) keeps lookups and size/age eviction O(1) without directory scans.
+Scratch files of failed renders are removed by the caller through `discard`;
+the ones a crashed process left behind are swept at startup.
+"""
+import hashlib
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+import metrics
+from settings import CHART_CACHE_MAX_BYTES, CHART_CACHE_MAX_AGE
+
+CHART_SUFFIXES = (".png", ".webp", ".svg")
+# Scratch files older than this at startup belong to no in-flight render (seconds).
+_SCRATCH_MAX_AGE = 3600
+
+
+def result_fingerprint(df: pd.DataFrame) -> str:
+    """Stable hash of a result frame's columns and values."""
+    h = hashlib.sha256()
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df.astype(object), index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def normalize_request(request: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (request or "").lower())).strip()
+
+
+def chart_key(df: pd.DataFrame, request: str) -> str:
+    return hashlib.sha256(f"{result_fingerprint(df)}\x00{normalize_request(request)}".encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class ChartEntry:
+    path: Path
+    session_id: str | None
+    size: int
+    created_at: float
+
+
+class ChartCache:
+    """Index of generated charts with size- and age-based eviction."""
+
+    def __init__(self, directory: Path, max_bytes: int = CHART_CACHE_MAX_BYTES, max_age: int = CHART_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Insertion order == creation order, so the oldest chart is always first.
+        self._index: OrderedDict[str, ChartEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """Adopt charts left by a previous process and sweep its stale scratch files (one scan at startup only)."""
+        found = []
+        now = time.time()
+        for path in self.directory.iterdir():
+            if path.suffix not in CHART_SUFFIXES:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name.startswith("."):
+                # Scratch file of an in-flight render, or of one interrupted by a crash.
+                if ".tmp" in path.name and now - st.st_mtime > _SCRATCH_MAX_AGE:
+                    path.unlink(missing_ok=True)
+                    metrics.incr("chart_scratch_swept_total")
+                continue
+            found.append((st.st_mtime, path.stem, ChartEntry(path, None, st.st_size, st.st_mtime)))
+        for _, key, entry in sorted(found):
+            self._index[key] = entry
+            self._bytes += entry.size
+        self._evict_locked()
+
+    def scratch_path(self, key: str, suffix: str = ".png") -> Path:
+        """A unique per-request output path; concurrent renders never collide."""
+        return self.directory / f".{key}.{uuid.uuid4().hex}.tmp{suffix}"
+
+    def discard(self, scratch: Path) -> None:
+        """Remove what a render left at the scratch base ``scratch``, under any chart suffix."""
+        for suffix in ("", *CHART_SUFFIXES):
+            scratch.with_name(scratch.name + suffix).unlink(missing_ok=True)
+
+    def lookup(self, key: str) -> Path | None:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and time.time() - entry.created_at > self.max_age:
+                self._drop_locked(key)
+                entry = None
+        if entry is None:
+            metrics.incr("chart_cache_misses_total")
+            return None
+        metrics.incr("chart_cache_hits_total")
+        return entry.path
+
+    def store(self, key: str, chart: Path, session_id: str | None = None) -> Path:
+        """Atomically move a rendered chart to its content-addressed name and index it."""
+        target = self.directory / f"{key}{chart.suffix}"
+        size = chart.stat().st_size
+        chart.replace(target)
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+                if old.path != target:
+                    old.path.unlink(missing_ok=True)
+            self._index[key] = ChartEntry(target, session_id, size, time.time())
+            self._bytes += size
+            self._evict_locked()
+        return target
+
+    def entries(self, session_id: str | None = None) -> list[ChartEntry]:
+        with self._lock:
+            return [e for e in self._index.values() if session_id is None or e.session_id == session_id]
+
+    def _drop_locked(self, key: str) -> None:
+        entry = self._index.pop(key)
+        self._bytes -= entry.size
+        entry.path.unlink(missing_ok=True)
+        metrics.incr("chart_cache_evictions_total")
+
+    def _evict_locked(self) -> None:
+        """Drop charts past max_age, then the oldest ones until under max_bytes."""
+        now = time.time()
+        while self._index:
+            key, oldest = next(iter(self._index.items()))
+            if now - oldest.created_at <= self.max_age and self._bytes <= self.max_bytes:
+                break
+            self._drop_locked(key)
+        metrics.set_gauge("chart_cache_bytes", self._bytes)
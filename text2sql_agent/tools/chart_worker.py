@@ -0,0 +1,110 @@
+"""Bounded process pool for chart rendering.
+
+matplotlib's Agg backend is not thread-safe, so charts are rendered in worker
+processes rather than threads. The pool caps concurrent renders, rejects new
+jobs immediately once the queue is full, and applies a per-job timeout so one
+slow chart never holds up other AgentOS sessions. A job that times out while
+running takes its worker processes down with it, so a hung render cannot keep
+a worker and a queue slot forever.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from settings import CHART_WORKERS, CHART_QUEUE_LIMIT, CHART_TIMEOUT
+
+
+class ChartQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is at its limit."""
+
+
+def _timed_call(fn, args: tuple) -> tuple:
+    """Runs in the worker: returns the result plus wall-clock start/end times."""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+class ChartWorkerPool:
+    def __init__(self, workers: int = CHART_WORKERS, queue_limit: int = CHART_QUEUE_LIMIT, timeout: float = CHART_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs DB/refresh threads is unsafe.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            metrics.set_gauge("chart_queue_depth", self._pending)
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` in a worker process and return its result.
+
+        Raises ChartQueueFull when over capacity and asyncio.TimeoutError when
+        the job takes longer than the timeout. A timed-out job that already
+        started gets its pool's processes terminated; other jobs running in
+        that pool fail with BrokenProcessPool.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                metrics.incr("chart_jobs_rejected_total")
+                raise ChartQueueFull(f"Chart queue is full ({self._pending} jobs pending)")
+            self._pending += 1
+            metrics.set_gauge("chart_queue_depth", self._pending)
+
+        submitted = time.time()
+        try:
+            executor = self._get_executor()
+            future = executor.submit(_timed_call, fn, args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            result, started, finished = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("chart_jobs_timed_out_total")
+            if not future.cancel():  # cancel only succeeds if the job has not started yet
+                self._recycle(executor)
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool on the next job.
+            self._recycle(executor)
+            raise
+
+        metrics.observe("chart_queue_wait_seconds", max(started - submitted, 0.0))
+        metrics.observe("chart_worker_render_seconds", finished - started)
+        return result
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """Kill ``executor``'s workers and start a fresh pool on the next job.
+
+        The executor then fails its unfinished futures with BrokenProcessPool,
+        which releases their queue slots.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return  # already replaced by another job's timeout or failure
+            self._executor = None
+        metrics.incr("chart_pool_recycled_total")
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
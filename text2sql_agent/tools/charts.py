@@ -0,0 +1,166 @@
+"""Rule-based chart planner and matplotlib renderer.
+
+Most result sets the agent charts are a single dimension plus a measure
+("month vs count", "provider vs policies"). Those are classified from dtypes
+and cardinality and rendered locally; anything else returns no plan and the
+caller falls back to PandasAI.
+"""
+import datetime as dt
+import decimal
+import io
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+from matplotlib.figure import Figure
+from PIL import Image
+
+from settings import CHART_FORMAT, CHART_PNG_OPTIMIZE, CHART_WEBP_QUALITY, CHART_PADDING, CHART_DPI
+
+# Plot area in inches (portrait), before the white padding that keeps the UI from cropping.
+PLOT_SIZE = (6, 7)
+
+# Cardinality limits for each chart shape.
+MAX_BAR_CATEGORIES = 30
+MAX_PIE_SLICES = 5
+
+# Shapes the local renderer does not draw; these go to PandasAI.
+_UNSUPPORTED_RE = re.compile(r"\b(scatter|heat ?map|histogram|box ?plot|stack|area|bubble|radar|violin)\b", re.I)
+_PIE_RE = re.compile(r"\b(pie|donut|share|proportion|percentage|part[- ]to[- ]whole|breakdown|distribution)\b", re.I)
+_LINE_RE = re.compile(r"\b(line|trend|over time|timeline|monthly|weekly|daily|yearly)\b", re.I)
+_BAR_RE = re.compile(r"\b(bar|column|rank|top|compare|comparison)\b", re.I)
+
+
+@dataclass(frozen=True)
+class ChartPlan:
+    kind: str  # "bar", "line" or "pie"
+    x: str
+    y: str
+    title: str
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    if pd.api.types.is_bool_dtype(series):
+        return False
+    if pd.api.types.is_numeric_dtype(series):
+        return True
+    values = series.dropna()
+    # MySQL DECIMAL aggregates arrive as Decimal objects.
+    return len(values) > 0 and all(isinstance(v, (int, float, decimal.Decimal)) and not isinstance(v, bool) for v in values)
+
+
+def _is_temporal(series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    values = series.dropna().astype(object)
+    if len(values) == 0:
+        return False
+    if all(isinstance(v, (dt.date, dt.datetime)) for v in values):
+        return True
+    # "2024-01" / "2024-01-31" style period labels produced by DATE_FORMAT.
+    return all(isinstance(v, str) and re.fullmatch(r"\d{4}-\d{2}(-\d{2})?", v) for v in values)
+
+
+def plan_chart(df: pd.DataFrame, request: str = "") -> ChartPlan | None:
+    """Pick a chart for a one-dimension/one-measure result, or None if unsure."""
+    if df.empty or len(df.columns) < 2 or _UNSUPPORTED_RE.search(request or ""):
+        return None
+
+    numeric = [c for c in df.columns if _is_numeric(df[c])]
+    dimensions = [c for c in df.columns if c not in numeric]
+    if len(dimensions) != 1 or not numeric:
+        return None
+
+    x, y = dimensions[0], numeric[0]
+    cardinality = df[x].nunique(dropna=True)
+    temporal = _is_temporal(df[x])
+    title = f"{y.replace('_', ' ').title()} by {x.replace('_', ' ').title()}"
+
+    wants_pie = bool(_PIE_RE.search(request or ""))
+    wants_line = bool(_LINE_RE.search(request or ""))
+    wants_bar = bool(_BAR_RE.search(request or ""))
+
+    if wants_pie and not wants_bar:
+        values = pd.to_numeric(df[y].astype(object), errors="coerce")
+        if cardinality <= MAX_PIE_SLICES and (values >= 0).all():
+            return ChartPlan("pie", x, y, title)
+        return None
+    if temporal and not wants_bar:
+        return ChartPlan("line", x, y, title)
+    if wants_line and not temporal:
+        return None
+    if cardinality <= MAX_BAR_CATEGORIES:
+        return ChartPlan("bar", x, y, title)
+    return None
+
+
+def chart_suffix(fmt: str = CHART_FORMAT, raster: bool = False) -> str:
+    """File extension for ``fmt``; raster sources (PandasAI images) cannot become SVG."""
+    if fmt == "svg" and raster:
+        fmt = "png"
+    return f".{fmt}"
+
+
+def save_image(img: Image.Image, out_path: Path, padding: int = CHART_PADDING) -> Path:
+    """Pad a raster chart in memory and encode it to ``out_path`` in one write."""
+    if padding:
+        canvas = Image.new("RGB", (img.width + 2 * padding, img.height + 2 * padding), "white")
+        canvas.paste(img.convert("RGBA"), (padding, padding), img.convert("RGBA"))
+        img = canvas
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+    if out_path.suffix == ".webp":
+        img.save(out_path, format="WEBP", quality=CHART_WEBP_QUALITY, method=4)
+    else:
+        img.save(out_path, format="PNG", optimize=CHART_PNG_OPTIMIZE)
+    return out_path
+
+
+def render_chart(df: pd.DataFrame, plan: ChartPlan, out_path: Path) -> Path:
+    """Draw ``plan`` with matplotlib's object API (no pyplot global state).
+
+    Padding comes from the figure margins, so the image is produced final in
+    memory and written once in the format given by ``out_path``'s suffix.
+    """
+    data = df[[plan.x, plan.y]].dropna(subset=[plan.y]).copy()
+    data[plan.y] = pd.to_numeric(data[plan.y].astype(object), errors="coerce")
+    if plan.kind == "line":
+        data = data.sort_values(plan.x)
+    labels = data[plan.x].astype(str).tolist()
+    values = data[plan.y].tolist()
+
+    pad = CHART_PADDING / CHART_DPI
+    width, height = PLOT_SIZE[0] + 2 * pad, PLOT_SIZE[1] + 2 * pad
+    fig = Figure(figsize=(width, height), dpi=CHART_DPI, facecolor="white")
+    ax = fig.add_subplot()
+    if plan.kind == "pie":
+        ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+    elif plan.kind == "line":
+        ax.plot(labels, values, marker="o")
+        ax.set_xlabel(plan.x)
+        ax.set_ylabel(plan.y)
+        ax.grid(True, alpha=0.3)
+    else:
+        ax.bar(labels, values)
+        ax.set_xlabel(plan.x)
+        ax.set_ylabel(plan.y)
+    if plan.kind != "pie":
+        ax.tick_params(axis="x", labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment("right")
+    ax.set_title(plan.title)
+    fig.tight_layout(pad=3.0, rect=(pad / width, pad / height, 1 - pad / width, 1 - pad / height))
+
+    if out_path.suffix == ".svg":
+        fig.savefig(out_path, format="svg")
+    elif out_path.suffix == ".png" and not CHART_PNG_OPTIMIZE:
+        fig.savefig(out_path, format="png")
+    else:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+        buf.seek(0)
+        with Image.open(buf) as img:
+            save_image(img, out_path, padding=0)
+    return out_path
@@ -1,13 +1,19 @@
 from agno.tools import tool
 from agno.utils.log import logger
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import text
 from sqlalchemy.exc import DatabaseError, OperationalError
 
+from db.engines import get_engine
+from db.row_counts import RowCountProvider
+from db.schema_catalog import get_schema_catalog
+
 def create_introspect_schema_tool(db_url: str):
     """Create introspect_schema tool with database connection.
     Used by the agent to self-heal when it guesses incorrect tables or columns.
     """
-    engine = create_engine(db_url)
+    engine = get_engine(db_url)
+    catalog = get_schema_catalog(engine)
+    row_counts = RowCountProvider(engine)
 
     @tool
     def introspect_schema(
@@ -23,48 +29,25 @@ def create_introspect_schema_tool(db_url: str):
             sample_limit: Number of sample rows to return.
         """
         try:
-            insp = inspect(engine)
-
             if table_name is None:
                 # List all tables
-                tables = insp.get_table_names() + insp.get_view_names()
+                tables = catalog.names()
                 if not tables:
                     return "No tables or views found."
 
+                counts = row_counts.counts(tables)
                 lines = ["## Tables & Views", ""]
-                for t in sorted(tables):
-                    try:
-                        with engine.connect() as conn:
-                            count = conn.execute(text(f'SELECT COUNT(*) FROM `{t}`')).scalar()
-                            lines.append(f"- **{t}** ({count:,} rows)")
-                    except (OperationalError, DatabaseError):
-                        lines.append(f"- **{t}**")
+                for t in tables:
+                    label = counts[t].label()
+                    lines.append(f"- **{t}** ({label})" if label else f"- **{t}**")
                 return "\n".join(lines)
 
-            # Inspect specific table
-            tables = insp.get_table_names() + insp.get_view_names()
-            if table_name not in tables:
-                return f"Table/View '{table_name}' not found. Available: {', '.join(sorted(tables))}"
-
-            lines = [f"## {table_name}", ""]
-
-            # Columns
-            cols = insp.get_columns(table_name)
-            if cols:
-                lines.extend(["### Columns", "", "| Column | Type | Nullable |", "| --- | --- | --- |"])
-                for c in cols:
-                    nullable = "Yes" if c.get("nullable", True) else "No"
-                    lines.append(f"| {c['name']} | {c['type']} | {nullable} |")
-                lines.append("")
+            # Inspect specific table (served from the in-memory catalog)
+            info = catalog.get(table_name)
+            if info is None:
+                return f"Table/View '{table_name}' not found. Available: {', '.join(catalog.names())}"
 
-            # Primary key
-            try:
-                pk = insp.get_pk_constraint(table_name)
-                if pk and pk.get("constrained_columns"):
-                    lines.append(f"**Primary Key:** {', '.join(pk['constrained_columns'])}")
-                    lines.append("")
-            except Exception:
-                pass # Views might not report PKs clearly depending on dialect
+            lines = [info.markdown]
 
             # Sample data
             if include_sample_data:
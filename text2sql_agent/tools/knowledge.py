@@ -2,11 +2,17 @@ import json
 from typing import Optional
 
 from agno.knowledge.knowledge import Knowledge
-from agno.knowledge.reader.text_reader import TextReader
 from agno.utils.log import logger
 
-def create_save_validated_query_tool(knowledge_base: Knowledge):
-    """Factory to create a save_validated_query tool bound to a specific knowledge base."""
+from db.ingest import IngestionPipeline
+
+def create_save_validated_query_tool(knowledge_base: Knowledge, saved_queries=None):
+    """Factory to create a save_validated_query tool bound to a specific knowledge base.
+
+    When a `SavedQueryIndex` is given, saved queries are indexed immediately so
+    the fast path can answer a repeat of the question on the next turn.
+    """
+    pipeline = IngestionPipeline(knowledge_base) if knowledge_base is not None else None
 
     def save_validated_query(
         name: str,
@@ -42,12 +48,10 @@ def create_save_validated_query_tool(knowledge_base: Knowledge):
 
         logger.info("Saving validated SQL query to knowledge base")
 
-        knowledge_base.add_content(
-            name=name,
-            text_content=json.dumps(payload, ensure_ascii=False),
-            reader=TextReader(),
-            skip_if_exists=True,
-        )
+        # Re-saving a name replaces its previous payload; an identical payload is not re-embedded.
+        pipeline.ingest_texts([(name, json.dumps(payload, ensure_ascii=False))])
+        if saved_queries is not None:
+            saved_queries.add(name=name, question=question, query=query, summary=summary)
 
         return "Saved validated query to knowledge base"
     
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+from agno.learn import LearnedKnowledgeConfig
+from agno.learn.stores import LearnedKnowledgeStore
+from agno.utils.log import logger
+
+import metrics
+import tracing
+
+# Shared by every session; each call submits exactly one search per source.
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-context")
+
+
+def _content_key(doc: Document) -> str:
+    return hashlib.sha1(" ".join(doc.content.split()).casefold().encode()).hexdigest()
+
+
+def _render(doc: Document) -> str:
+    """Learnings are stored as JSON; show them as 'title: learning'."""
+    try:
+        data = json.loads(doc.content)
+    except (json.JSONDecodeError, TypeError):
+        return doc.content.strip()
+    if isinstance(data, dict) and data.get("learning"):
+        return f"{data.get('title', '').strip()}: {data['learning'].strip()}".lstrip(": ")
+    return doc.content.strip()
+
+
+def merge_hits(results: dict[str, List[Document]], limit: int) -> List[tuple[str, Document]]:
+    """Merge per-source hits, drop duplicate content and rank by hybrid score."""
+    best: dict[str, tuple[str, Document]] = {}
+    for source, docs in results.items():
+        for doc in docs:
+            key = _content_key(doc)
+            score = doc.meta_data.get("similarity_score", 0.0)
+            if key not in best or score > best[key][1].meta_data.get("similarity_score", 0.0):
+                best[key] = (source, doc)
+    ranked = sorted(best.values(), key=lambda hit: hit[1].meta_data.get("similarity_score", 0.0), reverse=True)
+    return ranked[:limit]
+
+
+def create_search_context_tool(knowledge: Knowledge, learnings: Knowledge):
+    """Factory for a search_context tool that queries knowledge and learnings concurrently."""
+
+    sources = {"knowledge": knowledge, "learning": learnings}
+
+    def _search(source: str, kb: Knowledge, query: str, limit: int) -> List[Document]:
+        start = time.perf_counter()
+        try:
+            return kb.search(query=query, max_results=limit) or []
+        except Exception as e:
+            logger.warning(f"search_context: {source} search failed: {e}")
+            return []
+        finally:
+            metrics.observe("search_context_seconds", time.perf_counter() - start, source=source)
+
+    def search_context(query: str, limit: int = 8) -> str:
+        """Search the curated knowledge base AND the learnings in one call. Use this first, before writing SQL.
+
+        Returns table info, validated queries, business rules and previously learned gotchas,
+        merged into one list ranked by relevance.
+
+        Args:
+            query: What you are looking for, e.g. "claims by month" or "agent to customer join".
+            limit: Maximum number of results to return (default: 8).
+
+        Returns:
+            str: Ranked context block.
+        """
+        start = time.perf_counter()
+        futures = {source: _SEARCH_POOL.submit(tracing.propagate(_search), source, kb, query, limit) for source, kb in sources.items() if kb is not None}
+        results = {source: future.result() for source, future in futures.items()}
+        hits = merge_hits(results, limit)
+        metrics.observe("search_context_seconds", time.perf_counter() - start, source="combined")
+
+        if not hits:
+            return "No relevant knowledge or learnings found."
+        blocks = [f"Found {len(hits)} relevant result(s):"]
+        for i, (source, doc) in enumerate(hits, start=1):
+            score = doc.meta_data.get("similarity_score")
+            header = f"[{i}] {source}" + (f" | {doc.name}" if doc.name else "") + (f" | score {score:.2f}" if score is not None else "")
+            blocks.append(f"{header}\n{_render(doc)}")
+        return "\n\n".join(blocks)
+
+    return search_context
+
+
+class SearchContextLearnings(LearnedKnowledgeStore):
+    """Learned knowledge without its own search tool: learnings are found through `search_context`.
+
+    agno's instructions and save_learning docstring name `search_learnings`;
+    they are pointed at `search_context` so the model is never told to call a
+    tool that is not registered.
+    """
+
+    def __init__(self, config: LearnedKnowledgeConfig, **kwargs):
+        config.agent_can_search = False
+        super().__init__(config=config, **kwargs)
+
+    def instructions(self) -> str:
+        return super().instructions().replace("search_learnings", "search_context")
+
+    def _create_save_learning_tool(self, *args, **kwargs):
+        return _point_at_search_context(super()._create_save_learning_tool(*args, **kwargs))
+
+    def _create_async_save_learning_tool(self, *args, **kwargs):
+        return _point_at_search_context(super()._create_async_save_learning_tool(*args, **kwargs))
+
+
+def _point_at_search_context(fn):
+    fn.__doc__ = (fn.__doc__ or "").replace("search_learnings", "search_context")
+    return fn
@@ -0,0 +1,232 @@
+import asyncio
+import json
+from typing import Optional
+
+from agno.run import RunContext
+from agno.tools.sql import SQLTools
+from agno.utils.log import log_debug, logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from db import preflight
+from db.agent_scope import get_agent_scope_index
+from db.fetch import FetchResult, afetch, fetch
+from db.query_cache import CacheKey, query_cache
+from db.result_cache import result_cache
+from db.rollups import get_rollup_manager
+from db.schema_catalog import get_schema_catalog
+from settings import SQL_TIMEOUT, FETCH_MAX_ROWS, PREFLIGHT_ENABLED, ROLLUPS_ENABLED, AGENT_SCOPE_ENABLED
+
+
+class AgentSQLTools(SQLTools):
+    """SQLTools that streams capped results and remembers them per session.
+
+    Rows are fetched through a server-side cursor and cut at FETCH_MAX_ROWS /
+    FETCH_MAX_BYTES, whatever limit the model asks for. Each complete result
+    goes to `result_cache`, so follow-up tools such as
+    `visualize_last_query_results` do not execute the same SQL again, and
+    read-only results are shared across sessions through `query_cache`.
+    Queries not served from the cache drop the agent-scope join when the
+    `agent_scope` index can stand in for it, are routed to a fresh
+    materialized rollup when one can answer them, then pass the `preflight`
+    cost gate. Routed results are not cached, so every response says how
+    fresh its rollup or index was; they are not kept in `result_cache` under
+    the SQL the model wrote either, so a chart of them runs the same route again.
+    """
+
+    def __init__(self, timeout: float = SQL_TIMEOUT, **kwargs):
+        self.timeout = timeout  # server-side statement limit on MySQL (seconds)
+        super().__init__(**kwargs)
+
+    def run_sql_query(self, query: str, limit: Optional[int] = 10, run_context: Optional[RunContext] = None) -> str:
+        """Use this function to run a SQL query and return the result.
+
+        Args:
+            query (str): The query to run.
+            limit (int, optional): The number of rows to return. Defaults to 10. Use `None` to show all results.
+                Non-positive values return no rows.
+        Returns:
+            str: Result of the SQL query.
+        Notes:
+            - The result may be empty if the query does not return any data.
+        """
+        try:
+            log_debug(f"Running sql |\n{query}")
+            res, note = self.run_routed(query, self._max_rows(limit))
+            if res is None:
+                return note
+        except Exception as e:
+            logger.exception("Error running query")
+            return f"Error running query: {e}"
+        return self._respond(query, limit, res, run_context, note)
+
+    def run_routed(self, query: str, max_rows: int = FETCH_MAX_ROWS) -> tuple[Optional[FetchResult], str]:
+        """Run ``query`` the way run_sql_query does: shared cache, routing, pre-flight check, timed fetch.
+
+        Returns the result and the notes for the response, or None and the
+        pre-flight rejection message. Raises on database errors.
+        """
+        key, res = self._cached(query, max_rows)
+        if res is not None:
+            return res, ""
+        sql, note = self._route(query)
+        if note:
+            key = None  # a cache hit would drop the note and add the TTL to the rollup's staleness
+        with self.db_engine.connect() as conn:
+            decision = preflight.check(conn, sql) if PREFLIGHT_ENABLED else None
+            if decision is not None and decision.action == preflight.REJECT:
+                return None, decision.message()
+            if decision is not None and decision.action == preflight.REWRITE:
+                key, note = None, note + decision.message()  # don't cache under the original SQL
+            res = self._timed_fetch(conn, decision.sql if decision else sql, max_rows)
+        if key:
+            query_cache.put(key, res)
+        return res, note
+
+    def execute(self, query: str, max_rows: int = FETCH_MAX_ROWS) -> FetchResult:
+        """Run ``query`` through the shared query cache, without the pre-flight check; raises on database errors."""
+        key, res = self._cached(query, max_rows)
+        if res is None:
+            with self.db_engine.connect() as conn:
+                res = fetch(conn, query, max_rows=max_rows)
+            if key:
+                query_cache.put(key, res)
+        return res
+
+    @staticmethod
+    def _max_rows(limit: Optional[int]) -> int:
+        # Fetch one extra row so we know whether the result is complete.
+        return FETCH_MAX_ROWS if limit is None else min(max(limit, 0) + 1, FETCH_MAX_ROWS)
+
+    def _timed_fetch(self, conn: Connection, sql: str, max_rows: int) -> FetchResult:
+        if conn.dialect.name != "mysql":
+            return fetch(conn, sql, max_rows=max_rows)
+        # The pool is shared with introspection and refresh jobs, so the limit is lifted afterwards.
+        conn.execute(text(f"SET SESSION MAX_EXECUTION_TIME = {int(self.timeout * 1000)}"))
+        try:
+            return fetch(conn, sql, max_rows=max_rows)
+        finally:
+            conn.execute(text("SET SESSION MAX_EXECUTION_TIME = 0"))
+
+    def _route(self, query: str) -> tuple[str, str]:
+        """SQL to run for ``query`` after the agent-scope and rollup rewrites, plus the notes saying so."""
+        sql, note = query, ""
+        if AGENT_SCOPE_ENABLED:
+            scoped = get_agent_scope_index(self.db_engine).rewrite(sql)
+            if scoped:
+                sql, note = scoped.sql, scoped.note()
+        if ROLLUPS_ENABLED:
+            rewrite = get_rollup_manager(self.db_engine).rewrite(sql)
+            if rewrite:
+                sql, note = rewrite.sql, note + rewrite.note()
+        return sql, note
+
+    def _cached(self, query: str, max_rows: int) -> tuple[Optional[CacheKey], Optional[FetchResult]]:
+        """Shared-cache key for ``query`` and the cached result, if any."""
+        if query_cache is None:
+            return None, None
+        version = get_schema_catalog(self.db_engine).version
+        key = query_cache.key_for(query, scope=self.db_engine.url.render_as_string(), version=version, max_rows=max_rows)
+        return key, (query_cache.get(key) if key else None)
+
+    def _respond(self, query: str, limit: Optional[int], res: FetchResult, run_context: Optional[RunContext], note: str = "") -> str:
+        rows = res.records()
+        complete = not res.truncated and (limit is None or len(rows) <= max(limit, 0))
+        # A routed or rewritten result is not the result of ``query``; its note would be lost on reuse.
+        if complete and rows and not note:
+            session_id = run_context.session_id if run_context else None
+            result_cache.put(session_id, query, res.frame())
+
+        if limit is not None:
+            rows = rows[: max(limit, 0)]
+        output = json.dumps(rows, default=str)
+
+        # Only mention truncation the model did not ask for via `limit`.
+        capped = res.truncated and (res.reason == "bytes" or limit is None or max(limit, 0) >= FETCH_MAX_ROWS)
+        if capped:
+            output += f"\n\n{res.notice()}"
+        return output + note
+
+
+class AsyncAgentSQLTools(AgentSQLTools):
+    """AgentSQLTools whose run_sql_query runs on an asyncio driver.
+
+    Each statement gets a server-side MAX_EXECUTION_TIME, and when the tool
+    call is cancelled or times out the query is killed on the server with
+    KILL QUERY, so a runaway join never keeps a MySQL thread busy.
+    """
+
+    def __init__(self, async_engine: AsyncEngine, timeout: float = SQL_TIMEOUT, **kwargs):
+        self.async_engine = async_engine
+        super().__init__(timeout=timeout, **kwargs)
+
+    async def run_sql_query(self, query: str, limit: Optional[int] = 10, run_context: Optional[RunContext] = None) -> str:
+        """Use this function to run a SQL query and return the result.
+
+        Args:
+            query (str): The query to run.
+            limit (int, optional): The number of rows to return. Defaults to 10. Use `None` to show all results.
+                Non-positive values return no rows.
+        Returns:
+            str: Result of the SQL query.
+        Notes:
+            - The result may be empty if the query does not return any data.
+        """
+        try:
+            res, note = await self.arun_routed(query, self._max_rows(limit))
+            if res is None:
+                return note
+        except asyncio.TimeoutError:
+            logger.warning(f"Query cancelled after {self.timeout:.0f}s")
+            return f"Error running query: query exceeded the {self.timeout:.0f}s time limit and was cancelled. Add filters or a LIMIT."
+        except Exception as e:
+            logger.exception("Error running query")
+            return f"Error running query: {e}"
+        return self._respond(query, limit, res, run_context, note)
+
+    async def arun_routed(self, query: str, max_rows: int = FETCH_MAX_ROWS) -> tuple[Optional[FetchResult], str]:
+        """Async counterpart of `run_routed`; raises asyncio.TimeoutError when the query is killed."""
+        # Key building may load the schema catalog and the disk tier does file I/O.
+        key, res = await asyncio.to_thread(self._cached, query, max_rows)
+        if res is not None:
+            return res, ""
+        sql, note = await asyncio.to_thread(self._route, query)
+        if note:
+            key = None
+        if PREFLIGHT_ENABLED:
+            async with self.async_engine.connect() as conn:
+                decision = await preflight.acheck(conn, sql)
+            if decision.action == preflight.REJECT:
+                return None, decision.message()
+            if decision.action == preflight.REWRITE:
+                key, note = None, note + decision.message()
+            sql = decision.sql
+        res = await self.arun_sql(sql=sql, max_rows=max_rows)
+        if key:
+            await asyncio.to_thread(query_cache.put, key, res)
+        return res, note
+
+    async def arun_sql(self, sql: str, max_rows: int = FETCH_MAX_ROWS) -> FetchResult:
+        is_mysql = self.async_engine.dialect.name == "mysql"
+        async with self.async_engine.connect() as conn:
+            thread_id = None
+            if is_mysql:
+                thread_id = (await conn.execute(text("SELECT CONNECTION_ID()"))).scalar()
+                await conn.execute(text(f"SET SESSION MAX_EXECUTION_TIME = {int(self.timeout * 1000)}"))
+            try:
+                # Client-side deadline slightly after the server's, as a backstop.
+                return await asyncio.wait_for(afetch(conn, sql, max_rows=max_rows), self.timeout + 1)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                # Cancelled or timed out: stop the statement server-side too.
+                if thread_id is not None:
+                    await asyncio.shield(self._kill_query(thread_id))
+                await conn.invalidate()
+                raise
+
+    async def _kill_query(self, thread_id: int) -> None:
+        try:
+            async with self.async_engine.connect() as killer:
+                await killer.execute(text(f"KILL QUERY {int(thread_id)}"))
+        except Exception as e:
+            logger.warning(f"Failed to kill query on connection {thread_id}: {e}")
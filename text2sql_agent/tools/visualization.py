@@ -1,30 +1,78 @@
+import asyncio
+import base64
+import io
 import os
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-from PIL import Image
-from sqlalchemy import create_engine, text as sql_text
-
+from agno.run import RunContext
 from agno.tools import tool
 from agno.utils.log import logger
-from settings import MYSQL_URL, CHART_SERVER_PORT, LLM_MODEL
+import metrics
+import tracing
+from db.engines import get_async_engine, get_engine
+from db.fetch import FetchResult
+from db.result_cache import result_cache
+from settings import MYSQL_URL, MYSQL_ASYNC_URL, SQL_ASYNC, CHART_SERVER_PORT, LLM_MODEL
+from text2sql_agent.tools.chart_worker import ChartQueueFull, ChartWorkerPool
+from text2sql_agent.tools.sql import AgentSQLTools, AsyncAgentSQLTools
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from text2sql_agent.tools.chart_cache import ChartCache
+
+# pandas, matplotlib, PIL and the chart cache are loaded on the first visualization
+# request (or in the chart worker), keeping them out of agent startup.
 
 # ---------------------------------------------------------------------------
 # Module-level constants
 # ---------------------------------------------------------------------------
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 _CHARTS_DIR = _PROJECT_ROOT / "exports" / "charts"
-_CHARTS_DIR.mkdir(parents=True, exist_ok=True)
-_ENGINE = create_engine(MYSQL_URL)
+_CHART_CACHE: "ChartCache | None" = None
+_SQL_TOOLS: AgentSQLTools | None = None
+_CHART_POOL = ChartWorkerPool()  # worker processes start on the first job
 _PAI_CONFIGURED = False
 
 
-def _execute_query(sql: str) -> pd.DataFrame:
-    """Execute SQL and return a DataFrame."""
-    with _ENGINE.connect() as conn:
-        return pd.read_sql(sql_text(sql), conn)
+class ChartError(Exception):
+    """A chart could not be produced; the message is returned to the agent."""
+
+
+def _chart_cache() -> "ChartCache":
+    """The chart cache, created (and the charts directory scanned) on first use."""
+    global _CHART_CACHE
+    if _CHART_CACHE is None:
+        from text2sql_agent.tools.chart_cache import ChartCache
+
+        _CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+        _CHART_CACHE = ChartCache(_CHARTS_DIR)
+    return _CHART_CACHE
+
+
+def _sql_tools() -> AgentSQLTools:
+    """SQL tools for queries not in the result cache, so they take run_sql_query's route and limits."""
+    global _SQL_TOOLS
+    if _SQL_TOOLS is None:
+        if SQL_ASYNC:
+            _SQL_TOOLS = AsyncAgentSQLTools(async_engine=get_async_engine(MYSQL_ASYNC_URL), db_engine=get_engine(MYSQL_URL))
+        else:
+            _SQL_TOOLS = AgentSQLTools(db_engine=get_engine(MYSQL_URL))
+    return _SQL_TOOLS
+
+
+def _executed(sql_query: str, session_id: str | None, res: FetchResult | None, note: str) -> tuple["pd.DataFrame", str]:
+    """The DataFrame of an executed query plus the notices for the response; a rejection raises ChartError."""
+    if res is None:
+        raise ChartError(note)
+    if res.truncated:
+        logger.warning(f"Visualization input truncated: {res.notice()}")
+    df = res.frame()
+    # Only complete results of the SQL as written are cached, as in run_sql_query.
+    if not res.truncated and not note:
+        result_cache.put(session_id, sql_query, df)
+    return df, "\n\n".join(n.strip() for n in (res.notice(), note) if n)
 
 
 def _configure_pandasai():
@@ -32,60 +80,75 @@ def _configure_pandasai():
     global _PAI_CONFIGURED
     if _PAI_CONFIGURED:
         return
+    import matplotlib
+
+    matplotlib.use("Agg")  # PandasAI's generated code plots through pyplot
     import pandasai as pai
     from pandasai_litellm.litellm import LiteLLM
 
-    pai.config.set({
-        "llm": LiteLLM(model=LLM_MODEL, api_key=os.getenv("OPENAI_API_KEY", "")),
-        "save_charts": True,
-        "save_charts_path": str(_CHARTS_DIR),
-        "open_charts": False,
-        "enable_cache": False,
-    })
+    pai.config.set({"llm": LiteLLM(model=LLM_MODEL, api_key=os.getenv("OPENAI_API_KEY", ""))})
     _PAI_CONFIGURED = True
 
 
-def _add_padding(image_path: Path, padding: int = 200):
-    """Add white padding around a chart to prevent UI cropping."""
-    with Image.open(image_path) as img:
-        canvas = Image.new("RGB", (img.width + 2 * padding, img.height + 2 * padding), "white")
-        canvas.paste(img, (padding, padding))
-        canvas.save(image_path)
+def _save_pandasai_chart(response, out_path: Path) -> Path | None:
+    """Pad the chart PandasAI returned in memory, write it once to ``out_path`` and drop PandasAI's copy."""
+    if getattr(response, "type", None) != "chart":
+        return None
+    from PIL import Image
 
+    from text2sql_agent.tools.charts import save_image
 
-def _find_latest_chart() -> Path | None:
-    """Return the most recently saved chart PNG, or None."""
-    charts = sorted(_CHARTS_DIR.glob("*.png"), key=lambda p: p.stat().st_mtime, reverse=True)
-    return charts[0] if charts else None
+    value = str(response.value)
+    if value.startswith("data:image"):
+        with Image.open(io.BytesIO(base64.b64decode(value.split(",", 1)[1]))) as img:
+            save_image(img, out_path)
+    else:
+        from pandasai.constants import DEFAULT_CHART_DIRECTORY
 
+        source = Path(value)
+        with Image.open(source) as img:
+            save_image(img, out_path)
+        # PandasAI always writes temp_chart_<id>.png under its cwd-relative chart
+        # directory, outside the chart cache's index and eviction.
+        if source.resolve().is_relative_to(Path(DEFAULT_CHART_DIRECTORY).resolve()):
+            source.unlink(missing_ok=True)
+    return out_path
 
-@tool(show_result=False)
-def visualize_last_query_results(
-    sql_query: str,
-    visualization_request: str = "Generate the most appropriate visualization for this dataset",
-) -> str:
-    """Generate a chart from SQL query results using PandasAI.
 
-    Call this ONLY when the user asks to visualize/chart/plot data.
-    Pass the exact SQL query that was last executed via run_sql_query.
-    """
-    if not sql_query or not sql_query.strip():
-        return "No SQL query provided. Please pass the last executed SQL query."
+def _chart_key(df: "pd.DataFrame", visualization_request: str) -> str:
+    from text2sql_agent.tools.chart_cache import chart_key
 
-    if not os.getenv("OPENAI_API_KEY"):
-        return "Visualization failed: OPENAI_API_KEY not set."
+    return chart_key(df, visualization_request)
 
-    # 1. Execute query
-    try:
-        df = _execute_query(sql_query)
-    except Exception as e:
-        logger.error(f"SQL execution failed: {e}")
-        return f"Failed to execute the query for visualization: {e}"
 
-    if df.empty:
-        return "The query returned no rows — nothing to visualize."
+def _chart_response(chart: Path, path: str, elapsed: float, notice: str = "") -> str:
+    response = (
+        f"Visualization generated ({path}, {elapsed:.2f}s). IMPORTANT: You MUST copy this markdown "
+        f"into your response exactly:\n\n"
+        f"![Chart](http://localhost:{CHART_SERVER_PORT}/charts/{chart.name})"
+    )
+    # Tell the agent the chart covers partial data, as run_sql_query does.
+    return f"{response}\n\n{notice}" if notice else response
+
+
+def _generate_chart(df: "pd.DataFrame", visualization_request: str, scratch_base: str) -> tuple[Path, str]:
+    """Render a chart to a scratch file: simple shapes locally, everything else through PandasAI.
+
+    Module-level so it can run in a chart worker process. Returns the file
+    written and a label for the renderer that produced it.
+    """
+    from text2sql_agent.tools.charts import chart_suffix, plan_chart, render_chart
+
+    plan = plan_chart(df, visualization_request)
+    if plan is not None:
+        try:
+            chart = render_chart(df, plan, Path(scratch_base + chart_suffix()))
+            return chart, f"local {plan.kind} renderer"
+        except Exception as e:
+            logger.warning(f"Local chart rendering failed, falling back to PandasAI: {e}")
 
-    # 2. Generate chart
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ChartError("Visualization failed: OPENAI_API_KEY not set.")
     try:
         import pandasai as pai
         _configure_pandasai()
@@ -96,24 +159,146 @@ def visualize_last_query_results(
             "Rotate x-axis labels by 45 degrees. "
             "Call plt.tight_layout(pad=3.0)."
         )
-        pai.DataFrame(df).chat(prompt)
+        response = pai.DataFrame(df).chat(prompt)
+        chart = _save_pandasai_chart(response, Path(scratch_base + chart_suffix(raster=True)))
     except Exception as e:
         logger.error(f"PandasAI failed: {e}")
-        return f"Visualization generation failed: {e}"
+        raise ChartError(f"Visualization generation failed: {e}") from e
 
-    # 3. Find and pad the chart
-    chart = _find_latest_chart()
     if not chart:
-        return "PandasAI completed but no chart file was found."
+        raise ChartError("PandasAI completed but did not return a chart.")
+    return chart, "pandasai renderer"
+
 
+def _load_result(sql_query: str, session_id: str | None) -> tuple["pd.DataFrame", str]:
+    """Reuse the result run_sql_query already fetched; execute only on a miss.
+
+    A miss goes through the same cache, routing and pre-flight check as
+    run_sql_query. Also returns the truncation and routing notices.
+    """
+    df = result_cache.get(session_id, sql_query)
+    if df is not None:
+        return df, ""
     try:
-        _add_padding(chart)
+        res, note = _sql_tools().run_routed(sql_query)
     except Exception as e:
-        logger.warning(f"Failed to add padding: {e}")
+        logger.error(f"SQL execution failed: {e}")
+        raise ChartError(f"Failed to execute the query for visualization: {e}") from e
+    return _executed(sql_query, session_id, res, note)
 
-    logger.info(f"Chart saved at: {chart}")
-    return (
-        "Visualization generated. IMPORTANT: You MUST copy this markdown "
-        f"into your response exactly:\n\n"
-        f"![Chart](http://localhost:{CHART_SERVER_PORT}/charts/{chart.name})"
-    )
+
+async def _aload_result(sql_query: str, session_id: str | None) -> tuple["pd.DataFrame", str]:
+    """Async `_load_result`: on the asyncio driver the query gets MAX_EXECUTION_TIME and KILL QUERY on timeout."""
+    tools = _sql_tools()
+    if not isinstance(tools, AsyncAgentSQLTools):
+        return await asyncio.to_thread(_load_result, sql_query, session_id)
+    df = result_cache.get(session_id, sql_query)
+    if df is not None:
+        return df, ""
+    try:
+        res, note = await tools.arun_routed(sql_query)
+    except asyncio.TimeoutError as e:
+        raise ChartError(f"Failed to execute the query for visualization: it exceeded the {tools.timeout:.0f}s time limit and was cancelled.") from e
+    except Exception as e:
+        logger.error(f"SQL execution failed: {e}")
+        raise ChartError(f"Failed to execute the query for visualization: {e}") from e
+    return _executed(sql_query, session_id, res, note)
+
+
+def _finish(key: str, chart: Path, path: str, start: float, session_id: str | None, notice: str = "") -> str:
+    """File the finished chart under its content hash and build the tool response."""
+    chart = _chart_cache().store(key, chart, session_id)
+    elapsed = time.perf_counter() - start
+    metrics.observe("chart_render_seconds", elapsed, path=path.split()[0])
+    logger.info(f"Chart saved at: {chart} (path={path}, {elapsed:.2f}s)")
+    return _chart_response(chart, path, elapsed, notice)
+
+
+@tool(show_result=False)
+def visualize_last_query_results(
+    sql_query: str,
+    visualization_request: str = "Generate the most appropriate visualization for this dataset",
+    run_context: RunContext | None = None,
+) -> str:
+    """Generate a chart from SQL query results.
+
+    Call this ONLY when the user asks to visualize/chart/plot data.
+    Pass the exact SQL query that was last executed via run_sql_query.
+    """
+    if not sql_query or not sql_query.strip():
+        return "No SQL query provided. Please pass the last executed SQL query."
+
+    session_id = run_context.session_id if run_context else None
+    scratch = None
+    try:
+        # 1. Query result (cached or executed)
+        df, notice = _load_result(sql_query, session_id)
+        if df.empty:
+            return "The query returned no rows — nothing to visualize."
+
+        # 2. Same data + same request -> same chart file
+        key = _chart_key(df, visualization_request)
+        cached = _chart_cache().lookup(key)
+        if cached is not None:
+            logger.info(f"Chart cache hit: {cached}")
+            return _chart_response(cached, "chart cache", 0.0, notice)
+
+        # 3. Render in-process
+        start = time.perf_counter()
+        scratch = _chart_cache().scratch_path(key, "")
+        with tracing.span("render", "chart", rows=len(df)):
+            chart, path = _generate_chart(df, visualization_request, str(scratch))
+        return _finish(key, chart, path, start, session_id, notice)
+    except ChartError as e:
+        return str(e)
+    finally:
+        if scratch is not None:
+            _chart_cache().discard(scratch)  # what a failed render (or a failed first renderer) left
+
+
+@tool(name="visualize_last_query_results", show_result=False)
+async def avisualize_last_query_results(
+    sql_query: str,
+    visualization_request: str = "Generate the most appropriate visualization for this dataset",
+    run_context: RunContext | None = None,
+) -> str:
+    """Generate a chart from SQL query results.
+
+    Call this ONLY when the user asks to visualize/chart/plot data.
+    Pass the exact SQL query that was last executed via run_sql_query.
+    """
+    if not sql_query or not sql_query.strip():
+        return "No SQL query provided. Please pass the last executed SQL query."
+
+    session_id = run_context.session_id if run_context else None
+    scratch = None
+    try:
+        df, notice = await _aload_result(sql_query, session_id)
+        if df.empty:
+            return "The query returned no rows — nothing to visualize."
+
+        key = _chart_key(df, visualization_request)
+        cached = _chart_cache().lookup(key)
+        if cached is not None:
+            logger.info(f"Chart cache hit: {cached}")
+            return _chart_response(cached, "chart cache", 0.0, notice)
+
+        # Render in a worker process so the event loop keeps serving other sessions
+        start = time.perf_counter()
+        scratch = _chart_cache().scratch_path(key, "")
+        with tracing.span("render", "chart", rows=len(df), worker=True):
+            chart, path = await _CHART_POOL.run(_generate_chart, df, visualization_request, str(scratch))
+        return _finish(key, chart, path, start, session_id, notice)
+    except ChartError as e:
+        return str(e)
+    except ChartQueueFull:
+        return "Visualization is busy right now (too many charts in progress). Please try again in a moment."
+    except asyncio.TimeoutError:
+        return f"Visualization timed out after {_CHART_POOL.timeout:.0f}s."
+    except Exception as e:
+        logger.error(f"Chart worker failed: {e}")
+        return f"Visualization generation failed: {e}"
+    finally:
+        if scratch is not None:
+            # A timed-out job's worker has been terminated, so nothing writes here any more.
+            _chart_cache().discard(scratch)
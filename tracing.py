@@ -0,0 +1,214 @@
+"""Per-run span tracing for the agent.
+
+A turn is a tree of spans: the root opens in the `start_turn` pre-hook and
+closes in the `end_turn` post-hook; model calls, tools (via the `trace_tool`
+tool hook), SQL statements, vector searches and embedding calls nest under
+whatever span is current. Every span carries the run and session id of its
+turn, and its duration is recorded in the ``span_seconds`` histogram by kind
+and name, so `metrics` shows where the time goes across all turns.
+
+Turns slower than TRACE_SLOW_TURN_MS have their whole span tree logged and
+written to TRACE_DUMP_DIR as ``<run_id>.json``.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from agno.utils.log import logger
+
+import metrics
+from settings import TRACING_ENABLED, TRACE_SLOW_TURN_MS, TRACE_DUMP_DIR
+
+_DUMP_DIR = Path(TRACE_DUMP_DIR) if Path(TRACE_DUMP_DIR).is_absolute() else Path(__file__).resolve().parent / TRACE_DUMP_DIR
+# Statements are kept in span attributes up to this length.
+_MAX_STATEMENT_CHARS = 500
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    run_id: Optional[str] = None
+    session_id: Optional[str] = None
+    parent: Optional["Span"] = field(default=None, repr=False)
+    attrs: dict = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    started_at: float = field(default_factory=time.time)
+    children: list["Span"] = field(default_factory=list, repr=False)
+    error: Optional[str] = None
+    duration: Optional[float] = None
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "run_id": self.run_id,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attrs": self.attrs,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def render(self, depth: int = 0) -> str:
+        """Indented one-line-per-span tree."""
+        ms = f"{self.duration * 1000:.1f} ms" if self.duration is not None else "open"
+        error = f" ERROR {self.error}" if self.error else ""
+        lines = [f"{'  ' * depth}{self.kind}:{self.name} {ms}{error}"]
+        lines += [child.render(depth + 1) for child in self.children]
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, kind: str, **attrs) -> Optional[Span]:
+    """Open a span under the current one (not made current; see `span`)."""
+    if not TRACING_ENABLED:
+        return None
+    parent = _current.get()
+    s = Span(name, kind, parent.run_id if parent else None, parent.session_id if parent else None, parent, attrs)
+    if parent is not None:
+        parent.children.append(s)
+    return s
+
+
+def end_span(s: Optional[Span], error: Optional[BaseException] = None) -> None:
+    if s is None or s.duration is not None:
+        return
+    s.duration = time.perf_counter() - s._start
+    if error is not None:
+        s.error = f"{type(error).__name__}: {error}"
+    metrics.observe("span_seconds", s.duration, kind=s.kind, span=s.name)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs):
+    """Trace the enclosed block as a child of the current span."""
+    s = start_span(name, kind, **attrs)
+    if s is None:
+        yield None
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        end_span(s, e)
+        raise
+    finally:
+        _current.reset(token)
+        end_span(s)
+
+
+def propagate(fn):
+    """Bind ``fn`` to the caller's trace context, for work handed to a thread pool."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# ---------------------------------------------------------------------------
+# Agent hooks
+# ---------------------------------------------------------------------------
+def start_turn(run_input, run_context) -> None:
+    """Agent pre-hook: open the root span of the turn."""
+    if not TRACING_ENABLED:
+        return
+    root = Span("turn", "run", getattr(run_context, "run_id", None), getattr(run_context, "session_id", None))
+    root.attrs["input_chars"] = len(str(getattr(run_input, "input_content", "") or ""))
+    _current.set(root)  # hooks run in the run's own context, so the rest of the turn nests under it
+
+
+def end_turn(run_output) -> None:
+    """Agent post-hook: close the turn and dump its span tree if it was slow."""
+    root = _current.get()
+    while root is not None and root.parent is not None:
+        root = root.parent
+    if root is None or root.kind != "run" or root.duration is not None:
+        return
+    end_span(root)
+    run_metrics = getattr(run_output, "metrics", None)
+    if run_metrics is not None:
+        root.attrs.update(input_tokens=run_metrics.input_tokens, output_tokens=run_metrics.output_tokens)
+    metrics.observe("turn_seconds", root.duration)
+    _current.set(None)
+    if TRACE_SLOW_TURN_MS > 0 and root.duration * 1000 >= TRACE_SLOW_TURN_MS:
+        _dump(root)
+
+
+def _dump(root: Span) -> None:
+    metrics.incr("slow_turns_total")
+    logger.warning(f"Slow turn {root.run_id} (session {root.session_id}), {root.duration * 1000:.0f} ms:\n{root.render()}")
+    try:
+        _DUMP_DIR.mkdir(parents=True, exist_ok=True)
+        (_DUMP_DIR / f"{root.run_id or root.span_id}.json").write_text(json.dumps(root.to_dict(), indent=2, default=str))
+    except OSError as e:
+        logger.warning(f"Could not write span tree: {e}")
+
+
+def trace_tool(function_name: str, function_call, arguments: dict) -> Any:
+    """Agent tool hook: run the tool inside a ``tool`` span."""
+    s = start_span(function_name, "tool")
+    if s is None:
+        return function_call(**arguments)
+    token = _current.set(s)
+    try:
+        result = function_call(**arguments)
+    except BaseException as e:
+        end_span(s, e)
+        raise
+    finally:
+        _current.reset(token)
+    if inspect.isawaitable(result):
+        return _finish_async(s, result)  # async chain: the tool body runs when this is awaited
+    end_span(s)
+    return result
+
+
+async def _finish_async(s: Span, awaitable) -> Any:
+    token = _current.set(s)
+    try:
+        return await awaitable
+    except BaseException as e:
+        end_span(s, e)
+        raise
+    finally:
+        _current.reset(token)
+        end_span(s)
+
+
+# ---------------------------------------------------------------------------
+# SQLAlchemy
+# ---------------------------------------------------------------------------
+def instrument_engine(engine, label: str) -> None:
+    """Trace every statement ``engine`` executes as a ``db`` span."""
+    if not TRACING_ENABLED:
+        return
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None and context is not None:
+            context._trace_span = start_span(label, "db", statement=statement[:_MAX_STATEMENT_CHARS])
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        end_span(getattr(context, "_trace_span", None))
+
+    def error(exception_context):
+        end_span(getattr(exception_context.execution_context, "_trace_span", None), exception_context.original_exception)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    event.listen(engine, "handle_error", error)